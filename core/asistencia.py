@@ -0,0 +1,200 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from .cache_respuestas import marcar_cambio_al_confirmar
+from .contadores import actualizar_contadores
+from .models import Asistencia
+
+# -----------------------------
+# GRILLA DE ASISTENCIA (alumnos × sesiones)
+# -----------------------------
+
+def construir_grilla(clase, materializar=False):
+    """
+    Construye la grilla de asistencia de una clase leyendo toda la matriz
+    alumno × sesión en una sola consulta. Las celdas sin registro se rellenan
+    como ausentes sin escribir en la base de datos, salvo que se pida
+    `materializar`, en cuyo caso se insertan con un único bulk_create.
+    """
+    fechas = list(clase.sesiones.order_by('fecha').values_list('fecha', flat=True))
+    alumnos = list(clase.alumnos.all())
+
+    registros = {
+        (alumno_id, fecha): presente
+        for alumno_id, fecha, presente in Asistencia.objects.filter(
+            clase=clase, fecha__in=fechas
+        ).values_list('alumno_id', 'fecha', 'presente')
+    }
+
+    faltantes = set()
+    data = []
+    for alumno in alumnos:
+        fila = {
+            "alumno_id": alumno.id,
+            "alumno_nombre": alumno.get_full_name() or alumno.username,
+            "asistencias": []
+        }
+        for fecha in fechas:
+            presente = registros.get((alumno.id, fecha))
+            if presente is None:
+                faltantes.add((alumno.id, fecha))
+                presente = False
+            fila["asistencias"].append({
+                "fecha": str(fecha),
+                "presente": presente
+            })
+        data.append(fila)
+
+    if materializar and faltantes:
+        with transaction.atomic():
+            Asistencia.objects.bulk_create(
+                [
+                    Asistencia(clase=clase, alumno_id=alumno_id, fecha=fecha, presente=False)
+                    for alumno_id, fecha in faltantes
+                ],
+                ignore_conflicts=True,
+            )
+            actualizar_contadores({(clase.id, alumno_id) for alumno_id, _ in faltantes})
+            marcar_cambio_al_confirmar('asistencias')
+
+    return {
+        "fechas": [str(f) for f in fechas],
+        "alumnos": data,
+        "total_sesiones": clase.total_sesiones
+    }
+
+
+# -----------------------------
+# GUARDADO MASIVO DE LA GRILLA
+# -----------------------------
+
+def guardar_grilla(clase, asistencias):
+    """
+    Guarda la grilla enviada por el profesor comparándola primero con los
+    registros existentes (una sola lectura) y aplicando los cambios con un
+    único upsert dentro de una transacción.
+    Devuelve el conteo de celdas insertadas, actualizadas y sin cambios.
+    Lanza ValidationError si alguna celda no es válida.
+    """
+    campo_fecha = Asistencia._meta.get_field('fecha')
+    campo_presente = Asistencia._meta.get_field('presente')
+
+    celdas = {}
+    for alumno_asist in asistencias:
+        try:
+            alumno_id = int(alumno_asist.get("alumno_id"))
+        except (TypeError, ValueError):
+            raise ValidationError(f"alumno_id inválido: {alumno_asist.get('alumno_id')}")
+        for asistencia in alumno_asist.get("asistencias", []):
+            fecha = campo_fecha.to_python(asistencia.get("fecha"))
+            if fecha is None:
+                raise ValidationError(f"Fecha faltante para el alumno {alumno_id}")
+            presente = bool(campo_presente.to_python(asistencia.get("presente", False)))
+            celdas[(alumno_id, fecha)] = presente
+
+    resumen = {"insertados": 0, "actualizados": 0, "sin_cambios": 0}
+    if not celdas:
+        return resumen
+
+    existentes = {
+        (alumno_id, fecha): presente
+        for alumno_id, fecha, presente in Asistencia.objects.filter(
+            clase=clase,
+            alumno_id__in={alumno_id for alumno_id, _ in celdas},
+            fecha__in={fecha for _, fecha in celdas},
+        ).values_list('alumno_id', 'fecha', 'presente')
+    }
+
+    cambios = []
+    for (alumno_id, fecha), presente in celdas.items():
+        actual = existentes.get((alumno_id, fecha))
+        if actual is None:
+            resumen["insertados"] += 1
+        elif actual != presente:
+            resumen["actualizados"] += 1
+        else:
+            resumen["sin_cambios"] += 1
+            continue
+        cambios.append(Asistencia(clase=clase, alumno_id=alumno_id, fecha=fecha, presente=presente))
+
+    if cambios:
+        with transaction.atomic():
+            Asistencia.objects.bulk_create(
+                cambios,
+                update_conflicts=True,
+                unique_fields=('alumno', 'clase', 'fecha'),
+                update_fields=('presente', 'actualizado'),
+            )
+            actualizar_contadores({(clase.id, cambio.alumno_id) for cambio in cambios})
+            marcar_cambio_al_confirmar('asistencias')
+
+    return resumen
+
+
+# -----------------------------
+# REPORTE DE ASISTENCIA POR CLASE
+# -----------------------------
+
+def fechas_reporte(clase):
+    """
+    Fechas del reporte: las de SesionClase si existen (como texto), si no las
+    fechas distintas de Asistencia; en ambos casos limitadas a total_sesiones.
+    """
+    fechas = [str(f) for f in clase.sesiones.order_by('fecha').values_list('fecha', flat=True)]
+    if not fechas:
+        fechas = sorted(list(Asistencia.objects.filter(clase=clase).values_list('fecha', flat=True).distinct()))
+    return fechas[:clase.total_sesiones]
+
+
+def construir_reporte(clase):
+    """
+    Arma el reporte de asistencia de la clase (alumnos × fechas) con una sola
+    lectura de Asistencia, pivotando en memoria y acumulando los totales en la
+    misma pasada.
+    """
+    total_sesiones = clase.total_sesiones
+    fechas = fechas_reporte(clase)
+    alumnos = list(clase.alumnos.all())
+
+    # Matriz {alumno_id: {fecha: presente}} y conteos por alumno en una sola pasada
+    matriz = {}
+    conteos = {}
+    for alumno_id, fecha, presente in Asistencia.objects.filter(
+        clase=clase, fecha__in=fechas
+    ).values_list('alumno_id', 'fecha', 'presente'):
+        matriz.setdefault(alumno_id, {})[str(fecha)] = presente
+        presentes, ausentes = conteos.get(alumno_id, (0, 0))
+        conteos[alumno_id] = (presentes + 1, ausentes) if presente else (presentes, ausentes + 1)
+
+    reporte = []
+    total_presentes = 0
+    total_ausentes = 0
+
+    for alumno in alumnos:
+        presentes, ausentes = conteos.get(alumno.id, (0, 0))
+        porcentaje = round((presentes / total_sesiones) * 100, 2) if total_sesiones else 0
+        total_presentes += presentes
+        total_ausentes += ausentes
+        fila = matriz.get(alumno.id, {})
+        reporte.append({
+            "alumno_id": alumno.id,
+            "nombre": f"{alumno.first_name} {alumno.last_name}",
+            "total_sesiones": total_sesiones,
+            "presentes": presentes,
+            "ausentes": ausentes,
+            "fechas": fechas,
+            "porcentaje": porcentaje,
+            "asistencias": [
+                {"fecha": str(fecha), "presente": fila.get(str(fecha), False)}
+                for fecha in fechas
+            ]
+        })
+
+    return {
+        "clase": clase.nombre,
+        "total_sesiones": total_sesiones,
+        "fechas": fechas,
+        "reporte": reporte,
+        "total_presentes": total_presentes,
+        "total_ausentes": total_ausentes,
+        "total_alumnos": len(alumnos),
+    }
@@ -0,0 +1,154 @@
+import base64
+import json
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, F, FloatField, Func, Q, TextField, Value, When
+
+# -----------------------------
+# BÚSQUEDA DE USUARIOS POR TEXTO
+# -----------------------------
+# En PostgreSQL se busca sobre core_documento_busqueda(...) (usuario, nombre,
+# apellido y email en minúsculas y sin tildes) con el índice GIN de trigramas
+# creado en la migración 0023, y se ordena por similitud. Si se piden menos
+# campos, el documento completo sigue filtrando con el índice y un documento
+# armado solo con esos campos descarta las coincidencias en los demás.
+#
+# En otros motores se usa icontains sobre los campos pedidos y la relevancia
+# es 1 si algún campo es igual al texto, 0.5 si empieza con él y 0 si solo lo
+# contiene. En los dos casos el orden es (-relevancia, apellido, nombre, id).
+
+CAMPOS_BUSQUEDA = ('username', 'first_name', 'last_name', 'email')
+
+
+ORDEN_CURSOR = ('last_name', 'first_name', 'id')
+
+
+class Normalizar(Func):
+    function = 'core_normalizar'
+    output_field = TextField()
+
+
+class DocumentoBusqueda(Func):
+    function = 'core_documento_busqueda'
+    output_field = TextField()
+
+
+class SimilitudPalabra(Func):
+    function = 'word_similarity'
+    output_field = FloatField()
+
+
+def usa_trigramas():
+    return connection.vendor == 'postgresql' and getattr(settings, 'BUSQUEDA_TRIGRAMAS', True)
+
+
+def _documento(campos):
+    # NULL en los campos no pedidos: concat_ws los omite
+    return DocumentoBusqueda(*(
+        F(campo) if campo in campos else Value(None, output_field=TextField())
+        for campo in CAMPOS_BUSQUEDA
+    ))
+
+
+def buscar_usuarios(queryset, texto, campos=CAMPOS_BUSQUEDA):
+    """
+    Filtra `queryset` (de Usuario) por `texto` en `campos` y lo ordena por
+    relevancia (anotada como `relevancia`). En PostgreSQL la coincidencia no
+    distingue tildes ("perez" encuentra "Pérez").
+    """
+    if not usa_trigramas():
+        contiene, igual, prefijo = Q(), Q(), Q()
+        for campo in campos:
+            contiene |= Q(**{f'{campo}__icontains': texto})
+            igual |= Q(**{f'{campo}__iexact': texto})
+            prefijo |= Q(**{f'{campo}__istartswith': texto})
+        return queryset.filter(contiene).annotate(relevancia=Case(
+            When(igual, then=Value(1.0)),
+            When(prefijo, then=Value(0.5)),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )).order_by('-relevancia', *ORDEN_CURSOR)
+
+    termino = Normalizar(Value(texto, output_field=TextField()))
+    queryset = queryset.annotate(
+        documento_busqueda=_documento(CAMPOS_BUSQUEDA),
+    ).filter(
+        documento_busqueda__contains=termino,
+    )
+    documento = 'documento_busqueda'
+    if set(campos) != set(CAMPOS_BUSQUEDA):
+        queryset = queryset.annotate(documento_campos=_documento(campos)).filter(
+            documento_campos__contains=termino,
+        )
+        documento = 'documento_campos'
+    return queryset.annotate(
+        relevancia=SimilitudPalabra(termino, F(documento)),
+    ).order_by('-relevancia', *ORDEN_CURSOR)
+
+
+# -----------------------------
+# PAGINACIÓN POR CURSOR (keyset) PARA BÚSQUEDAS DE USUARIOS
+# -----------------------------
+# El orden es (last_name, first_name, id), precedido por -relevancia si el
+# queryset viene de buscar_usuarios; el cursor codifica esos valores de la
+# última fila devuelta, así cada página es una consulta sin OFFSET.
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def limite_pagina(valor):
+    """Tamaño de página pedido, acotado a BUSQUEDA_LIMITE_MAXIMO."""
+    defecto = getattr(settings, 'BUSQUEDA_LIMITE_DEFECTO', 20)
+    maximo = getattr(settings, 'BUSQUEDA_LIMITE_MAXIMO', 100)
+    try:
+        limite = int(valor) if valor else defecto
+    except (TypeError, ValueError):
+        limite = defecto
+    return max(1, min(limite, maximo))
+
+
+_TIPOS_CURSOR = {'relevancia': float, 'last_name': str, 'first_name': str, 'id': int}
+
+
+def _campos_cursor(queryset):
+    if 'relevancia' in queryset.query.annotations:
+        return ('relevancia', *ORDEN_CURSOR)
+    return ORDEN_CURSOR
+
+
+def codificar_cursor(usuario, campos=ORDEN_CURSOR):
+    valores = [getattr(usuario, campo) for campo in campos]
+    return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode()
+
+
+def decodificar_cursor(cursor, campos=ORDEN_CURSOR):
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if len(valores) != len(campos):
+            raise ValueError(cursor)
+        return [_TIPOS_CURSOR[campo](valor) for campo, valor in zip(campos, valores)]
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise CursorInvalido("Cursor inválido")
+
+
+def paginar_por_cursor(queryset, cursor, limite):
+    """
+    Devuelve (página, siguiente_cursor). La página tiene a lo sumo `limite`
+    filas posteriores al cursor; siguiente_cursor es None en la última página.
+    """
+    campos = _campos_cursor(queryset)
+    queryset = queryset.order_by(*(f'-{campo}' if campo == 'relevancia' else campo for campo in campos))
+    if cursor:
+        # (a, b, c) posterior a (x, y, z): a > x, o a = x y b > y, o ... (relevancia va al revés)
+        posteriores, iguales = Q(), {}
+        for campo, valor in zip(campos, decodificar_cursor(cursor, campos)):
+            comparacion = 'lt' if campo == 'relevancia' else 'gt'
+            posteriores |= Q(**iguales, **{f'{campo}__{comparacion}': valor})
+            iguales[campo] = valor
+        queryset = queryset.filter(posteriores)
+    filas = list(queryset[:limite + 1])
+    pagina = filas[:limite]
+    siguiente = codificar_cursor(pagina[-1], campos) if len(filas) > limite else None
+    return pagina, siguiente
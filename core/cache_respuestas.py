@@ -0,0 +1,86 @@
+import hashlib
+import uuid
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+# -----------------------------
+# CACHÉ DE RESPUESTAS POR ENDPOINT
+# -----------------------------
+# Cada respuesta se guarda bajo una clave que incluye la versión de los datos
+# de los que depende ('clases', 'notas', ...). core/signals.py y las
+# operaciones masivas llaman a marcar_cambio() cuando esos datos cambian: la
+# versión pasa a ser otra y las respuestas viejas simplemente dejan de usarse
+# (expiran solas con RESPUESTAS_CACHE_SEGUNDOS).
+
+# 'resumenes' cambia después de recalcular ResumenClase (core/resumenes.py), que
+# ocurre al confirmar y por lo tanto después de marcar 'notas' o 'matriculas'.
+DEPENDENCIAS = ('clases', 'matriculas', 'notas', 'asistencias', 'usuarios', 'catalogos', 'resumenes')
+
+
+def _clave_version(dependencia):
+    return f'version:{dependencia}'
+
+
+def marcar_cambio(*dependencias):
+    """Asigna una versión nueva a cada dependencia."""
+    assert set(dependencias) <= set(DEPENDENCIAS), dependencias
+    version = uuid.uuid4().hex[:12]
+    cache.set_many({_clave_version(d): version for d in dependencias}, None)
+
+
+def marcar_cambio_al_confirmar(*dependencias):
+    # Enseguida para el propio proceso y otra vez al confirmar, para que nadie
+    # deje guardada una respuesta leída antes del commit con la versión nueva
+    marcar_cambio(*dependencias)
+    transaction.on_commit(lambda: marcar_cambio(*dependencias))
+
+
+def _versiones(dependencias):
+    claves = [_clave_version(d) for d in dependencias]
+    versiones = cache.get_many(claves)
+    for clave in claves:
+        if clave not in versiones:
+            cache.add(clave, uuid.uuid4().hex[:12], None)
+            versiones[clave] = cache.get(clave)
+    return [str(versiones[clave]) for clave in claves]
+
+
+def _clave_respuesta(request, vista, dependencias, por_usuario, kwargs):
+    usuario = request.user
+    partes = [
+        vista.__module__, vista.__name__,
+        getattr(usuario, 'rol', ''), str(usuario.pk) if por_usuario else '',
+        repr(sorted(kwargs.items())),
+        repr(sorted((k, sorted(v)) for k, v in request.query_params.lists())),
+        *_versiones(dependencias),
+    ]
+    return 'respuesta:' + hashlib.md5('|'.join(partes).encode()).hexdigest()
+
+
+def cachear_respuesta(*dependencias, por_usuario=False):
+    """
+    Cachea las respuestas GET 200 de una vista DRF según el rol del usuario
+    (o el usuario, con por_usuario=True), los parámetros de la URL y la versión
+    de `dependencias`. Va debajo de @api_view/@permission_classes.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            segundos = getattr(settings, 'RESPUESTAS_CACHE_SEGUNDOS', 0)
+            if not segundos or request.method != 'GET':
+                return vista(request, *args, **kwargs)
+
+            clave = _clave_respuesta(request, vista, dependencias, por_usuario, kwargs)
+            guardada = cache.get(clave)
+            if guardada is not None:
+                return Response(guardada)
+
+            respuesta = vista(request, *args, **kwargs)
+            if respuesta.status_code == 200:
+                cache.set(clave, respuesta.data, segundos)
+            return respuesta
+        return envoltura
+    return decorador
@@ -0,0 +1,159 @@
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from .models import Clase, Horario, Nivel, PeriodoAcademico
+
+# -----------------------------
+# CACHÉ DE DATOS DE REFERENCIA (Horario, Nivel, PeriodoAcademico)
+# -----------------------------
+# Tablas chicas que casi no cambian y que se leen en casi todas las vistas.
+# Se cargan completas una vez por versión, junto con los textos ya formateados.
+# core/signals.py llama a invalidar() al guardar o borrar cualquiera de ellas.
+#
+# Cada proceso guarda su copia a lo sumo CATALOGOS_CACHE_SEGUNDOS: invalidar()
+# solo avisa al worker que hizo el cambio, los demás lo ven al vencer su copia.
+# Con CATALOGOS_CACHE_COMPARTIDO=True la versión y los datos se guardan además
+# en el caché de Django: al vencer la copia solo se relee la versión y los
+# datos se recargan únicamente si otro worker la cambió.
+#
+# Los horarios de cada clase no son datos de referencia (cambian con cada
+# clase): se leen con horarios_por_clase(), una consulta para todas las clases
+# de una respuesta.
+
+CLAVE_VERSION = 'catalogos:version'
+
+# Los datos compartidos de versiones viejas expiran solos
+DATOS_COMPARTIDOS_SEGUNDOS = 60 * 60
+
+# Versión propia del proceso y copia local de los datos ya cargados
+_local = {'version_proceso': 1, 'version': None, 'datos': None, 'vence': 0}
+
+
+def _compartido():
+    return getattr(settings, 'CATALOGOS_CACHE_COMPARTIDO', False)
+
+
+def _segundos():
+    return getattr(settings, 'CATALOGOS_CACHE_SEGUNDOS', 30)
+
+
+def _version():
+    if not _compartido():
+        return _local['version_proceso']
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        cache.add(CLAVE_VERSION, 1, None)
+        version = cache.get(CLAVE_VERSION, 1)
+    return version
+
+
+def _cargar():
+    horarios = {}
+    for h in Horario.objects.order_by('pk'):
+        dia = h.get_dia_display()
+        horarios[h.id] = {
+            "id": h.id,
+            "dia": h.dia,
+            "texto": str(h),                              # "Lunes - 07:00 PM"
+            "texto_24h": f"{dia} {h.hora.strftime('%H:%M')}",  # "Lunes 19:00"
+        }
+
+    return {
+        "horarios": horarios,
+        "niveles": dict(Nivel.objects.order_by('pk').values_list('id', 'nombre')),
+        "periodos": {
+            p["id"]: p for p in PeriodoAcademico.objects.order_by('pk').values(
+                'id', 'nombre', 'anio', 'fecha_inicio', 'fecha_fin', 'activo'
+            )
+        },
+    }
+
+
+def catalogo():
+    """Datos de referencia vigentes (la copia del proceso se revisa cada CATALOGOS_CACHE_SEGUNDOS)."""
+    if _local['datos'] is not None and time.monotonic() < _local['vence']:
+        return _local['datos']
+    version = _version()
+    # Sin caché compartido no hay forma de saber si otro worker cambió algo: se recarga
+    if _local['version'] != version or not _compartido():
+        datos = cache.get(f'catalogos:{version}') if _compartido() else None
+        if datos is None:
+            datos = _cargar()
+            if _compartido():
+                cache.set(f'catalogos:{version}', datos, DATOS_COMPARTIDOS_SEGUNDOS)
+        _local['datos'], _local['version'] = datos, version
+    _local['vence'] = time.monotonic() + _segundos()
+    return _local['datos']
+
+
+async def acatalogo():
+    """catalogo() para vistas async: la carga (si hace falta) corre en un hilo."""
+    return await sync_to_async(catalogo)()
+
+
+def invalidar():
+    _local['version_proceso'] += 1
+    _local['version'] = None
+    _local['vence'] = 0
+    if _compartido():
+        cache.add(CLAVE_VERSION, 1, None)
+        cache.incr(CLAVE_VERSION)
+
+
+# -----------------------------
+# CONSULTAS FRECUENTES
+# -----------------------------
+
+def horarios_por_clase(clases):
+    """{clase_id: [horario_id, ...]} en una consulta; `clases` son ids o un queryset de Clase."""
+    por_clase = {}
+    for clase_id, horario_id in Clase.horarios.through.objects.filter(
+        clase_id__in=clases
+    ).order_by('clase_id', 'horario_id').values_list('clase_id', 'horario_id'):
+        por_clase.setdefault(clase_id, []).append(horario_id)
+    return por_clase
+
+
+async def ahorarios_por_clase(clases):
+    por_clase = {}
+    async for clase_id, horario_id in Clase.horarios.through.objects.filter(
+        clase_id__in=clases
+    ).order_by('clase_id', 'horario_id').values_list('clase_id', 'horario_id'):
+        por_clase.setdefault(clase_id, []).append(horario_id)
+    return por_clase
+
+
+def _horarios(clase_id, campo, datos, por_clase):
+    if por_clase is None:
+        por_clase = horarios_por_clase([clase_id])
+    ids = por_clase.get(clase_id, [])
+    if datos is None:
+        datos = catalogo()
+        if any(h not in datos["horarios"] for h in ids):
+            # Horario creado en otro worker después de cargar la copia local: se revisa ya
+            _local['vence'] = 0
+            datos = catalogo()
+    # Con `datos` ya cargados (vistas async) un horario todavía desconocido se omite
+    return [datos["horarios"][h][campo] for h in ids if h in datos["horarios"]]
+
+
+def horarios_clase(clase_id, datos=None, por_clase=None):
+    """
+    Lista como [str(h) for h in clase.horarios.all()]. `datos` evita releer
+    catalogo() y `por_clase` (de horarios_por_clase) la consulta por clase.
+    """
+    return _horarios(clase_id, "texto", datos, por_clase)
+
+
+def horarios_clase_24h(clase_id, datos=None, por_clase=None):
+    """Texto "Lunes 19:00, Miércoles 19:00" usado por las vistas del alumno."""
+    return ', '.join(_horarios(clase_id, "texto_24h", datos, por_clase))
+
+
+def nivel_nombre(nivel_id, defecto=''):
+    return catalogo()["niveles"].get(nivel_id, defecto)
+
+
+def periodo(periodo_id):
+    return catalogo()["periodos"].get(periodo_id)
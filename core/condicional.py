@@ -0,0 +1,145 @@
+import hashlib
+from functools import wraps
+from inspect import iscoroutinefunction
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.http import HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+from .models import Asistencia, Clase, Nota, RecursoCurso, SesionClase, Usuario
+
+# -----------------------------
+# GET CONDICIONAL (ETag / If-None-Match)
+# -----------------------------
+# La firma de un recurso es el conteo y el máximo de un marcador (el campo
+# `actualizado` o el id) de cada tabla de la que sale la respuesta, leídos en
+# una sola consulta. Si el ETag que manda el cliente coincide se responde 304
+# sin ejecutar la vista.
+#
+# Los nombres de alumnos y profesores y los textos de horario, nivel y periodo
+# que se muestran entran por el `actualizado` de esas filas: la firma depende
+# solo de la base de datos y da lo mismo en cualquier worker.
+
+
+def _conteo_y_maximo(queryset, referencia, marcador):
+    """Subconsultas (cantidad, máximo de `marcador`) de las filas de `queryset` con referencia=OuterRef('pk')."""
+    agrupado = queryset.filter(**{referencia: OuterRef('pk')}).order_by().values(referencia)
+    return (
+        Subquery(agrupado.annotate(valor=Count('pk')).values('valor')[:1]),
+        Subquery(agrupado.annotate(valor=Max(marcador)).values('valor')[:1]),
+    )
+
+
+def _firma(raiz, partes, campos=()):
+    """
+    Lee en una consulta los `campos` de la fila `raiz` y las subconsultas de
+    `partes` [(queryset, referencia, marcador)]. None si la fila no existe.
+    """
+    anotaciones = {}
+    for indice, (queryset, referencia, marcador) in enumerate(partes):
+        anotaciones[f'n{indice}'], anotaciones[f'm{indice}'] = _conteo_y_maximo(queryset, referencia, marcador)
+    return raiz.annotate(**anotaciones).values_list(*campos, *anotaciones).first()
+
+
+# Clase, su nivel, su periodo y sus profesores
+CAMPOS_CLASE = (
+    'actualizado', 'nivel__actualizado', 'periodo__actualizado',
+    'profesor_titular__actualizado', 'profesor_asistente__actualizado',
+)
+
+
+def _firma_clase(clase_id, *partes):
+    return _firma(Clase.objects.filter(pk=clase_id), [
+        (Clase.alumnos.through.objects.all(), 'clase', 'id'),
+        (Clase.alumnos.through.objects.all(), 'clase', 'usuario__actualizado'),
+        *partes,
+    ], campos=CAMPOS_CLASE)
+
+
+def firma_asistencia(request, clase_id):
+    return _firma_clase(
+        clase_id,
+        (SesionClase.objects.all(), 'clase', 'id'),
+        (Asistencia.objects.all(), 'clase', 'actualizado'),
+    )
+
+
+def firma_notas(request, clase_id):
+    return _firma_clase(
+        clase_id,
+        (Clase.horarios.through.objects.all(), 'clase', 'id'),
+        (Clase.horarios.through.objects.all(), 'clase', 'horario__actualizado'),
+        (Nota.objects.all(), 'clase', 'actualizado'),
+        (Asistencia.objects.all(), 'clase', 'actualizado'),
+    )
+
+
+def firma_dashboard_alumno(request):
+    return _firma(Usuario.objects.filter(pk=request.user.pk), [
+        (Nota.objects.all(), 'alumno', 'actualizado'),
+        (Asistencia.objects.all(), 'alumno', 'actualizado'),
+        *((Clase.objects.all(), 'nota__alumno', campo) for campo in CAMPOS_CLASE),
+        (Clase.horarios.through.objects.all(), 'clase__nota__alumno', 'id'),
+        (Clase.horarios.through.objects.all(), 'clase__nota__alumno', 'horario__actualizado'),
+    ], campos=('actualizado',))
+
+
+def firma_recursos(request, clase_id):
+    return _firma(Clase.objects.filter(pk=clase_id), [
+        (RecursoCurso.objects.all(), 'clase', 'actualizado'),
+    ])
+
+
+def _etag(vista, request, valores):
+    partes = [vista.__name__, str(request.user.pk), request.get_full_path(),
+              getattr(getattr(request, 'accepted_renderer', None), 'format', ''), repr(valores)]
+    return quote_etag(hashlib.md5('|'.join(partes).encode()).hexdigest())
+
+
+def _no_modificado(request, etag):
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        respuesta = HttpResponseNotModified()
+        respuesta['ETag'] = etag
+        return respuesta
+    return None
+
+
+def con_etag(calcular_firma):
+    """
+    Agrega ETag a las respuestas GET 200 de una vista DRF y responde 304 si
+    If-None-Match coincide. `calcular_firma(request, **kwargs)` devuelve los
+    valores que identifican la versión del recurso (o None para no usar ETag).
+    Va debajo de @api_view/@permission_classes (o de la autenticación en las
+    vistas async, donde la firma se calcula en un hilo).
+    """
+    def decorador(vista):
+        if iscoroutinefunction(vista):
+            calcular_firma_async = sync_to_async(calcular_firma)
+
+            @wraps(vista)
+            async def envoltura_async(request, *args, **kwargs):
+                if request.method != 'GET':
+                    return await vista(request, *args, **kwargs)
+                valores = await calcular_firma_async(request, **kwargs)
+                if valores is None:
+                    return await vista(request, *args, **kwargs)
+                etag = _etag(vista, request, valores)
+                respuesta = _no_modificado(request, etag) or await vista(request, *args, **kwargs)
+                if respuesta.status_code == 200:
+                    respuesta['ETag'] = etag
+                return respuesta
+            return envoltura_async
+
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            if request.method != 'GET':
+                return vista(request, *args, **kwargs)
+            valores = calcular_firma(request, **kwargs)
+            if valores is None:
+                return vista(request, *args, **kwargs)
+            etag = _etag(vista, request, valores)
+            respuesta = _no_modificado(request, etag) or vista(request, *args, **kwargs)
+            if respuesta.status_code == 200:
+                respuesta['ETag'] = etag
+            return respuesta
+        return envoltura
+    return decorador
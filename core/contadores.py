@@ -0,0 +1,100 @@
+from django.db.models import Count, Q
+from . import resumenes
+from .cache_respuestas import marcar_cambio_al_confirmar
+from .models import Asistencia, ContadorAsistencia
+
+# -----------------------------
+# CONTADORES DE ASISTENCIA POR MATRÍCULA
+# -----------------------------
+
+def _contar(asistencias):
+    """Agrupa las asistencias por (clase, alumno) y devuelve {(clase_id, alumno_id): (presentes, ausentes)}."""
+    return {
+        (fila['clase_id'], fila['alumno_id']): (fila['presentes'], fila['ausentes'])
+        for fila in asistencias.order_by().values('clase_id', 'alumno_id').annotate(
+            presentes=Count('pk', filter=Q(presente=True)),
+            ausentes=Count('pk', filter=Q(presente=False)),
+        )
+    }
+
+
+def _guardar(conteos):
+    ContadorAsistencia.objects.bulk_create(
+        [
+            ContadorAsistencia(
+                clase_id=clase_id,
+                alumno_id=alumno_id,
+                presentes=presentes,
+                ausentes=ausentes,
+                total=presentes + ausentes,
+            )
+            for (clase_id, alumno_id), (presentes, ausentes) in conteos.items()
+        ],
+        update_conflicts=True,
+        unique_fields=('clase', 'alumno'),
+        update_fields=('presentes', 'ausentes', 'total'),
+    )
+
+
+def actualizar_contadores(pares):
+    """
+    Recalcula los contadores de los pares (clase_id, alumno_id) indicados con una
+    consulta agregada y un upsert. Los pares sin asistencias pierden su contador.
+    """
+    pares = set(pares)
+    if not pares:
+        return
+
+    asistencias = Asistencia.objects.filter(
+        clase_id__in={clase_id for clase_id, _ in pares},
+        alumno_id__in={alumno_id for _, alumno_id in pares},
+    )
+    conteos = {par: valor for par, valor in _contar(asistencias).items() if par in pares}
+    if conteos:
+        _guardar(conteos)
+
+    vacios = pares - conteos.keys()
+    if vacios:
+        condicion = Q()
+        for clase_id, alumno_id in vacios:
+            condicion |= Q(clase_id=clase_id, alumno_id=alumno_id)
+        ContadorAsistencia.objects.filter(condicion).delete()
+    resumenes.marcar(matriculas=pares)
+
+
+def verificar_contadores():
+    """
+    Compara los contadores guardados con un recuento completo de Asistencia.
+    Devuelve (esperados, diferencias) donde diferencias es una lista de
+    (clase_id, alumno_id, guardado, esperado).
+    """
+    esperados = _contar(Asistencia.objects.all())
+    guardados = {
+        (clase_id, alumno_id): (presentes, ausentes)
+        for clase_id, alumno_id, presentes, ausentes in ContadorAsistencia.objects.values_list(
+            'clase_id', 'alumno_id', 'presentes', 'ausentes'
+        )
+    }
+    diferencias = [
+        (clase_id, alumno_id, guardados.get((clase_id, alumno_id)), esperados.get((clase_id, alumno_id)))
+        for clase_id, alumno_id in sorted(esperados.keys() | guardados.keys())
+        if guardados.get((clase_id, alumno_id)) != esperados.get((clase_id, alumno_id))
+    ]
+    return esperados, diferencias
+
+
+def reconstruir_contadores():
+    """Reconstruye todos los contadores desde cero. Devuelve las diferencias corregidas."""
+    esperados, diferencias = verificar_contadores()
+    sobrantes = [(clase_id, alumno_id) for clase_id, alumno_id, _, esperado in diferencias if esperado is None]
+    if sobrantes:
+        condicion = Q()
+        for clase_id, alumno_id in sobrantes:
+            condicion |= Q(clase_id=clase_id, alumno_id=alumno_id)
+        ContadorAsistencia.objects.filter(condicion).delete()
+    if esperados:
+        _guardar(esperados)
+    if diferencias:
+        marcar_cambio_al_confirmar('asistencias')
+        resumenes.marcar(matriculas={(clase_id, alumno_id) for clase_id, alumno_id, _, _ in diferencias})
+    return diferencias
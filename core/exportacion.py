@@ -0,0 +1,124 @@
+import csv
+import tempfile
+from decimal import Decimal
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.text import slugify
+from .asistencia import fechas_reporte
+from .models import Asistencia, Nota
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # openpyxl es opcional: solo se necesita para exportar en xlsx
+    Workbook = None
+
+# -----------------------------
+# EXPORTACIÓN DE REPORTES (CSV / XLSX)
+# -----------------------------
+# Las filas se generan de a una leyendo la base de datos con cursores del lado
+# del servidor (iterator), así la memoria se mantiene constante aunque se
+# exporte un periodo completo.
+
+TAMANO_LOTE = 2000
+DOS_DECIMALES = Decimal('0.01')
+
+TIPOS = ('asistencia', 'notas')
+FORMATOS = ('csv', 'xlsx')
+
+ENCABEZADO_NOTAS = [
+    'Curso', 'Alumno ID', 'Alumno', 'Participación 1', 'Participación 2', 'Participación 3',
+    'Participación promedio', 'Tareas', 'Examen final', 'Promedio', 'Asistencia %', 'Estado',
+]
+
+
+class _Eco:
+    """Pseudo-archivo que devuelve lo escrito, para que csv.writer genere líneas sueltas."""
+    def write(self, value):
+        return value
+
+
+def filas_asistencia(clases):
+    """
+    Matriz de asistencia por clase: un bloque por clase con su propio encabezado
+    de fechas. Alumnos y asistencias se recorren ordenados por alumno para
+    combinarlos sin cargarlos completos en memoria.
+    """
+    for indice, clase in enumerate(clases.order_by('pk').iterator(chunk_size=TAMANO_LOTE)):
+        fechas = list(dict.fromkeys(str(f) for f in fechas_reporte(clase)))
+        if indice:
+            yield []
+        yield ['Curso', 'Alumno ID', 'Alumno'] + fechas + ['Presentes', 'Ausentes']
+
+        asistencias = Asistencia.objects.filter(clase=clase, fecha__in=fechas).order_by(
+            'alumno_id', 'fecha'
+        ).values_list('alumno_id', 'fecha', 'presente').iterator(chunk_size=TAMANO_LOTE)
+        pendiente = next(asistencias, None)
+
+        alumnos = clase.alumnos.order_by('id').values_list(
+            'id', 'first_name', 'last_name', 'username'
+        ).iterator(chunk_size=TAMANO_LOTE)
+        for alumno_id, first_name, last_name, username in alumnos:
+            marcas = {}
+            while pendiente is not None and pendiente[0] <= alumno_id:
+                if pendiente[0] == alumno_id:
+                    marcas[str(pendiente[1])] = pendiente[2]
+                pendiente = next(asistencias, None)
+
+            presentes = sum(1 for presente in marcas.values() if presente)
+            ausentes = len(marcas) - presentes
+            nombre = f"{first_name} {last_name}".strip() or username
+            yield [clase.nombre, alumno_id, nombre] + [
+                'P' if marcas.get(fecha) else 'A' for fecha in fechas
+            ] + [presentes, ausentes]
+
+
+def filas_notas(clases):
+    """Hoja de notas con las métricas calculadas en SQL (Nota.objects.with_metrics)."""
+    yield ENCABEZADO_NOTAS
+    notas = Nota.objects.filter(clase__in=clases).with_metrics().order_by(
+        'clase_id', 'alumno__last_name', 'alumno__first_name', 'pk'
+    ).values_list(
+        'clase__nombre', 'alumno_id', 'alumno__first_name', 'alumno__last_name',
+        'participacion_1', 'participacion_2', 'participacion_3', 'metrica_participacion_promedio',
+        'tareas', 'examen_final', 'metrica_promedio', 'metrica_asistencia', 'metrica_estado',
+    ).iterator(chunk_size=TAMANO_LOTE)
+    for curso, alumno_id, first_name, last_name, *valores, estado in notas:
+        yield [curso, alumno_id, f"{first_name} {last_name}".strip()] + [
+            Decimal(valor).quantize(DOS_DECIMALES) for valor in valores
+        ] + [estado]
+
+
+def exportar(clases, tipo, formato, nombre):
+    """Devuelve la respuesta HTTP con el reporte `tipo` de las clases en el `formato` pedido."""
+    filas = filas_asistencia(clases) if tipo == 'asistencia' else filas_notas(clases)
+    nombre_archivo = f"{tipo}_{slugify(nombre) or 'reporte'}.{formato}"
+
+    if formato == 'xlsx':
+        return _respuesta_xlsx(filas, nombre_archivo)
+
+    escritor = csv.writer(_Eco())
+
+    def lineas():
+        yield '\ufeff'  # BOM para que Excel reconozca UTF-8 (tildes y ñ)
+        for fila in filas:
+            yield escritor.writerow(fila)
+
+    respuesta = StreamingHttpResponse(lineas(), content_type='text/csv; charset=utf-8')
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+    return respuesta
+
+
+def _respuesta_xlsx(filas, nombre_archivo):
+    # El libro en modo write_only vuelca las filas a disco a medida que se agregan
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet()
+    for fila in filas:
+        hoja.append(fila)
+    archivo = tempfile.TemporaryFile()
+    libro.save(archivo)
+    archivo.seek(0)
+    return FileResponse(
+        archivo,
+        as_attachment=True,
+        filename=nombre_archivo,
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
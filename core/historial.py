@@ -0,0 +1,166 @@
+import hashlib
+import json
+from decimal import Decimal
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from . import catalogos
+from .models import Clase, Nota, Usuario
+
+try:
+    from weasyprint import HTML
+except ImportError:  # weasyprint es opcional: solo se necesita para el historial en pdf
+    HTML = None
+
+# -----------------------------
+# HISTORIAL ACADÉMICO (libreta de notas de todos los periodos)
+# -----------------------------
+# Los cursos de cada alumno agrupados por periodo con promedio, asistencia y
+# estado (las métricas SQL de Nota.with_metrics), más promedios por periodo y
+# acumulados. Tres consultas para cualquier cantidad de alumnos: alumnos,
+# notas y matrículas; periodos y niveles salen de core/catalogos.py.
+#
+# La versión impresa (html o pdf) se arma solo cuando se pide y se guarda en
+# el caché bajo la huella de los datos del alumno: mientras su historial no
+# cambie se reutiliza, aunque cambien los de otros alumnos.
+
+FORMATOS = ('json', 'html', 'pdf')
+
+# La clave es la huella del contenido: nunca queda vieja, aunque el caché sea por proceso
+CACHE_SEGUNDOS = 60 * 60
+
+DOS_DECIMALES = Decimal('0.01')
+
+
+def _promedio(valores):
+    if not valores:
+        return 0.0
+    return float((sum(valores) / len(valores)).quantize(DOS_DECIMALES))
+
+
+def _totales(cursos):
+    con_notas = [curso for curso in cursos if curso["estado"] != "Sin notas"]
+    return {
+        "total_cursos": len(cursos),
+        "aprobados": sum(1 for curso in con_notas if curso["estado"] == "Aprobado"),
+        "promedio": _promedio([Decimal(str(curso["promedio"])) for curso in con_notas]),
+        "asistencia_promedio": _promedio([Decimal(str(curso["asistencia"])) for curso in con_notas]),
+    }
+
+
+def historiales(alumno_ids):
+    """
+    Historial de cada alumno de `alumno_ids`, en el mismo orden (los ids que
+    no son alumnos se omiten). Cada curso aparece una vez, esté matriculado o
+    solo conserve su Nota; los cursos sin Nota quedan como "Sin notas".
+    """
+    alumno_ids = list(dict.fromkeys(alumno_ids))
+    alumnos = Usuario.objects.filter(pk__in=alumno_ids, rol='alumno').in_bulk()
+    if not alumnos:
+        return []
+    datos = catalogos.catalogo()
+
+    cursos = {}  # (alumno_id, clase_id) -> curso
+    for fila in Nota.objects.filter(alumno_id__in=alumnos).with_metrics().order_by('pk').values(
+        'alumno_id', 'clase_id', 'clase__nombre', 'clase__nivel_id', 'clase__periodo_id',
+        'metrica_promedio', 'metrica_asistencia', 'metrica_estado',
+    ):
+        # Con notas duplicadas vale la primera (menor pk), como en notas_por_clase
+        cursos.setdefault((fila['alumno_id'], fila['clase_id']), {
+            "clase_id": fila['clase_id'],
+            "curso": fila['clase__nombre'],
+            "nivel": datos["niveles"].get(fila['clase__nivel_id'], ""),
+            "periodo_id": fila['clase__periodo_id'],
+            "promedio": float(fila['metrica_promedio']),
+            "asistencia": float(fila['metrica_asistencia']),
+            "estado": fila['metrica_estado'],
+        })
+    for alumno_id, clase_id, nombre, nivel_id, periodo_id in Clase.alumnos.through.objects.filter(
+        usuario_id__in=alumnos
+    ).values_list('usuario_id', 'clase_id', 'clase__nombre', 'clase__nivel_id', 'clase__periodo_id'):
+        cursos.setdefault((alumno_id, clase_id), {
+            "clase_id": clase_id,
+            "curso": nombre,
+            "nivel": datos["niveles"].get(nivel_id, ""),
+            "periodo_id": periodo_id,
+            "promedio": None,
+            "asistencia": None,
+            "estado": "Sin notas",
+        })
+
+    por_alumno = {}
+    for (alumno_id, _), curso in cursos.items():
+        por_alumno.setdefault(alumno_id, []).append(curso)
+
+    resultado = []
+    for alumno_id in alumno_ids:
+        alumno = alumnos.get(alumno_id)
+        if alumno is None:
+            continue
+        por_periodo = {}
+        for curso in por_alumno.get(alumno_id, []):
+            por_periodo.setdefault(curso["periodo_id"], []).append(curso)
+
+        periodos = []
+        for periodo_id, lista in por_periodo.items():
+            periodo = datos["periodos"].get(periodo_id)
+            lista.sort(key=lambda curso: (curso["curso"] or "", curso["clase_id"]))
+            periodos.append({
+                "periodo_id": periodo_id,
+                "periodo": periodo["nombre"] if periodo else "Sin período",
+                "anio": periodo["anio"] if periodo else None,
+                "fecha_inicio": str(periodo["fecha_inicio"]) if periodo else None,
+                "fecha_fin": str(periodo["fecha_fin"]) if periodo else None,
+                **_totales(lista),
+                "cursos": lista,
+            })
+        # Orden cronológico; los cursos sin periodo al final
+        periodos.sort(key=lambda p: (p["fecha_inicio"] is None, p["fecha_inicio"] or "", p["periodo_id"] or 0))
+
+        acumulado = _totales([curso for periodo in periodos for curso in periodo["cursos"]])
+        resultado.append({
+            "alumno_id": alumno.id,
+            "alumno_nombre": alumno.get_full_name() or alumno.username,
+            "email": alumno.email,
+            "periodos": periodos,
+            "total_cursos": acumulado["total_cursos"],
+            "cursos_aprobados": acumulado["aprobados"],
+            "promedio_acumulado": acumulado["promedio"],
+            "asistencia_acumulada": acumulado["asistencia_promedio"],
+        })
+    return resultado
+
+
+def huella(historial):
+    """Versión de un historial: cambia si y solo si cambia alguno de sus datos."""
+    return hashlib.md5(json.dumps(historial, sort_keys=True).encode()).hexdigest()
+
+
+def _en_cache(clave, generar):
+    contenido = cache.get(clave)
+    if contenido is None:
+        contenido = generar()
+        cache.set(clave, contenido, CACHE_SEGUNDOS)
+    return contenido
+
+
+def html_alumno(historial):
+    """Hoja imprimible de un alumno, reutilizada mientras su historial no cambie."""
+    return _en_cache(
+        f'historial:html:{huella(historial)}',
+        lambda: render_to_string('historial/alumno.html', {'historial': historial}),
+    )
+
+
+def documento_html(historiales_):
+    """Documento completo con una hoja (y un salto de página) por alumno."""
+    return render_to_string('historial/documento.html', {
+        'hojas': [html_alumno(historial) for historial in historiales_],
+    })
+
+
+def documento_pdf(historiales_):
+    """El documento html convertido a pdf con weasyprint (requiere HTML disponible)."""
+    clave = 'historial:pdf:' + hashlib.md5(
+        '|'.join(huella(historial) for historial in historiales_).encode()
+    ).hexdigest()
+    return _en_cache(clave, lambda: HTML(string=documento_html(historiales_)).write_pdf())
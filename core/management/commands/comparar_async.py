@@ -0,0 +1,81 @@
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+
+# (ruta síncrona, ruta async) relativas a --url; {clase_id} se completa con --clase
+RUTAS = [
+    ('alumno/dashboard/', 'async/alumno/dashboard/'),
+    ('alumno/curso-matriculado/', 'async/alumno/curso-matriculado/'),
+    ('cursos-disponibles/', 'async/cursos-disponibles/'),
+    ('alumno/recursos/{clase_id}/', 'async/alumno/recursos/{clase_id}/'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el rendimiento con peticiones concurrentes de las vistas del alumno síncronas y async "
+        "contra un servidor en marcha (por ejemplo gunicorn con wsgi y uvicorn con asgi)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/api/', help="Base de la API (proceso web, WSGI).")
+        parser.add_argument('--url-async', help="Base de la API en el proceso ASGI (por defecto, --url).")
+        parser.add_argument('--usuario', required=True, help="Alumno con el que se inicia sesión.")
+        parser.add_argument('--clave', required=True)
+        parser.add_argument('--clase', type=int, default=1, help="Clase para la ruta de recursos.")
+        parser.add_argument('--concurrencia', type=int, default=50, help="Peticiones simultáneas.")
+        parser.add_argument('--peticiones', type=int, default=500, help="Peticiones por ruta.")
+
+    def _pedir(self, url, token=None, cuerpo=None):
+        cabeceras = {'Content-Type': 'application/json'}
+        if token:
+            cabeceras['Authorization'] = f'Bearer {token}'
+        datos = json.dumps(cuerpo).encode() if cuerpo is not None else None
+        with urllib.request.urlopen(urllib.request.Request(url, data=datos, headers=cabeceras), timeout=60) as r:
+            return r.status, r.read()
+
+    def _medir(self, url, token, peticiones, concurrencia):
+        def una(_):
+            inicio = time.perf_counter()
+            try:
+                estado, _ = self._pedir(url, token)
+            except (urllib.error.URLError, OSError):
+                estado = None
+            return estado, time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrencia) as grupo:
+            resultados = list(grupo.map(una, range(peticiones)))
+        total = time.perf_counter() - inicio
+
+        tiempos = sorted(t for _, t in resultados)
+        return {
+            'rps': peticiones / total,
+            'p50': statistics.median(tiempos) * 1000,
+            'p95': tiempos[int(len(tiempos) * 0.95) - 1] * 1000,
+            'errores': sum(1 for estado, _ in resultados if estado != 200),
+        }
+
+    def handle(self, *args, **options):
+        base = options['url'].rstrip('/') + '/'
+        base_async = (options['url_async'] or base).rstrip('/') + '/'
+        try:
+            _, cuerpo = self._pedir(base + 'login/', cuerpo={'username': options['usuario'], 'password': options['clave']})
+        except urllib.error.URLError as e:
+            raise CommandError(f"No se pudo iniciar sesión en {base}: {e}")
+        token = json.loads(cuerpo)['access']
+
+        self.stdout.write(
+            f"{options['peticiones']} peticiones por ruta, {options['concurrencia']} simultáneas "
+            f"contra {base} (async: {base_async})\n"
+        )
+        self.stdout.write(f"{'ruta':<36} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errores':>8}")
+        for ruta_sync, ruta_async in RUTAS:
+            for raiz, ruta in ((base, ruta_sync), (base_async, ruta_async)):
+                ruta = ruta.format(clase_id=options['clase'])
+                r = self._medir(raiz + ruta, token, options['peticiones'], options['concurrencia'])
+                self.stdout.write(f"{ruta:<36} {r['rps']:>8.1f} {r['p50']:>8.1f} {r['p95']:>8.1f} {r['errores']:>8}")
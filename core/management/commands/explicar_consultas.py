@@ -0,0 +1,86 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from core.models import Asistencia, Clase, Nota, Usuario
+
+# (descripción, índices que puede usar el plan, función que arma el queryset)
+CONSULTAS = [
+    (
+        "Grilla de asistencia de una clase (obtener_asistencia, exportar)",
+        ('asistencia_clase_fecha_idx',),
+        lambda clase, alumno_id: Asistencia.objects.filter(
+            clase=clase, fecha__in=list(clase.sesiones.values_list('fecha', flat=True))
+        ).values_list('alumno_id', 'fecha', 'presente'),
+    ),
+    (
+        "Presentes y ausentes por matrícula (reconstruir_contadores)",
+        ('asistencia_matricula_idx',),
+        lambda clase, alumno_id: Asistencia.objects.filter(clase=clase).values('alumno_id').annotate(
+            presentes=Count('pk', filter=Q(presente=True)), total=Count('pk'),
+        ),
+    ),
+    (
+        "Nota de una matrícula (director_alumno_cursos)",
+        # SQLite crea el índice de la restricción única con nombre propio
+        ('nota_unica_por_matricula', 'sqlite_autoindex_core_nota'),
+        lambda clase, alumno_id: Nota.objects.filter(alumno_id=alumno_id, clase=clase),
+    ),
+    (
+        "Cursos abiertos de un periodo (cursos-disponibles)",
+        ('clase_disponible_periodo_idx',),
+        lambda clase, alumno_id: Clase.objects.filter(periodo_id=clase.periodo_id, disponible=True),
+    ),
+    (
+        "Alumnos por apellido (alumnos-para-director, búsquedas)",
+        ('usuario_rol_nombre_idx',),
+        lambda clase, alumno_id: Usuario.objects.filter(rol='alumno').order_by('last_name', 'first_name')[:20],
+    ),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Muestra el plan (EXPLAIN ANALYZE en PostgreSQL, EXPLAIN QUERY PLAN en SQLite) de las "
+        "consultas más frecuentes de las vistas e indica si usan los índices de core/models.py."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clase', type=int, help="Clase de ejemplo (por defecto, la que tiene más alumnos).")
+        parser.add_argument(
+            '--sin-seqscan',
+            action='store_true',
+            help="PostgreSQL: desalienta los sequential scans (útil con pocos datos, donde el planificador prefiere leer la tabla entera).",
+        )
+
+    def handle(self, *args, **options):
+        clases = Clase.objects.annotate(inscritos=Count('alumnos')).order_by('-inscritos', 'pk')
+        if options['clase']:
+            clases = clases.filter(pk=options['clase'])
+        clase = clases.first()
+        if clase is None:
+            raise CommandError("No hay clases; carga datos (backup.sql o el sembrado de core/tests.py) antes de medir.")
+        alumno_id = clase.alumnos.values_list('id', flat=True).first()
+
+        postgres = connection.vendor == 'postgresql'
+        sin_uso = 0
+        # EXPLAIN ANALYZE ejecuta la consulta: se revierte todo al terminar
+        with transaction.atomic():
+            if postgres and options['sin_seqscan']:
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+
+            for descripcion, indices, armar in CONSULTAS:
+                queryset = armar(clase, alumno_id)
+                plan = queryset.explain(analyze=True, buffers=True) if postgres else queryset.explain()
+                usa_indice = any(indice in plan for indice in indices)
+                sin_uso += not usa_indice
+
+                self.stdout.write(self.style.MIGRATE_HEADING(descripcion))
+                self.stdout.write(plan)
+                if usa_indice:
+                    self.stdout.write(self.style.SUCCESS(f"usa {indices[0]}\n"))
+                else:
+                    self.stdout.write(self.style.WARNING(f"no usa {indices[0]}\n"))
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"Consultas que no usan su índice: {sin_uso} de {len(CONSULTAS)}.")
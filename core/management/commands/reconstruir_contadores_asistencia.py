@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from core.contadores import reconstruir_contadores, verificar_contadores
+
+
+class Command(BaseCommand):
+    help = "Reconstruye los contadores de asistencia por matrícula y reporta diferencias con Asistencia."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help="Solo verifica los contadores sin modificarlos; termina con error si hay diferencias.",
+        )
+
+    def handle(self, *args, **options):
+        if options['verificar']:
+            _, diferencias = verificar_contadores()
+        else:
+            with transaction.atomic():
+                diferencias = reconstruir_contadores()
+
+        for clase_id, alumno_id, guardado, esperado in diferencias:
+            self.stdout.write(
+                f"clase={clase_id} alumno={alumno_id} guardado={guardado} esperado={esperado}"
+            )
+
+        if options['verificar'] and diferencias:
+            raise CommandError(f"{len(diferencias)} contadores desactualizados.")
+
+        accion = "verificados" if options['verificar'] else "reconstruidos"
+        self.stdout.write(self.style.SUCCESS(
+            f"Contadores {accion}. Diferencias encontradas: {len(diferencias)}."
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from core.resumenes import reconstruir_resumenes
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula ResumenClase desde Nota, matrículas y contadores de asistencia. "
+        "Los periodos cerrados que ya tienen resumen se dejan como están salvo con --incluir-cerrados."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incluir-cerrados',
+            action='store_true',
+            help="También recalcula los periodos inactivos ya terminados (tras corregir notas antiguas).",
+        )
+
+    def handle(self, *args, **options):
+        clases = reconstruir_resumenes(incluir_cerrados=options['incluir_cerrados'])
+        self.stdout.write(self.style.SUCCESS(f"Resúmenes reconstruidos: {clases} clases."))
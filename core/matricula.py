@@ -0,0 +1,148 @@
+import csv
+import io
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from . import resumenes
+from .cache_respuestas import marcar_cambio_al_confirmar
+from .models import Clase, Nota, Usuario
+
+Matricula = Clase.alumnos.through
+
+
+class MatriculaRechazada(Exception):
+    """La matrícula no procede; el mensaje se muestra al alumno."""
+
+
+# -----------------------------
+# MATRÍCULA DEL ALUMNO (con cupo)
+# -----------------------------
+
+def con_inscritos(clases):
+    """Anota `inscritos` (alumnos matriculados) en cada clase con una subconsulta."""
+    return clases.annotate(inscritos=Coalesce(Subquery(
+        Matricula.objects.filter(clase_id=OuterRef('pk')).order_by()
+        .values('clase_id').annotate(n=Count('id')).values('n')[:1]
+    ), 0))
+
+
+def matricular(clase_id, alumno_id):
+    """
+    Matricula al alumno en una clase disponible respetando Clase.cupo.
+    La fila de la clase se bloquea (select_for_update) durante toda la
+    transacción, así las matrículas simultáneas a la misma clase se atienden
+    de a una y nunca se pasa del cupo ni se inscribe dos veces al alumno.
+    Devuelve la clase; lanza Clase.DoesNotExist o MatriculaRechazada.
+    """
+    with transaction.atomic():
+        clase = Clase.objects.select_for_update(of=('self',)).select_related('profesor_titular').get(pk=clase_id)
+        if not clase.disponible:
+            raise MatriculaRechazada("Curso no disponible")
+
+        ocupacion = Matricula.objects.filter(clase_id=clase.id).aggregate(
+            inscritos=Count('id'), propio=Count('id', filter=Q(usuario_id=alumno_id)),
+        )
+        if ocupacion['propio']:
+            raise MatriculaRechazada("Ya estás matriculado")
+        if clase.cupo is not None and ocupacion['inscritos'] >= clase.cupo:
+            raise MatriculaRechazada("Curso sin cupos")
+
+        Matricula.objects.create(clase_id=clase.id, usuario_id=alumno_id)
+        Nota.objects.bulk_create([Nota(alumno_id=alumno_id, clase_id=clase.id)], ignore_conflicts=True)
+        marcar_cambio_al_confirmar('matriculas', 'notas')
+        resumenes.marcar(matriculas={(clase.id, alumno_id)})
+    return clase
+
+
+# -----------------------------
+# MATRÍCULA MASIVA (pares alumno × clase)
+# -----------------------------
+
+
+def leer_csv(archivo):
+    """Filas {alumno_id, clase_id} de un CSV con esos encabezados (UTF-8, admite BOM de Excel)."""
+    texto = archivo.read().decode('utf-8-sig')
+    return list(csv.DictReader(io.StringIO(texto)))
+
+
+def inscribir(pares):
+    """
+    Inscribe los pares (clase_id, alumno_id) ya validados que todavía no
+    estén inscritos y les crea su Nota en cero si no la tienen (la restricción
+    única de Nota descarta las existentes). La lectura de los ya inscritos y
+    las inserciones masivas van en una sola transacción. No revisa Clase.cupo:
+    directores y profesores pueden inscribir por encima del cupo. Devuelve el
+    conjunto de pares nuevos.
+    """
+    pares = set(pares)
+    if not pares:
+        return set()
+    clase_ids = {clase_id for clase_id, _ in pares}
+    alumno_ids = {alumno_id for _, alumno_id in pares}
+
+    with transaction.atomic():
+        # Como en matricular(): las filas de las clases quedan bloqueadas desde
+        # la lectura de inscritos hasta el commit (en orden de pk para no cruzarse)
+        list(Clase.objects.select_for_update().filter(pk__in=clase_ids).order_by('pk').values_list('pk', flat=True))
+        existentes = set(Matricula.objects.filter(
+            clase_id__in=clase_ids, usuario_id__in=alumno_ids
+        ).values_list('clase_id', 'usuario_id'))
+        nuevos = pares - existentes
+        if not nuevos:
+            return nuevos
+
+        Matricula.objects.bulk_create(
+            [Matricula(clase_id=clase_id, usuario_id=alumno_id) for clase_id, alumno_id in nuevos],
+            ignore_conflicts=True,
+        )
+        Nota.objects.bulk_create(
+            [Nota(clase_id=clase_id, alumno_id=alumno_id) for clase_id, alumno_id in nuevos],
+            ignore_conflicts=True,
+        )
+        # bulk_create no dispara m2m_changed ni post_save
+        marcar_cambio_al_confirmar('matriculas', 'notas')
+        resumenes.marcar(matriculas=nuevos)
+    return nuevos
+
+
+def matricular_en_lote(filas):
+    """
+    Valida todas las filas {alumno_id, clase_id} con dos consultas (alumnos y
+    clases existentes) y, si ninguna tiene errores, las inscribe con inscribir().
+    Devuelve (resumen, errores); con errores no se inscribe a nadie.
+    """
+    errores = []
+    pares = []
+    for indice, fila in enumerate(filas):
+        if not isinstance(fila, dict):
+            errores.append({"fila": indice, "error": "Cada fila debe tener alumno_id y clase_id."})
+            continue
+        try:
+            pares.append((indice, int(fila.get("clase_id")), int(fila.get("alumno_id"))))
+        except (TypeError, ValueError):
+            errores.append({
+                "fila": indice, "alumno_id": fila.get("alumno_id"), "clase_id": fila.get("clase_id"),
+                "error": "alumno_id y clase_id deben ser números.",
+            })
+
+    clases = set(Clase.objects.filter(id__in={c for _, c, _ in pares}).values_list('id', flat=True))
+    alumnos = set(Usuario.objects.filter(
+        id__in={a for _, _, a in pares}, rol='alumno'
+    ).values_list('id', flat=True))
+
+    for indice, clase_id, alumno_id in pares:
+        if clase_id not in clases:
+            errores.append({"fila": indice, "alumno_id": alumno_id, "clase_id": clase_id, "error": "Clase no encontrada."})
+        elif alumno_id not in alumnos:
+            errores.append({"fila": indice, "alumno_id": alumno_id, "clase_id": clase_id, "error": "Alumno no encontrado."})
+
+    resumen = {"recibidos": len(filas), "matriculados": 0, "ya_matriculados": 0}
+    if errores:
+        errores.sort(key=lambda error: error["fila"])
+        return resumen, errores
+
+    solicitados = {(clase_id, alumno_id) for _, clase_id, alumno_id in pares}
+    nuevos = inscribir(solicitados)
+    resumen["matriculados"] = len(nuevos)
+    resumen["ya_matriculados"] = len(solicitados) - len(nuevos)
+    return resumen, errores
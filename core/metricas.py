@@ -0,0 +1,88 @@
+from decimal import Decimal
+from django.db.models import Case, CharField, DecimalField, F, FloatField, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Cast, Coalesce, Round
+from django.db.models.lookups import GreaterThanOrEqual
+from .models import ContadorAsistencia
+
+# -----------------------------
+# EXPRESIONES SQL PARA LAS MÉTRICAS DE NOTA
+# -----------------------------
+# Replican en la base de datos los cálculos de Nota.participacion_promedio,
+# Nota.promedio, Nota.calcular_asistencia() y Nota.estado_aprobacion().
+# `prefijo` permite usarlas desde otro modelo (por ejemplo 'nota__' desde Clase).
+
+PESO_PARTICIPACION_1 = Decimal('0.1333')  # 13.33%
+PESO_PARTICIPACION_2 = Decimal('0.1333')  # 13.33%
+PESO_PARTICIPACION_3 = Decimal('0.1334')  # 13.34%
+PESO_TAREAS = Decimal('0.40')             # 40%
+PESO_EXAMEN = Decimal('0.20')             # 20%
+
+NOTA_MINIMA_APROBATORIA = 14
+ASISTENCIA_MINIMA = 75
+
+CAMPOS_NOTA = ('participacion_1', 'participacion_2', 'participacion_3', 'tareas', 'examen_final')
+
+
+def _decimal(max_digits=6):
+    return DecimalField(max_digits=max_digits, decimal_places=2)
+
+
+def participacion_promedio_expr(prefijo=''):
+    return Round(
+        F(f'{prefijo}participacion_1') * Value(PESO_PARTICIPACION_1)
+        + F(f'{prefijo}participacion_2') * Value(PESO_PARTICIPACION_2)
+        + F(f'{prefijo}participacion_3') * Value(PESO_PARTICIPACION_3),
+        2,
+        output_field=_decimal(),
+    )
+
+
+def promedio_expr(prefijo=''):
+    return Round(
+        participacion_promedio_expr(prefijo)
+        + F(f'{prefijo}tareas') * Value(PESO_TAREAS)
+        + F(f'{prefijo}examen_final') * Value(PESO_EXAMEN),
+        2,
+        output_field=_decimal(),
+    )
+
+
+def presentes_subquery(clase_ref, alumno_ref):
+    """Asistencias presentes del alumno en la clase leídas de ContadorAsistencia (0 si no hay registro)."""
+    presentes = ContadorAsistencia.objects.filter(
+        clase=OuterRef(clase_ref),
+        alumno=OuterRef(alumno_ref),
+    ).values('presentes')[:1]
+    return Coalesce(Subquery(presentes), 0)
+
+
+def asistencia_pct_expr(presentes, total_sesiones_ref):
+    """Porcentaje de asistencia redondeado a 2 decimales; total_sesiones=0 cuenta como 1."""
+    total = Case(
+        When(**{total_sesiones_ref: 0}, then=Value(1)),
+        default=F(total_sesiones_ref),
+        output_field=IntegerField(),
+    )
+    # Se convierte antes de dividir: en SQLite un decimal entero (100.00) se guarda
+    # como 100 y presentes * 100 / total sería una división entera
+    return Round(Cast(presentes, FloatField()) * Value(100.0) / total, 2, output_field=_decimal())
+
+
+def pendiente_q(prefijo=''):
+    condicion = Q()
+    for campo in CAMPOS_NOTA:
+        condicion |= Q(**{f'{prefijo}{campo}': 0})
+    return condicion
+
+
+def estado_expr(promedio, asistencia, prefijo=''):
+    return Case(
+        When(pendiente_q(prefijo), then=Value('Pendiente')),
+        When(
+            Q(GreaterThanOrEqual(promedio, NOTA_MINIMA_APROBATORIA))
+            & Q(GreaterThanOrEqual(asistencia, ASISTENCIA_MINIMA)),
+            then=Value('Aprobado'),
+        ),
+        default=Value('Desaprobado'),
+        output_field=CharField(),
+    )
@@ -0,0 +1,80 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('core.instrumentacion')
+
+# -----------------------------
+# INSTRUMENTACIÓN SQL Y DE TIEMPOS POR PETICIÓN
+# -----------------------------
+
+class _RegistroConsultas:
+    """execute_wrapper que acumula cantidad, tiempo total y la consulta más lenta."""
+
+    def __init__(self):
+        self.cantidad = 0
+        self.tiempo = 0.0
+        self.mas_lenta = (0.0, '')
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            self.cantidad += 1
+            self.tiempo += duracion
+            if duracion > self.mas_lenta[0]:
+                self.mas_lenta = (duracion, sql)
+
+
+class InstrumentacionSQLMiddleware:
+    """
+    Registra por petición la ruta resuelta, cantidad de consultas, tiempo en base
+    de datos, la consulta más lenta y la latencia total. Agrega un encabezado
+    Server-Timing y escribe una línea JSON en el logger 'core.instrumentacion'.
+
+    Se activa con INSTRUMENTACION_MUESTREO (fracción de peticiones entre 0 y 1);
+    con 0 el middleware se desactiva por completo.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.muestreo = float(getattr(settings, 'INSTRUMENTACION_MUESTREO', 0))
+        if self.muestreo <= 0:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        if self.muestreo < 1 and random.random() >= self.muestreo:
+            return self.get_response(request)
+
+        registro = _RegistroConsultas()
+        inicio = time.perf_counter()
+        with ExitStack() as pila:
+            for conexion in connections.all():
+                pila.enter_context(conexion.execute_wrapper(registro))
+            response = self.get_response(request)
+        total = time.perf_counter() - inicio
+
+        match = getattr(request, 'resolver_match', None)
+        ruta = match.view_name if match else None
+        response['Server-Timing'] = (
+            f'db;dur={registro.tiempo * 1000:.1f};desc="{registro.cantidad} consultas", '
+            f'total;dur={total * 1000:.1f}'
+        )
+        logger.info(json.dumps({
+            'ruta': ruta,
+            'metodo': request.method,
+            'estado': response.status_code,
+            'consultas': registro.cantidad,
+            'db_ms': round(registro.tiempo * 1000, 1),
+            'total_ms': round(total * 1000, 1),
+            'consulta_mas_lenta_ms': round(registro.mas_lenta[0] * 1000, 1),
+            'consulta_mas_lenta': registro.mas_lenta[1][:300],
+        }, ensure_ascii=False))
+        return response
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.3 on 2026-10-16 22:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def poblar_contadores(apps, schema_editor):
+    Asistencia = apps.get_model('core', 'Asistencia')
+    ContadorAsistencia = apps.get_model('core', 'ContadorAsistencia')
+    filas = Asistencia.objects.order_by().values('clase_id', 'alumno_id').annotate(
+        presentes=Count('pk', filter=Q(presente=True)),
+        ausentes=Count('pk', filter=Q(presente=False)),
+    )
+    ContadorAsistencia.objects.bulk_create(
+        [
+            ContadorAsistencia(
+                clase_id=fila['clase_id'],
+                alumno_id=fila['alumno_id'],
+                presentes=fila['presentes'],
+                ausentes=fila['ausentes'],
+                total=fila['presentes'] + fila['ausentes'],
+            )
+            for fila in filas
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_clase_disponible'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorAsistencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('presentes', models.PositiveIntegerField(default=0)),
+                ('ausentes', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('alumno', models.ForeignKey(limit_choices_to={'rol': 'alumno'}, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('clase', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contadores_asistencia', to='core.clase')),
+            ],
+            options={
+                'unique_together': {('clase', 'alumno')},
+            },
+        ),
+        migrations.RunPython(poblar_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+from django.db import migrations
+
+# Índice de búsqueda de usuarios para PostgreSQL (ver core/busqueda.py).
+# core_normalizar y core_documento_busqueda son IMMUTABLE para poder indexarlas;
+# unaccent() no lo es porque depende del search_path, por eso se llama con el
+# diccionario calificado.
+
+CREAR = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """
+    CREATE OR REPLACE FUNCTION core_normalizar(texto text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS
+    $$ SELECT lower(public.unaccent('public.unaccent'::regdictionary, texto)) $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION core_documento_busqueda(
+        username text, first_name text, last_name text, email text
+    ) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS
+    $$ SELECT core_normalizar(concat_ws(' ', username, first_name, last_name, email)) $$
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS core_usuario_busqueda_trgm ON core_usuario
+    USING gin (core_documento_busqueda(username, first_name, last_name, email) gin_trgm_ops)
+    """,
+]
+
+ELIMINAR = [
+    "DROP INDEX IF EXISTS core_usuario_busqueda_trgm",
+    "DROP FUNCTION IF EXISTS core_documento_busqueda(text, text, text, text)",
+    "DROP FUNCTION IF EXISTS core_normalizar(text)",
+]
+
+
+def _ejecutar(sentencias):
+    def operacion(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for sentencia in sentencias:
+            schema_editor.execute(sentencia)
+    return operacion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_contadorasistencia'),
+    ]
+
+    operations = [
+        migrations.RunPython(_ejecutar(CREAR), _ejecutar(ELIMINAR)),
+    ]
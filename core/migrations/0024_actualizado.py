@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-16 22:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_busqueda_trigramas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asistencia',
+            name='actualizado',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='clase',
+            name='actualizado',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='nota',
+            name='actualizado',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='recursocurso',
+            name='actualizado',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-16 22:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_actualizado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clase',
+            name='cupo',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
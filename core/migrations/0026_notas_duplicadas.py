@@ -0,0 +1,45 @@
+import json
+import logging
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import migrations
+from django.db.models import Count, Min
+
+logger = logging.getLogger(__name__)
+
+
+def eliminar_notas_duplicadas(apps, schema_editor):
+    """
+    Deja una sola Nota por (alumno, clase) antes de crear la restricción única.
+    Se conserva la de menor id, que es la que mostraba la hoja de notas
+    (.first() ordena por pk). Las demás se escriben en el log antes de
+    borrarlas (el disco del servidor no es persistente).
+    """
+    Nota = apps.get_model('core', 'Nota')
+    duplicadas = (
+        Nota.objects.order_by().values('alumno_id', 'clase_id')
+        .annotate(cantidad=Count('id'), primera=Min('id')).filter(cantidad__gt=1)
+    )
+    sobrantes = []
+    for fila in duplicadas:
+        sobrantes += Nota.objects.filter(
+            alumno_id=fila['alumno_id'], clase_id=fila['clase_id']
+        ).exclude(id=fila['primera']).order_by('id').values()
+    if not sobrantes:
+        return
+
+    logger.warning("Se eliminan %s notas duplicadas", len(sobrantes))
+    for nota in sobrantes:
+        logger.warning("Nota duplicada eliminada: %s", json.dumps(nota, cls=DjangoJSONEncoder))
+    Nota.objects.filter(id__in=[nota['id'] for nota in sobrantes]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_clase_cupo'),
+    ]
+
+    operations = [
+        # Al revertir no hay nada que deshacer: las notas borradas quedan en el log
+        migrations.RunPython(eliminar_notas_duplicadas, migrations.RunPython.noop),
+    ]
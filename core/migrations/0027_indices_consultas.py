@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-16 22:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_notas_duplicadas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='asistencia',
+            index=models.Index(fields=['clase', 'fecha'], name='asistencia_clase_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='asistencia',
+            index=models.Index(fields=['clase', 'alumno', 'presente'], name='asistencia_matricula_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clase',
+            index=models.Index(condition=models.Q(('disponible', True)), fields=['periodo'], name='clase_disponible_periodo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['rol', 'last_name', 'first_name'], name='usuario_rol_nombre_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='nota',
+            constraint=models.UniqueConstraint(fields=('alumno', 'clase'), name='nota_unica_por_matricula'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-16 23:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenClase',
+            fields=[
+                ('clase', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumen', serialize=False, to='core.clase')),
+                ('inscritos', models.PositiveIntegerField(default=0)),
+                ('con_notas', models.PositiveIntegerField(default=0)),
+                ('aprobados', models.PositiveIntegerField(default=0)),
+                ('promedio', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('asistencia_promedio', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('periodo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.periodoacademico')),
+            ],
+        ),
+    ]
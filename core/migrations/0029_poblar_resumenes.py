@@ -0,0 +1,72 @@
+from decimal import ROUND_HALF_UP, Decimal
+from django.db import migrations
+
+# Las fórmulas de core/metricas.py copiadas tal como estaban al crear
+# ResumenClase: la migración no debe depender del código vigente.
+PESOS_PARTICIPACION = (Decimal('0.1333'), Decimal('0.1333'), Decimal('0.1334'))
+PESO_TAREAS = Decimal('0.40')
+PESO_EXAMEN = Decimal('0.20')
+NOTA_MINIMA_APROBATORIA = 14
+ASISTENCIA_MINIMA = 75
+CAMPOS_NOTA = ('participacion_1', 'participacion_2', 'participacion_3', 'tareas', 'examen_final')
+
+
+def _redondear(valor):
+    return Decimal(valor).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def _promedio(valores):
+    return _redondear(sum(valores) / len(valores)) if valores else Decimal('0')
+
+
+def poblar_resumenes(apps, schema_editor):
+    Clase = apps.get_model('core', 'Clase')
+    Nota = apps.get_model('core', 'Nota')
+    ContadorAsistencia = apps.get_model('core', 'ContadorAsistencia')
+    ResumenClase = apps.get_model('core', 'ResumenClase')
+
+    presentes = {
+        (clase_id, alumno_id): cantidad
+        for clase_id, alumno_id, cantidad in ContadorAsistencia.objects.values_list('clase_id', 'alumno_id', 'presentes')
+    }
+    inscritos = {}
+    for clase_id in Clase.alumnos.through.objects.values_list('clase_id', flat=True):
+        inscritos[clase_id] = inscritos.get(clase_id, 0) + 1
+
+    notas = {}  # clase_id -> [(promedio, asistencia, aprobado)]
+    for nota in Nota.objects.values('clase_id', 'alumno_id', 'clase__total_sesiones', *CAMPOS_NOTA).iterator():
+        participacion = _redondear(sum(
+            nota[campo] * peso for campo, peso in zip(CAMPOS_NOTA, PESOS_PARTICIPACION)
+        ))
+        promedio = _redondear(participacion + nota['tareas'] * PESO_TAREAS + nota['examen_final'] * PESO_EXAMEN)
+        total = nota['clase__total_sesiones'] or 1
+        asistencia = _redondear(Decimal(presentes.get((nota['clase_id'], nota['alumno_id']), 0) * 100) / total)
+        aprobado = (
+            all(nota[campo] != 0 for campo in CAMPOS_NOTA)
+            and promedio >= NOTA_MINIMA_APROBATORIA and asistencia >= ASISTENCIA_MINIMA
+        )
+        notas.setdefault(nota['clase_id'], []).append((promedio, asistencia, aprobado))
+
+    ResumenClase.objects.bulk_create([
+        ResumenClase(
+            clase_id=clase_id,
+            periodo_id=periodo_id,
+            inscritos=inscritos.get(clase_id, 0),
+            con_notas=len(notas.get(clase_id, [])),
+            aprobados=sum(1 for _, _, aprobado in notas.get(clase_id, []) if aprobado),
+            promedio=_promedio([promedio for promedio, _, _ in notas.get(clase_id, [])]),
+            asistencia_promedio=_promedio([asistencia for _, asistencia, _ in notas.get(clase_id, [])]),
+        )
+        for clase_id, periodo_id in Clase.objects.values_list('pk', 'periodo_id').iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_resumenes'),
+    ]
+
+    operations = [
+        migrations.RunPython(poblar_resumenes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-16 23:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_poblar_resumenes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='horario',
+            name='actualizado',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='nivel',
+            name='actualizado',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='periodoacademico',
+            name='actualizado',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='actualizado',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -1,8 +1,9 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models import F
 from django.utils import timezone
 from datetime import date
-from decimal import Decimal
+from decimal import ROUND_HALF_UP, Decimal
 
 # -----------------------------
 # MODELO DE USUARIO PERSONALIZADO
@@ -26,6 +27,13 @@ class Usuario(AbstractUser):
     nuevo_creyente = models.BooleanField(default=False)
     bautizado = models.BooleanField(default=False)
     tiene_ministerio = models.BooleanField(default=False)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Listados y búsquedas de alumnos/profesores ordenados por apellido
+            models.Index(fields=['rol', 'last_name', 'first_name'], name='usuario_rol_nombre_idx'),
+        ]
 
     def edad(self):
         if self.fecha_nacimiento:
@@ -44,6 +52,7 @@ class Usuario(AbstractUser):
 # -----------------------------
 class Nivel(models.Model):
     nombre = models.CharField(max_length=50, unique=True)
+    actualizado = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.nombre
@@ -64,6 +73,7 @@ class Horario(models.Model):
     ]
     dia = models.CharField(max_length=16, choices=DIAS_SEMANA)
     hora = models.TimeField()
+    actualizado = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.get_dia_display()} - {self.hora.strftime('%I:%M %p')}"
@@ -78,6 +88,7 @@ class PeriodoAcademico(models.Model):
     fecha_inicio = models.DateField()
     fecha_fin = models.DateField()
     activo = models.BooleanField(default=False)
+    actualizado = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.nombre} ({self.anio})"
@@ -101,6 +112,15 @@ class Clase(models.Model):
     alumnos = models.ManyToManyField(Usuario, limit_choices_to={'rol': 'alumno'}, blank=True)
     total_sesiones = models.PositiveIntegerField()
     disponible = models.BooleanField(default=False)  
+    # Cupos para la matrícula de los propios alumnos (vacío = sin límite)
+    cupo = models.PositiveIntegerField(null=True, blank=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Cursos abiertos a matrícula, por periodo
+            models.Index(fields=['periodo'], condition=models.Q(disponible=True), name='clase_disponible_periodo_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nombre} — {self.nivel} ({self.periodo})"
@@ -115,19 +135,84 @@ class Asistencia(models.Model):
     clase = models.ForeignKey(Clase, on_delete=models.CASCADE)
     fecha = models.DateField(default=timezone.now)
     presente = models.BooleanField(default=False)
+    actualizado = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('alumno', 'clase', 'fecha')
+        indexes = [
+            # Grilla y reportes: asistencias de una clase en ciertas fechas
+            models.Index(fields=['clase', 'fecha'], name='asistencia_clase_fecha_idx'),
+            # Conteo de presentes/ausentes por matrícula (contadores), sin leer la tabla
+            models.Index(fields=['clase', 'alumno', 'presente'], name='asistencia_matricula_idx'),
+        ]
 
     def __str__(self):
         estado = "Presente" if self.presente else "Ausente"
         return f"{self.alumno.username} - {estado} ({self.fecha})"
 
 
+# -----------------------------
+# CONTADOR DE ASISTENCIA (por matrícula)
+# -----------------------------
+class ContadorAsistencia(models.Model):
+    """Totales de asistencia por (clase, alumno) mantenidos en core/contadores.py."""
+    clase = models.ForeignKey(Clase, on_delete=models.CASCADE, related_name='contadores_asistencia')
+    alumno = models.ForeignKey(Usuario, on_delete=models.CASCADE, limit_choices_to={'rol': 'alumno'})
+    presentes = models.PositiveIntegerField(default=0)
+    ausentes = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('clase', 'alumno')
+
+    def __str__(self):
+        return f"{self.alumno_id} en {self.clase_id}: {self.presentes}/{self.total}"
+
+
+# -----------------------------
+# RESÚMENES POR CLASE (materializados)
+# -----------------------------
+class ResumenClase(models.Model):
+    """Totales de una clase para las pantallas del director, mantenidos en core/resumenes.py."""
+    clase = models.OneToOneField(Clase, on_delete=models.CASCADE, primary_key=True, related_name='resumen')
+    periodo = models.ForeignKey(PeriodoAcademico, on_delete=models.CASCADE, null=True, blank=True)
+    inscritos = models.PositiveIntegerField(default=0)
+    con_notas = models.PositiveIntegerField(default=0)
+    aprobados = models.PositiveIntegerField(default=0)
+    promedio = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    asistencia_promedio = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.clase_id}: {self.aprobados}/{self.inscritos}"
+
+
 # -----------------------------
 # makegrS
 # -----------------------------
 
+def redondear(valor):
+    """A 2 decimales con los empates hacia arriba, como ROUND() en SQL (core/metricas.py)."""
+    return Decimal(valor).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+class NotaQuerySet(models.QuerySet):
+    def with_metrics(self):
+        """
+        Anota participación promedio, promedio, porcentaje de asistencia y estado
+        calculados en SQL con los mismos pesos y redondeo que las propiedades de Nota.
+        """
+        from .metricas import asistencia_pct_expr, estado_expr, participacion_promedio_expr, presentes_subquery, promedio_expr
+
+        return self.annotate(
+            metrica_participacion_promedio=participacion_promedio_expr(),
+            metrica_promedio=promedio_expr(),
+            metrica_asistencia=asistencia_pct_expr(presentes_subquery('clase', 'alumno'), 'clase__total_sesiones'),
+        ).annotate(
+            metrica_estado=estado_expr(F('metrica_promedio'), F('metrica_asistencia')),
+        )
+
+
 class Nota(models.Model):
     alumno = models.ForeignKey(Usuario, on_delete=models.CASCADE, limit_choices_to={'rol': 'alumno'})
     clase = models.ForeignKey(Clase, on_delete=models.CASCADE)
@@ -139,31 +224,77 @@ class Nota(models.Model):
     
     tareas = models.DecimalField(max_digits=4, decimal_places=2, default=0)         # 40%
     examen_final = models.DecimalField(max_digits=4, decimal_places=2, default=0)   # 20%
+    actualizado = models.DateTimeField(auto_now=True)
+
+    objects = NotaQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # Una nota por matrícula; permite guardarlas con upsert
+            models.UniqueConstraint(fields=['alumno', 'clase'], name='nota_unica_por_matricula'),
+        ]
+
+    # Campos de los que salen las métricas anotadas por with_metrics()
+    CAMPOS_METRICAS = (
+        'alumno_id', 'clase_id', 'participacion_1', 'participacion_2', 'participacion_3', 'tareas', 'examen_final',
+    )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        nota = super().from_db(db, field_names, values)
+        nota._leidos = nota._valores_metricas()
+        return nota
+
+    def _valores_metricas(self):
+        return tuple(self.__dict__.get(campo) for campo in self.CAMPOS_METRICAS)
+
+    def _metrica(self, nombre):
+        """
+        La anotación `nombre` de with_metrics(), o None si no se anotó o si la
+        nota cambió desde que se leyó (entonces se recalcula en Python).
+        """
+        if nombre in self.__dict__ and getattr(self, '_leidos', None) == self._valores_metricas():
+            return self.__dict__[nombre]
+        return None
 
     @property
     def participacion_promedio(self):
         """Calcula el promedio ponderado de las tres participaciones"""
+        metrica = self._metrica('metrica_participacion_promedio')
+        if metrica is not None:
+            return metrica
         peso_1 = Decimal('0.1333')  # 13.33%
         peso_2 = Decimal('0.1333')  # 13.33%
         peso_3 = Decimal('0.1334')  # 13.34%
-        return round((self.participacion_1 * peso_1) + (self.participacion_2 * peso_2) + (self.participacion_3 * peso_3), 2)
+        return redondear((self.participacion_1 * peso_1) + (self.participacion_2 * peso_2) + (self.participacion_3 * peso_3))
 
     @property
     def promedio(self):
         """Calcula el promedio final considerando los nuevos pesos"""
+        metrica = self._metrica('metrica_promedio')
+        if metrica is not None:
+            return metrica
         participacion_total = self.participacion_promedio
         tareas_ponderado = self.tareas * Decimal('0.40')  # 40%
         examen_ponderado = self.examen_final * Decimal('0.20')  # 20%
-        return round(participacion_total + tareas_ponderado + examen_ponderado, 2)
+        return redondear(participacion_total + tareas_ponderado + examen_ponderado)
 
     def calcular_asistencia(self):
+        metrica = self._metrica('metrica_asistencia')
+        if metrica is not None:
+            return float(metrica)
         total = self.clase.total_sesiones or 1
         if total == 0:
             return 0
-        presentes = Asistencia.objects.filter(clase=self.clase, alumno=self.alumno, presente=True).count()
-        return round((presentes / total) * 100, 2)
+        presentes = ContadorAsistencia.objects.filter(
+            clase_id=self.clase_id, alumno_id=self.alumno_id
+        ).values_list('presentes', flat=True).first() or 0
+        return float(redondear(Decimal(presentes * 100) / total))
 
     def estado_aprobacion(self):
+        metrica = self._metrica('metrica_estado')
+        if metrica is not None:
+            return metrica
         # Verificar si todas las notas están completas (mayor que 0)
         if (self.participacion_1 == 0 or self.participacion_2 == 0 or self.participacion_3 == 0 or 
             self.tareas == 0 or self.examen_final == 0):
@@ -205,6 +336,7 @@ class RecursoCurso(models.Model):
         ('website_red_social', 'Website o Red Social')
     ])
     fecha = models.DateTimeField(auto_now_add=True)
+    actualizado = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.titulo} ({self.clase.nombre})"
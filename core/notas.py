@@ -0,0 +1,73 @@
+from rest_framework import serializers
+from . import resumenes
+from .cache_respuestas import marcar_cambio_al_confirmar
+from .metricas import CAMPOS_NOTA
+from .models import Nota
+from .serializers import NotaFilaSerializer
+
+# -----------------------------
+# GUARDADO MASIVO DE LA HOJA DE NOTAS
+# -----------------------------
+
+def _con_ceros(fila):
+    # Como antes, las notas vacías o nulas se guardan como 0
+    if not isinstance(fila, dict):
+        return fila
+    return {**fila, **{campo: 0 for campo in CAMPOS_NOTA if not fila.get(campo)}}
+
+
+def guardar_hoja_notas(clase, filas):
+    """
+    Valida la hoja completa con NotaFilaSerializer (los mismos DecimalField del
+    modelo) y que cada alumno pertenezca a la clase. Si alguna fila tiene
+    errores no se escribe nada. Si no, lee las notas existentes en una sola
+    consulta y guarda las filas que cambian con un único upsert.
+    Devuelve (resumen, errores); los errores indican la fila y el alumno_id.
+    """
+    validador = NotaFilaSerializer()
+    inscritos = set(clase.alumnos.values_list('id', flat=True))
+
+    errores = []
+    hoja = {}
+    for indice, fila in enumerate(filas):
+        alumno_id = fila.get("alumno_id") if isinstance(fila, dict) else None
+        try:
+            datos = validador.run_validation(_con_ceros(fila))
+        except serializers.ValidationError as e:
+            errores.append({"fila": indice, "alumno_id": alumno_id, "error": e.detail})
+            continue
+        if datos["alumno_id"] not in inscritos:
+            errores.append({"fila": indice, "alumno_id": alumno_id, "error": "El alumno no pertenece a la clase."})
+            continue
+        hoja[datos["alumno_id"]] = datos  # si un alumno se repite, vale la última fila
+
+    resumen = {"insertados": 0, "actualizados": 0, "sin_cambios": 0}
+    if errores:
+        return resumen, errores
+
+    registradas = {
+        nota["alumno_id"]: nota
+        for nota in Nota.objects.filter(clase=clase, alumno_id__in=hoja).values("alumno_id", *CAMPOS_NOTA)
+    }
+    cambios = [
+        alumno_id for alumno_id, datos in hoja.items()
+        if alumno_id not in registradas
+        or any(registradas[alumno_id][campo] != datos[campo] for campo in CAMPOS_NOTA)
+    ]
+
+    if cambios:
+        # Upsert sobre la restricción única (alumno, clase); actualizado lo fija auto_now
+        Nota.objects.bulk_create(
+            [Nota(clase=clase, alumno_id=alumno_id, **{campo: hoja[alumno_id][campo] for campo in CAMPOS_NOTA})
+             for alumno_id in cambios],
+            update_conflicts=True,
+            unique_fields=('alumno', 'clase'),
+            update_fields=CAMPOS_NOTA + ('actualizado',),
+        )
+        marcar_cambio_al_confirmar('notas')
+        resumenes.marcar(matriculas={(clase.id, alumno_id) for alumno_id in cambios})
+
+    resumen["insertados"] = sum(1 for alumno_id in cambios if alumno_id not in registradas)
+    resumen["actualizados"] = len(cambios) - resumen["insertados"]
+    resumen["sin_cambios"] = len(hoja) - resumen["insertados"] - resumen["actualizados"]
+    return resumen, errores
@@ -0,0 +1,124 @@
+import threading
+from datetime import date
+from django.db import transaction
+from django.db.models import Avg, Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import Exact
+from . import catalogos
+from .cache_respuestas import marcar_cambio, marcar_cambio_al_confirmar
+from .metricas import asistencia_pct_expr, estado_expr, presentes_subquery, promedio_expr
+from .models import Clase, ResumenClase
+
+# -----------------------------
+# RESÚMENES POR CLASE (ResumenClase)
+# -----------------------------
+# Inscritos, aprobados, promedio y asistencia promedio de cada clase, con las
+# mismas fórmulas SQL de core/metricas.py. Quien cambia notas, asistencias o
+# matrículas llama a marcar(); el recálculo se hace una sola vez al confirmar
+# la transacción y solo para las clases marcadas. Los periodos cerrados
+# (inactivos y ya terminados) no cambian: una vez que tienen su resumen no se
+# recalculan salvo con reconstruir_resumenes.
+
+CAMPOS_RESUMEN = ('con_notas', 'aprobados', 'promedio', 'asistencia_promedio')
+
+_pendientes = threading.local()
+
+
+def periodos_cerrados():
+    hoy = date.today()
+    return {
+        periodo_id for periodo_id, periodo in catalogos.catalogo()["periodos"].items()
+        if not periodo["activo"] and periodo["fecha_fin"] < hoy
+    }
+
+
+def metricas_por_clase(clases):
+    """Anota en `clases` las métricas de ResumenClase en una sola consulta agregada."""
+    inscritos = Clase.alumnos.through.objects.filter(
+        clase=OuterRef('pk')
+    ).order_by().values('clase').annotate(total=Count('pk')).values('total')
+    asistencia = asistencia_pct_expr(presentes_subquery('pk', 'nota__alumno'), 'total_sesiones')
+    promedio = promedio_expr('nota__')
+    estado = estado_expr(promedio, asistencia, 'nota__')
+    return clases.annotate(
+        total_inscritos=Coalesce(Subquery(inscritos), 0),
+        total_con_notas=Count('nota'),
+        total_aprobados=Count('nota', filter=Q(Exact(estado, 'Aprobado'))),
+        promedio_notas=Avg(promedio, filter=Q(nota__isnull=False)),
+        asistencia_prom=Avg(asistencia, filter=Q(nota__isnull=False)),
+    )
+
+
+def _redondear(valor):
+    return round(valor or 0, 2)
+
+
+def refrescar_clases(clase_ids, incluir_cerrados=False):
+    clases = Clase.objects.filter(pk__in=clase_ids)
+    if not incluir_cerrados:
+        clases = clases.exclude(periodo_id__in=periodos_cerrados(), resumen__isnull=False)
+    filas = metricas_por_clase(clases).order_by().values_list(
+        'pk', 'periodo_id', 'total_inscritos', 'total_con_notas', 'total_aprobados', 'promedio_notas', 'asistencia_prom',
+    )
+    ResumenClase.objects.bulk_create(
+        [
+            ResumenClase(
+                clase_id=clase_id, periodo_id=periodo_id, inscritos=inscritos, con_notas=con_notas,
+                aprobados=aprobados, promedio=_redondear(promedio), asistencia_promedio=_redondear(asistencia),
+            )
+            for clase_id, periodo_id, inscritos, con_notas, aprobados, promedio, asistencia in filas
+        ],
+        update_conflicts=True,
+        unique_fields=('clase',),
+        update_fields=('periodo', 'inscritos') + CAMPOS_RESUMEN + ('actualizado',),
+    )
+
+
+# -----------------------------
+# REFRESCO INCREMENTAL
+# -----------------------------
+
+def _pendiente():
+    if not hasattr(_pendientes, 'clases'):
+        _pendientes.clases = set()
+    return _pendientes
+
+
+def marcar(clases=(), matriculas=()):
+    """
+    Programa el recálculo al confirmar la transacción (enseguida fuera de una).
+    clases: ids de clase cuyo resumen cambia.
+    matriculas: pares (clase_id, alumno_id) con notas, asistencia o matrícula nuevas.
+    """
+    pendiente = _pendiente()
+    pendiente.clases.update(clases)
+    pendiente.clases.update(clase_id for clase_id, _ in matriculas)
+    # Cada llamada registra su callback; el primero vacía todo lo pendiente.
+    # Si la transacción se revierte lo marcado se recalcula con el próximo commit.
+    transaction.on_commit(refrescar_pendientes)
+
+
+def refrescar_pendientes():
+    pendiente = _pendiente()
+    clases = pendiente.clases
+    if not clases:
+        return
+    pendiente.clases = set()
+    with transaction.atomic():
+        refrescar_clases(clases)
+    # Recién ahora: una respuesta cacheada antes de esto tendría el resumen viejo
+    marcar_cambio('resumenes')
+
+
+# -----------------------------
+# RECONSTRUCCIÓN COMPLETA
+# -----------------------------
+
+def reconstruir_resumenes(incluir_cerrados=False):
+    """
+    Recalcula todos los resúmenes (los de periodos cerrados solo con
+    incluir_cerrados o si todavía no existen). Devuelve cuántos hay.
+    """
+    refrescar_clases(Clase.objects.values('pk'), incluir_cerrados)
+    marcar_cambio_al_confirmar('resumenes')
+    return ResumenClase.objects.count()
@@ -0,0 +1,171 @@
+from datetime import date
+from django.conf import settings
+from django.db.models import Q
+from rest_framework import serializers
+from . import catalogos
+from .models import Clase
+
+# -----------------------------
+# SERIALIZACIÓN RÁPIDA (solo lectura)
+# -----------------------------
+# Arman las mismas respuestas que NotaSerializer, ClaseProfesorSerializer y
+# ProfesorListaSerializer directamente desde values(), con los campos
+# calculados en SQL o en el caché de catálogos, sin SerializerMethodField ni
+# consultas por fila. Cada vista elige el camino con serializacion_rapida().
+
+# Campos de DRF usados solo para dar el mismo formato que los serializers
+_DECIMAL_NOTA = serializers.DecimalField(max_digits=4, decimal_places=2)
+_FECHA = serializers.DateField()
+
+
+def serializacion_rapida(vista):
+    """True si la vista `vista` debe usar el camino rápido (settings.SERIALIZACION_RAPIDA)."""
+    return vista in getattr(settings, 'SERIALIZACION_RAPIDA', ())
+
+
+def _edad(fecha_nacimiento):
+    if not fecha_nacimiento:
+        return None
+    hoy = date.today()
+    return hoy.year - fecha_nacimiento.year - (
+        (hoy.month, hoy.day) < (fecha_nacimiento.month, fecha_nacimiento.day)
+    )
+
+
+# ------------------------------
+# Notas (NotaSerializer)
+# ------------------------------
+
+CAMPOS_NOTA_RAPIDA = (
+    'id', 'alumno_id', 'alumno__username', 'clase_id', 'clase__nombre',
+    'clase__nivel__nombre', 'clase__periodo__nombre',
+    'clase__profesor_titular_id', 'clase__profesor_titular__first_name',
+    'clase__profesor_titular__last_name', 'clase__profesor_titular__telefono',
+    'participacion_1', 'participacion_2', 'participacion_3', 'tareas', 'examen_final',
+    'metrica_participacion_promedio', 'metrica_promedio', 'metrica_asistencia', 'metrica_estado',
+)
+
+
+def nota_rapida(f, datos=None, por_clase=None):
+    """
+    Una fila de values(*CAMPOS_NOTA_RAPIDA). `datos` es el catálogo ya leído
+    (vistas async) y `por_clase` los horarios de catalogos.horarios_por_clase.
+    """
+    tiene_titular = f['clase__profesor_titular_id'] is not None
+    nombre_titular = f"{f['clase__profesor_titular__first_name']} {f['clase__profesor_titular__last_name']}".strip()
+    return {
+        'id': f['id'],
+        'alumno': f['alumno_id'],
+        'alumno_nombre': f['alumno__username'],
+        'curso_nombre': f['clase__nombre'],
+        'nivel_nombre': f['clase__nivel__nombre'] if f['clase__nivel__nombre'] is not None else '',
+        'periodo_nombre': f['clase__periodo__nombre'] if f['clase__periodo__nombre'] is not None else '',
+        'horarios': catalogos.horarios_clase(f['clase_id'], datos, por_clase),
+        'profesor_nombre': nombre_titular if tiene_titular else '-',
+        'profesor_telefono': (f['clase__profesor_titular__telefono'] or '-') if tiene_titular else '-',
+        'participacion_1': _DECIMAL_NOTA.to_representation(f['participacion_1']),
+        'participacion_2': _DECIMAL_NOTA.to_representation(f['participacion_2']),
+        'participacion_3': _DECIMAL_NOTA.to_representation(f['participacion_3']),
+        'participacion_promedio': float(f['metrica_participacion_promedio']),
+        'tareas': _DECIMAL_NOTA.to_representation(f['tareas']),
+        'examen_final': _DECIMAL_NOTA.to_representation(f['examen_final']),
+        'promedio': float(f['metrica_promedio']),
+        'estado': f['metrica_estado'],
+        'asistencia_pct': float(f['metrica_asistencia']),
+        'clase_id': f['clase_id'],
+    }
+
+
+def notas_rapidas(notas):
+    """`notas` debe venir de Nota.objects...with_metrics()."""
+    por_clase = catalogos.horarios_por_clase(notas.values('clase_id'))
+    return [nota_rapida(f, por_clase=por_clase) for f in notas.values(*CAMPOS_NOTA_RAPIDA)]
+
+
+# ------------------------------
+# Clases del profesor (ClaseProfesorSerializer)
+# ------------------------------
+
+def clases_profesor_rapidas(clases):
+    filas = list(clases.values(
+        'id', 'nombre', 'nivel_id', 'periodo_id',
+        'profesor_titular__username', 'profesor_asistente__username',
+    ))
+    alumnos = {}
+    for clase_id, username in Clase.alumnos.through.objects.filter(
+        clase_id__in=[f['id'] for f in filas]
+    ).order_by('usuario_id').values_list('clase_id', 'usuario__username'):
+        alumnos.setdefault(clase_id, []).append(username)
+    por_clase = catalogos.horarios_por_clase([f['id'] for f in filas])
+
+    data = []
+    for f in filas:
+        horarios = catalogos.horarios_clase(f['id'], por_clase=por_clase)
+        periodo = catalogos.periodo(f['periodo_id'])
+        data.append({
+            'id': f['id'],
+            'nombre': f['nombre'],
+            # ClaseProfesorSerializer lee 'clase.periodo.nombre', que no existe en Clase: siempre ''
+            'periodo_nombre': '',
+            'nivel_nombre': catalogos.nivel_nombre(f['nivel_id'], ''),
+            'horarios': horarios,
+            'profesor_titular': f['profesor_titular__username'],
+            'profesor_asistente': f['profesor_asistente__username'],
+            'alumnos': alumnos.get(f['id'], []),
+            'nombre_completo': f"{f['nombre']} — {periodo['nombre'] if periodo else 'Sin periodo'} ({', '.join(horarios)})",
+        })
+    return data
+
+
+# ------------------------------
+# Profesores con sus cursos (ProfesorListaSerializer)
+# ------------------------------
+
+def cursos_por_profesor(profesor_ids, periodo_id=None):
+    """
+    {profesor_id: ["Curso (horarios) - Titular", ...]} leyendo las clases de
+    todos los profesores en una sola consulta. Una clase en la que el profesor
+    es titular y asistente a la vez aparece solo como Titular.
+    """
+    clases = Clase.objects.filter(
+        Q(profesor_titular_id__in=profesor_ids) | Q(profesor_asistente_id__in=profesor_ids)
+    )
+    if periodo_id:
+        clases = clases.filter(periodo_id=periodo_id)
+
+    titular, asistente = {}, {}
+    por_clase = catalogos.horarios_por_clase(clases.values('pk'))
+    for clase_id, nombre, titular_id, asistente_id in clases.order_by('pk').values_list(
+        'id', 'nombre', 'profesor_titular_id', 'profesor_asistente_id'
+    ):
+        horarios = ", ".join(catalogos.horarios_clase(clase_id, por_clase=por_clase))
+        texto = f"{nombre} ({horarios})" if horarios else f"{nombre}"
+        if titular_id is not None:
+            titular.setdefault(titular_id, []).append(f"{texto} - Titular")
+        if asistente_id is not None and asistente_id != titular_id:
+            asistente.setdefault(asistente_id, []).append(f"{texto} - Asistente")
+
+    return {
+        profesor_id: titular.get(profesor_id, []) + asistente.get(profesor_id, [])
+        for profesor_id in set(titular) | set(asistente)
+    }
+
+
+def profesores_rapidos(profesores, periodo_id=None):
+    filas = list(profesores.values(
+        'id', 'first_name', 'last_name', 'fecha_nacimiento', 'email', 'telefono', 'direccion',
+    ))
+    cursos = cursos_por_profesor([f['id'] for f in filas], periodo_id)
+    return [
+        {
+            'id': f['id'],
+            'nombre_completo': f"{f['first_name']} {f['last_name']}".strip(),
+            'cursos': cursos.get(f['id'], []),
+            'fecha_nacimiento': _FECHA.to_representation(f['fecha_nacimiento']) if f['fecha_nacimiento'] else None,
+            'edad': _edad(f['fecha_nacimiento']),
+            'email': f['email'],
+            'telefono': f['telefono'],
+            'direccion': f['direccion'],
+        }
+        for f in filas
+    ]
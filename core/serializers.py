@@ -1,5 +1,7 @@
 from datetime import date
 from rest_framework import serializers
+from .catalogos import horarios_clase
+from .serializacion import cursos_por_profesor
 from .models import Clase, Asistencia, Nota, Usuario, RecursoCurso
 
 # ------------------------------
@@ -43,13 +45,18 @@ class ClaseProfesorSerializer(serializers.ModelSerializer):
         return [alumno.username for alumno in obj.alumnos.all()]
 
 
+    def _horarios(self, clase_id):
+        # La vista pasa en el contexto los horarios de todas las clases (una sola consulta);
+        # sin contexto se consultan solo los de esta clase
+        return horarios_clase(clase_id, por_clase=self.context.get('horarios_por_clase'))
+
     def get_nombre_completo(self, obj):
-        horarios = ", ".join(str(h) for h in obj.horarios.all())
+        horarios = ", ".join(self._horarios(obj.id))
         periodo = getattr(obj.periodo, 'nombre', 'Sin periodo')
         return f"{obj.nombre} — {periodo} ({horarios})"
 
     def get_horarios(self, obj):
-        return [str(h) for h in obj.horarios.all()]
+        return self._horarios(obj.id)
 
 
 # ------------------------------
@@ -142,9 +149,8 @@ class NotaSerializer(serializers.ModelSerializer):
         return value
 
     def get_horarios(self, obj):
-        if hasattr(obj.clase, 'horarios'):
-            return [str(h) for h in obj.clase.horarios.all()]
-        return []
+        # Igual que en ClaseProfesorSerializer: horarios_por_clase llega en el contexto
+        return horarios_clase(obj.clase_id, por_clase=self.context.get('horarios_por_clase'))
 
     def get_profesor_nombre(self, obj):
         if obj.clase.profesor_titular:
@@ -157,6 +163,25 @@ class NotaSerializer(serializers.ModelSerializer):
         return '-'
 
 
+# ------------------------------
+# Serializer para una fila de la hoja de notas (POST notas por clase)
+# ------------------------------
+
+class NotaFilaSerializer(serializers.ModelSerializer):
+    alumno_id = serializers.IntegerField()
+
+    class Meta:
+        model = Nota
+        fields = ['alumno_id', 'participacion_1', 'participacion_2', 'participacion_3', 'tareas', 'examen_final']
+
+    # Mismas validaciones de rango (0 a 20) que NotaSerializer
+    validate_participacion_1 = NotaSerializer.validate_participacion_1
+    validate_participacion_2 = NotaSerializer.validate_participacion_2
+    validate_participacion_3 = NotaSerializer.validate_participacion_3
+    validate_tareas = NotaSerializer.validate_tareas
+    validate_examen_final = NotaSerializer.validate_examen_final
+
+
 # ------------------------------
 # Serializer para Registro de Alumno
 # ------------------------------
@@ -270,35 +295,12 @@ class ProfesorListaSerializer(serializers.ModelSerializer):
         return None
 
     def get_cursos(self, obj):
-        # Obtener el periodo_id del contexto
-        periodo_id = self.context.get('periodo_id')
-        
-        # Filtro base para el período
-        periodo_filter = {'periodo_id': periodo_id} if periodo_id else {}
-        
-        # Clases donde es titular
-        clases_titular = Clase.objects.filter(profesor_titular=obj, **periodo_filter).prefetch_related('horarios')
-        # Clases donde es asistente
-        clases_asistente = Clase.objects.filter(profesor_asistente=obj, **periodo_filter).prefetch_related('horarios')
-
-        cursos = []
-
-        for clase in clases_titular:
-            horarios = ", ".join([str(h) for h in clase.horarios.all()])
-            if horarios:
-                cursos.append(f"{clase.nombre} ({horarios}) - Titular")
-            else:
-                cursos.append(f"{clase.nombre} - Titular")
-
-        for clase in clases_asistente:
-            if clase not in clases_titular:
-                horarios = ", ".join([str(h) for h in clase.horarios.all()])
-                if horarios:
-                    cursos.append(f"{clase.nombre} ({horarios}) - Asistente")
-                else:
-                    cursos.append(f"{clase.nombre} - Asistente")
-
-        return cursos
+        # La vista pasa en el contexto los cursos de todos los profesores (una sola consulta);
+        # sin contexto se calculan solo los de este profesor
+        cursos = self.context.get('cursos_por_profesor')
+        if cursos is None:
+            cursos = cursos_por_profesor([obj.id], self.context.get('periodo_id'))
+        return cursos.get(obj.id, [])
 
 # ------------------------------
 # Serializer para Recursos de Curso
@@ -0,0 +1,126 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from . import catalogos, resumenes
+from .cache_respuestas import marcar_cambio_al_confirmar
+from .contadores import actualizar_contadores
+from .models import Asistencia, Clase, Horario, Nivel, Nota, PeriodoAcademico, Usuario
+
+# -----------------------------
+# CONTADORES DE ASISTENCIA
+# -----------------------------
+# Cubren los guardados individuales (admin, shell). Las operaciones masivas de
+# core/asistencia.py llaman a actualizar_contadores directamente.
+
+@receiver(post_save, sender=Asistencia)
+def asistencia_guardada(sender, instance, **kwargs):
+    actualizar_contadores({(instance.clase_id, instance.alumno_id)})
+
+
+@receiver(post_delete, sender=Asistencia)
+def asistencia_eliminada(sender, instance, **kwargs):
+    # Al borrar en cascada una clase o un alumno el recálculo debe esperar al commit
+    par = (instance.clase_id, instance.alumno_id)
+    transaction.on_commit(lambda: actualizar_contadores({par}))
+
+
+# -----------------------------
+# CACHÉ DE CATÁLOGOS (core/catalogos.py)
+# -----------------------------
+# Se invalida enseguida para que el mismo proceso vea el cambio y otra vez al
+# confirmar la transacción, para que ningún worker se quede con datos sin confirmar.
+
+def _invalidar_catalogos():
+    catalogos.invalidar()
+    transaction.on_commit(catalogos.invalidar)
+    marcar_cambio_al_confirmar('catalogos')
+
+
+@receiver(post_save, sender=Horario)
+@receiver(post_save, sender=Nivel)
+@receiver(post_save, sender=PeriodoAcademico)
+@receiver(post_delete, sender=Horario)
+@receiver(post_delete, sender=Nivel)
+@receiver(post_delete, sender=PeriodoAcademico)
+def catalogo_modificado(sender, **kwargs):
+    _invalidar_catalogos()
+
+
+@receiver(m2m_changed, sender=Clase.horarios.through)
+def horarios_de_clase_modificados(sender, action, **kwargs):
+    # Los horarios de cada clase no están en el catálogo (se leen con
+    # catalogos.horarios_por_clase): solo cambian las respuestas de clases
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        marcar_cambio_al_confirmar('clases')
+
+
+# -----------------------------
+# CACHÉ DE RESPUESTAS (core/cache_respuestas.py)
+# -----------------------------
+# Las operaciones masivas (bulk_create/bulk_update) no disparan señales y
+# marcan el cambio ellas mismas.
+
+@receiver(post_save, sender=Clase)
+@receiver(post_delete, sender=Clase)
+def clase_modificada(sender, **kwargs):
+    marcar_cambio_al_confirmar('clases')
+
+
+@receiver(m2m_changed, sender=Clase.alumnos.through)
+def matriculas_modificadas(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        marcar_cambio_al_confirmar('matriculas')
+
+
+@receiver(post_save, sender=Nota)
+@receiver(post_delete, sender=Nota)
+def nota_modificada(sender, **kwargs):
+    marcar_cambio_al_confirmar('notas')
+
+
+@receiver(post_save, sender=Asistencia)
+@receiver(post_delete, sender=Asistencia)
+def asistencia_modificada(sender, **kwargs):
+    marcar_cambio_al_confirmar('asistencias')
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def usuario_modificado(sender, update_fields=None, **kwargs):
+    # El login solo actualiza last_login: no cambia nada de lo que se muestra
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    marcar_cambio_al_confirmar('usuarios')
+
+
+# -----------------------------
+# RESÚMENES POR CLASE (core/resumenes.py)
+# -----------------------------
+# Las operaciones masivas marcan sus matrículas ellas mismas (y las de
+# asistencia pasan por actualizar_contadores).
+
+@receiver(post_save, sender=Nota)
+@receiver(post_delete, sender=Nota)
+def nota_de_resumen(sender, instance, **kwargs):
+    resumenes.marcar(matriculas={(instance.clase_id, instance.alumno_id)})
+
+
+@receiver(post_save, sender=Clase)
+def clase_de_resumen(sender, instance, **kwargs):
+    # Cambian total_sesiones o el periodo
+    resumenes.marcar(clases={instance.pk})
+
+
+@receiver(m2m_changed, sender=Clase.alumnos.through)
+def matriculas_de_resumen(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            resumenes.marcar(clases={instance.pk})
+        return
+    # Desde el alumno: pk_set son las clases; en clear() llega vacío y se toman antes de borrar
+    if action == 'pre_clear':
+        instance._resumen_clases = set(instance.clase_set.values_list('id', flat=True))
+    elif action == 'post_clear':
+        resumenes.marcar(clases=getattr(instance, '_resumen_clases', ()))
+    elif action in ('post_add', 'post_remove'):
+        resumenes.marcar(clases=pk_set)
@@ -1,10 +1,1088 @@
-from rest_framework import serializers
-from .models import Clase
+import csv
+import datetime
+import io
+import json
+import os
+import re
+import sys
+import threading
+import time
+from unittest import mock, skipUnless
+from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection, transaction
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from asgiref.testing import ApplicationCommunicator
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from ela_backend.asgi import application as asgi_application
+from . import catalogos, urls as core_urls
+from .metricas import CAMPOS_NOTA
+from .models import (
+    Asistencia, Clase, ContadorAsistencia, Horario, Nivel, Nota, PeriodoAcademico, RecursoCurso,
+    ResumenClase, SesionClase, Usuario,
+)
 
-class ClaseProfesorSerializer(serializers.ModelSerializer):
-    curso_nombre = serializers.CharField(source='curso.nombre')
-    periodo_nombre = serializers.CharField(source='periodo.nombre')
+# ------------------------------
+# Benchmark de consultas y latencia de la API
+# ------------------------------
+# Siembra una institución sintética y recorre todas las rutas de core/urls.py
+# midiendo cantidad de consultas SQL y tiempo de respuesta. Falla si una ruta
+# supera su presupuesto de consultas.
+#
+# Tamaño configurable por variables de entorno, por ejemplo:
+#   ELA_BENCH_PERIODOS=3 ELA_BENCH_CLASES=10 ELA_BENCH_ALUMNOS=40 ELA_BENCH_SESIONES=30 \
+#   DATABASE_URL=sqlite:///db.sqlite3 python manage.py test core
+# ELA_BENCH_REPORTE=<ruta> guarda los resultados en JSON.
 
-    class Meta:
-        model = Clase
-        fields = ['id', 'curso_nombre', 'periodo_nombre']
+
+def _entero_env(nombre, defecto):
+    return int(os.environ.get(nombre, defecto))
+
+
+PERIODOS = _entero_env('ELA_BENCH_PERIODOS', 2)
+CLASES_POR_PERIODO = _entero_env('ELA_BENCH_CLASES', 3)
+ALUMNOS_POR_CLASE = _entero_env('ELA_BENCH_ALUMNOS', 12)
+SESIONES_POR_CLASE = _entero_env('ELA_BENCH_SESIONES', 8)
+
+CONTRASENA = 'clave-benchmark'
+
+# Presupuesto máximo de consultas por (método, nombre de la ruta en core/urls.py),
+# medido con el tamaño por defecto.
+PRESUPUESTO_CONSULTAS = {
+    ('post', 'token_obtain_pair'): 1,
+    ('post', 'token_refresh'): 1,
+    ('get', 'usuario_actual'): 0,
+    ('get', 'obtener_asistencia'): 5,  # incluye la firma del ETag
+    ('post', 'guardar_asistencia'): 7,
+    ('get', 'notas-por-clase'): 5,  # firma del ETag y horarios de las clases
+    ('post', 'notas-por-clase'): 4,
+    ('get', 'dashboard-alumno'): 3,  # firma del ETag y horarios de las clases
+    ('get', 'dashboard-director'): 2,  # incluye los horarios de las clases
+    ('post', 'director_crear_alumno'): 9,  # incluye el bloqueo de las clases (matricula.inscribir)
+    ('post', 'director_matricula_masiva'): 8,  # incluye el bloqueo de las clases
+    ('get', 'alumnos-para-director'): 1,
+    ('get', 'listar_clases'): 2,  # incluye los horarios de las clases
+    ('get', 'listar_periodos'): 0,
+    ('get', 'director_clases_periodo'): 2,  # incluye los horarios de las clases
+    ('get', 'lista_profesores_director'): 3,  # incluye los horarios de las clases
+    ('post', 'crear_alumno'): 2,
+    ('get', 'buscar_alumnos'): 1,
+    ('post', 'asignar_alumno'): 8,  # incluye el bloqueo de la clase
+    ('post', 'remover_alumno'): 6,
+    ('get', 'alumnos-del-profesor'): 4,  # incluye los horarios de las clases
+    ('get', 'listar_clases_profesor'): 3,  # incluye los horarios de las clases
+    ('get', 'reporte_asistencia_clase'): 4,
+    ('get', 'recursos_por_clase'): 2,  # incluye la firma del ETag
+    ('get', 'recursos_alumno_por_clase'): 2,  # incluye la firma del ETag
+    ('get', 'director_buscar_alumnos'): 1,
+    ('get', 'director_alumno_cursos'): 3,  # incluye los horarios de las clases
+    ('get', 'director_alumno_cursos_todos_periodos'): 4,  # incluye los horarios de las clases
+    ('get', 'director_historial_academico'): 4,
+    ('get', 'cursos-disponibles'): 2,  # incluye los horarios de las clases
+    ('post', 'matricular-curso'): 7,  # incluye los horarios de las clases
+    ('get', 'alumno-curso-matriculado'): 2,  # incluye los horarios de las clases
+    ('get', 'dashboard-alumno-async'): 4,  # usuario del JWT, firma del ETag y horarios
+    ('get', 'alumno-curso-matriculado-async'): 3,  # usuario del JWT y horarios de las clases
+    ('get', 'cursos-disponibles-async'): 3,  # usuario del JWT y horarios de las clases
+    ('get', 'recursos_alumno_por_clase-async'): 3,  # usuario del JWT y firma del ETag
+    ('get', 'exportar_reporte_clase'): 5,
+    ('get', 'exportar_reporte_periodo'): 2,
+}
+
+
+def sembrar_institucion():
+    """Crea periodos, clases, profesores, alumnos, sesiones, asistencias y notas de prueba."""
+    clave = make_password(CONTRASENA)
+    nivel = Nivel.objects.create(nombre='Nivel benchmark')
+    horarios = [
+        Horario.objects.create(dia='Lunes', hora=datetime.time(19, 0)),
+        Horario.objects.create(dia='Sabado', hora=datetime.time(9, 30)),
+    ]
+    director = Usuario.objects.create(username='director', password=clave, rol='director')
+
+    total_clases = PERIODOS * CLASES_POR_PERIODO
+    Usuario.objects.bulk_create([
+        Usuario(username=f'profesor{i}', password=clave, rol='profesor', first_name=f'Profesor{i}', last_name='Muñoz')
+        for i in range(total_clases + 1)
+    ])
+    Usuario.objects.bulk_create([
+        Usuario(username=f'alumno{i}', password=clave, rol='alumno', first_name=f'Alumno{i}', last_name='Pérez',
+                email=f'alumno{i}@ela.test')
+        for i in range(total_clases * ALUMNOS_POR_CLASE)
+    ])
+    profesores = list(Usuario.objects.filter(rol='profesor').order_by('id'))
+    alumnos = list(Usuario.objects.filter(rol='alumno').order_by('id'))
+
+    clases = []
+    for p in range(PERIODOS):
+        inicio = datetime.date(2025 + p, 1, 6)
+        periodo = PeriodoAcademico.objects.create(
+            nombre=f'Periodo {p}', anio=inicio.year, fecha_inicio=inicio,
+            fecha_fin=inicio + datetime.timedelta(weeks=SESIONES_POR_CLASE), activo=(p == PERIODOS - 1),
+        )
+        for c in range(CLASES_POR_PERIODO):
+            indice = p * CLASES_POR_PERIODO + c
+            clase = Clase.objects.create(
+                nombre=f'Curso {indice}', nivel=nivel, periodo=periodo, total_sesiones=SESIONES_POR_CLASE,
+                profesor_titular=profesores[indice], profesor_asistente=profesores[indice + 1],
+                disponible=periodo.activo,
+            )
+            clase.horarios.set(horarios)
+            clase.alumnos.set(alumnos[indice * ALUMNOS_POR_CLASE:(indice + 1) * ALUMNOS_POR_CLASE])
+            clases.append(clase)
+
+    sesiones, asistencias, notas = [], [], []
+    for clase in clases:
+        inicio = clase.periodo.fecha_inicio
+        fechas = [inicio + datetime.timedelta(weeks=s) for s in range(SESIONES_POR_CLASE)]
+        sesiones += [SesionClase(clase=clase, fecha=fecha) for fecha in fechas]
+        for n, alumno in enumerate(clase.alumnos.all()):
+            asistencias += [
+                Asistencia(clase=clase, alumno=alumno, fecha=fecha, presente=(s + n) % 4 != 0)
+                for s, fecha in enumerate(fechas)
+            ]
+            notas.append(Nota(
+                clase=clase, alumno=alumno, participacion_1=15, participacion_2=14, participacion_3=16,
+                tareas=10 + n % 10, examen_final=12 + n % 8,
+            ))
+    SesionClase.objects.bulk_create(sesiones)
+    Asistencia.objects.bulk_create(asistencias, batch_size=1000)
+    Nota.objects.bulk_create(notas, batch_size=1000)
+
+    from .contadores import reconstruir_contadores
+    from .resumenes import reconstruir_resumenes
+    reconstruir_contadores()
+    reconstruir_resumenes()
+
+    RecursoCurso.objects.create(clase=clases[-1], titulo='Guía', url='https://ela.test/guia', tipo='documento_pdf_word')
+
+    return {
+        'director': director,
+        'profesor': clases[-1].profesor_titular,
+        'alumno': clases[-1].alumnos.order_by('id').first(),
+        'clase': clases[-1],
+        'clase_id': clases[-1].id,
+        'periodo_id': clases[-1].periodo_id,
+        'alumno_libre': alumnos[0],
+    }
+
+
+# Los presupuestos miden las consultas sin el caché de respuestas
+@override_settings(RESPUESTAS_CACHE_SEGUNDOS=0)
+class PresupuestoConsultasTests(APITestCase):
+    resultados = []
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = sembrar_institucion()
+
+    def setUp(self):
+        # Los presupuestos miden el caché de catálogos ya cargado, como en producción
+        catalogos.catalogo()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if not cls.resultados:
+            return
+        sys.stderr.write("\nBenchmark de la API (ruta, consultas/presupuesto, ms):\n")
+        for resultado in sorted(cls.resultados, key=lambda r: r['ruta']):
+            sys.stderr.write(
+                f"  {resultado['ruta']:<40} {resultado['consultas']:>4}/{resultado['presupuesto']:<4} "
+                f"{resultado['ms']:>8.1f}\n"
+            )
+        reporte = os.environ.get('ELA_BENCH_REPORTE')
+        if reporte:
+            with open(reporte, 'w') as archivo:
+                json.dump(cls.resultados, archivo, indent=2)
+
+    def cliente(self, rol=None, jwt=False):
+        cliente = APIClient()
+        if rol and jwt:
+            # Las vistas async validan el JWT ellas mismas
+            cliente.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.datos[rol])}')
+        elif rol:
+            cliente.force_authenticate(self.datos[rol])
+        return cliente
+
+    def peticiones(self):
+        """(nombre de la ruta, método, rol, kwargs de la URL, query string, cuerpo)."""
+        d = self.datos
+        clase = d['clase']
+        fechas = [str(f) for f in clase.sesiones.order_by('fecha').values_list('fecha', flat=True)]
+        grilla = [
+            {'alumno_id': alumno_id, 'asistencias': [{'fecha': f, 'presente': i % 2 == 0} for i, f in enumerate(fechas)]}
+            for alumno_id in clase.alumnos.values_list('id', flat=True)
+        ]
+        hoja = [
+            {'alumno_id': alumno_id, 'participacion_1': 18, 'participacion_2': 17, 'participacion_3': 16,
+             'tareas': 15, 'examen_final': 14}
+            for alumno_id in clase.alumnos.values_list('id', flat=True)
+        ]
+        refresh = self.client.post(
+            reverse('token_obtain_pair'), {'username': 'director', 'password': CONTRASENA}, format='json'
+        ).data['refresh']
+        matriculas = [
+            {'alumno_id': alumno_id, 'clase_id': d['clase_id']}
+            for alumno_id in Usuario.objects.filter(rol='alumno').exclude(clase=clase).values_list('id', flat=True)[:20]
+        ] + [{'alumno_id': d['alumno'].id, 'clase_id': d['clase_id']}]
+        nuevo_alumno = {'username': 'alumno_nuevo', 'password': 'secreta123', 'first_name': 'Nuevo', 'last_name': 'Núñez'}
+
+        return [
+            ('token_obtain_pair', 'post', None, {}, '', {'username': 'director', 'password': CONTRASENA}),
+            ('token_refresh', 'post', None, {}, '', {'refresh': refresh}),
+            ('usuario_actual', 'get', 'director', {}, '', None),
+            ('obtener_asistencia', 'get', 'profesor', {'clase_id': d['clase_id']}, '', None),
+            ('guardar_asistencia', 'post', 'profesor', {'clase_id': d['clase_id']}, '', {'asistencias': grilla}),
+            ('notas-por-clase', 'get', 'profesor', {'clase_id': d['clase_id']}, '', None),
+            ('notas-por-clase', 'post', 'profesor', {'clase_id': d['clase_id']}, '', {'notas': hoja}),
+            ('dashboard-alumno', 'get', 'alumno', {}, '', None),
+            ('dashboard-director', 'get', 'director', {}, '', None),
+            ('director_crear_alumno', 'post', 'director', {}, '', dict(nuevo_alumno, cursos=[d['clase_id']])),
+            ('director_matricula_masiva', 'post', 'director', {}, '', {'matriculas': matriculas}),
+            ('alumnos-para-director', 'get', 'director', {}, f'?clase_id={d["clase_id"]}', None),
+            ('listar_clases', 'get', 'director', {}, '', None),
+            ('listar_periodos', 'get', 'director', {}, '', None),
+            ('director_clases_periodo', 'get', 'director', {}, f'?periodo_id={d["periodo_id"]}', None),
+            ('lista_profesores_director', 'get', 'director', {}, f'?periodo_id={d["periodo_id"]}', None),
+            ('crear_alumno', 'post', 'profesor', {}, '', nuevo_alumno),
+            ('buscar_alumnos', 'get', 'profesor', {}, f'?q=Alumno1&clase_id={d["clase_id"]}', None),
+            ('buscar_alumnos', 'get', 'profesor', {}, f'?q=Alumno&clase_id={d["clase_id"]}&limite=5', None),
+            ('asignar_alumno', 'post', 'profesor', {'clase_id': d['clase_id']}, '', {'alumno_id': d['alumno_libre'].id}),
+            ('remover_alumno', 'post', 'profesor', {'clase_id': d['clase_id']}, '', {'alumno_id': d['alumno'].id}),
+            ('alumnos-del-profesor', 'get', 'profesor', {}, f'?clase_id={d["clase_id"]}', None),
+            ('listar_clases_profesor', 'get', 'profesor', {}, '', None),
+            ('reporte_asistencia_clase', 'get', 'profesor', {'clase_id': d['clase_id']}, '', None),
+            ('recursos_por_clase', 'get', 'profesor', {'clase_id': d['clase_id']}, '', None),
+            ('recursos_alumno_por_clase', 'get', 'alumno', {'clase_id': d['clase_id']}, '', None),
+            ('director_buscar_alumnos', 'get', 'director', {}, '?q=Alumno1', None),
+            ('director_alumno_cursos', 'get', 'director', {}, f'?periodo_id={d["periodo_id"]}&alumno_id={d["alumno"].id}', None),
+            ('director_alumno_cursos_todos_periodos', 'get', 'director', {}, f'?alumno_id={d["alumno"].id}', None),
+            ('director_historial_academico', 'get', 'director', {}, f'?periodo_id={d["periodo_id"]}', None),
+            ('cursos-disponibles', 'get', 'alumno', {}, '', None),
+            ('matricular-curso', 'post', 'alumno_libre', {}, '', {'clase_id': d['clase_id']}),
+            ('alumno-curso-matriculado', 'get', 'alumno', {}, '', None),
+            ('dashboard-alumno-async', 'get', 'alumno', {}, '', None),
+            ('alumno-curso-matriculado-async', 'get', 'alumno', {}, '', None),
+            ('cursos-disponibles-async', 'get', 'alumno', {}, '', None),
+            ('recursos_alumno_por_clase-async', 'get', 'alumno', {'clase_id': d['clase_id']}, '', None),
+            ('exportar_reporte_clase', 'get', 'profesor', {'clase_id': d['clase_id']}, '?tipo=asistencia', None),
+            ('exportar_reporte_periodo', 'get', 'director', {'periodo_id': d['periodo_id']}, '?tipo=notas', None),
+        ]
+
+    def medir(self, nombre, metodo, rol, kwargs, query, cuerpo):
+        """Ejecuta la petición dentro de un savepoint que se revierte, para no afectar a las demás."""
+        url = reverse(nombre, kwargs=kwargs) + query
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as consultas:
+                inicio = time.perf_counter()
+                respuesta = getattr(self.cliente(rol, jwt=nombre.endswith('-async')), metodo)(url, cuerpo, format='json')
+                if respuesta.streaming:
+                    b''.join(respuesta.streaming_content)
+                ms = (time.perf_counter() - inicio) * 1000
+            transaction.set_rollback(True)
+        return respuesta, len(consultas), ms
+
+    def test_todas_las_rutas_tienen_presupuesto(self):
+        nombres = {patron.name for patron in core_urls.urlpatterns if patron.name}
+        cubiertas = {(peticion[1], peticion[0]) for peticion in self.peticiones()}
+        self.assertEqual(nombres - {nombre for _, nombre in cubiertas}, set())
+        self.assertEqual(cubiertas - PRESUPUESTO_CONSULTAS.keys(), set())
+
+    def test_presupuesto_de_consultas(self):
+        for nombre, metodo, rol, kwargs, query, cuerpo in self.peticiones():
+            with self.subTest(ruta=nombre, metodo=metodo):
+                respuesta, consultas, ms = self.medir(nombre, metodo, rol, kwargs, query, cuerpo)
+                presupuesto = PRESUPUESTO_CONSULTAS[(metodo, nombre)]
+                self.resultados.append({
+                    'ruta': f'{metodo.upper()} {nombre}', 'consultas': consultas,
+                    'presupuesto': presupuesto, 'ms': round(ms, 1), 'estado': respuesta.status_code,
+                })
+                self.assertLess(respuesta.status_code, 400, getattr(respuesta, 'data', None))
+                self.assertLessEqual(consultas, presupuesto, f'{nombre} excede su presupuesto de consultas')
+
+    def descargar_csv(self, respuesta):
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.streaming)
+        contenido = b''.join(respuesta.streaming_content).decode('utf-8')
+        self.assertTrue(contenido.startswith('\ufeff'))
+        return list(csv.reader(io.StringIO(contenido[1:])))
+
+    def test_exportar_notas_del_periodo(self):
+        from .exportacion import ENCABEZADO_NOTAS
+        d = self.datos
+        url = reverse('exportar_reporte_periodo', kwargs={'periodo_id': d['periodo_id']})
+        encabezado, *filas = self.descargar_csv(self.cliente('director').get(url, {'tipo': 'notas'}))
+        self.assertEqual(encabezado, ENCABEZADO_NOTAS)
+
+        # Solo las notas de las clases del periodo, una fila por nota
+        notas = Nota.objects.filter(clase__periodo_id=d['periodo_id']).with_metrics()
+        self.assertEqual(len(filas), notas.count())
+        self.assertTrue(Nota.objects.exclude(clase__periodo_id=d['periodo_id']).exists())
+        self.assertEqual(
+            {fila[0] for fila in filas},
+            set(Clase.objects.filter(periodo_id=d['periodo_id']).values_list('nombre', flat=True)),
+        )
+        nota = notas.get(clase=d['clase'], alumno=d['alumno'])
+        fila = next(fila for fila in filas if fila[:2] == [d['clase'].nombre, str(d['alumno'].id)])
+        self.assertEqual(fila[2], f"{d['alumno'].first_name} {d['alumno'].last_name}")
+        self.assertEqual(Decimal(fila[9]), Decimal(nota.metrica_promedio).quantize(Decimal('0.01')))
+        self.assertEqual(Decimal(fila[10]), Decimal(nota.metrica_asistencia).quantize(Decimal('0.01')))
+        self.assertEqual(fila[11], nota.metrica_estado)
+
+    def test_exportar_asistencia_de_una_clase(self):
+        from .asistencia import fechas_reporte
+        d = self.datos
+        clase = d['clase']
+        url = reverse('exportar_reporte_clase', kwargs={'clase_id': clase.id})
+        encabezado, *filas = self.descargar_csv(self.cliente('profesor').get(url, {'tipo': 'asistencia'}))
+        fechas = [str(fecha) for fecha in fechas_reporte(clase)]
+        self.assertEqual(encabezado, ['Curso', 'Alumno ID', 'Alumno'] + fechas + ['Presentes', 'Ausentes'])
+        self.assertEqual([int(fila[1]) for fila in filas], list(clase.alumnos.order_by('id').values_list('id', flat=True)))
+        for fila in filas:
+            marcas = dict(
+                (str(fecha), presente) for fecha, presente in
+                Asistencia.objects.filter(clase=clase, alumno_id=fila[1]).values_list('fecha', 'presente')
+            )
+            self.assertEqual(fila[3:-2], ['P' if marcas.get(fecha) else 'A' for fecha in fechas])
+            self.assertEqual(
+                [int(fila[-2]), int(fila[-1])],
+                [sum(marcas.values()), len(marcas) - sum(marcas.values())],
+            )
+
+    def test_exportar_clase_solo_director_o_profesores_de_la_clase(self):
+        d = self.datos
+        clase = d['clase']
+        url = reverse('exportar_reporte_clase', kwargs={'clase_id': clase.id})
+        ajeno = Usuario.objects.filter(rol='profesor').exclude(
+            id__in=[clase.profesor_titular_id, clase.profesor_asistente_id]
+        ).first()
+        for usuario, estado in [
+            (d['director'], 200), (clase.profesor_titular, 200), (clase.profesor_asistente, 200),
+            (ajeno, 403), (d['alumno'], 403),
+        ]:
+            with self.subTest(usuario=usuario.username):
+                cliente = APIClient()
+                cliente.force_authenticate(usuario)
+                self.assertEqual(cliente.get(url, {'tipo': 'notas'}).status_code, estado)
+
+    def reporte_original(self, clase):
+        """reporte_asistencia_clase antes de core/asistencia.construir_reporte (una consulta por alumno y fecha)."""
+        total_sesiones = clase.total_sesiones
+        sesiones = clase.sesiones.order_by('fecha')
+        if sesiones.exists():
+            fechas = [str(s.fecha) for s in sesiones]
+        else:
+            fechas = sorted(list(Asistencia.objects.filter(clase=clase).values_list('fecha', flat=True).distinct()))
+        fechas = fechas[:total_sesiones]
+        alumnos = clase.alumnos.all()
+        reporte = []
+        total_presentes = 0
+        total_ausentes = 0
+        for alumno in alumnos:
+            asistencias = Asistencia.objects.filter(clase=clase, alumno=alumno, fecha__in=fechas)
+            presentes = asistencias.filter(presente=True).count()
+            ausentes = asistencias.filter(presente=False).count()
+            porcentaje = round((presentes / total_sesiones) * 100, 2) if total_sesiones else 0
+            total_presentes += presentes
+            total_ausentes += ausentes
+            asistencias_por_fecha = []
+            for fecha in fechas:
+                a = asistencias.filter(fecha=fecha).first()
+                asistencias_por_fecha.append({"fecha": str(fecha), "presente": a.presente if a else False})
+            reporte.append({
+                "alumno_id": alumno.id,
+                "nombre": f"{alumno.first_name} {alumno.last_name}",
+                "total_sesiones": total_sesiones,
+                "presentes": presentes,
+                "ausentes": ausentes,
+                "fechas": fechas,
+                "porcentaje": porcentaje,
+                "asistencias": asistencias_por_fecha,
+            })
+        return {
+            "clase": clase.nombre,
+            "total_sesiones": total_sesiones,
+            "fechas": fechas,
+            "reporte": reporte,
+            "total_presentes": total_presentes,
+            "total_ausentes": total_ausentes,
+            "total_alumnos": alumnos.count(),
+        }
+
+    def test_reporte_de_asistencia_igual_al_original(self):
+        from .asistencia import construir_reporte
+        d = self.datos
+        clase = d['clase']
+        # Una sesión sin ninguna asistencia, un alumno sin una fecha y otro sin registros
+        primera = clase.sesiones.order_by('fecha').first().fecha
+        SesionClase.objects.create(clase=clase, fecha=primera - datetime.timedelta(days=2))
+        Asistencia.objects.filter(clase=clase, alumno=d['alumno'], fecha=primera).delete()
+        clase.alumnos.add(d['alumno_libre'])
+
+        # Clase sin sesiones: las fechas salen de Asistencia, con huecos por alumno
+        sin_sesiones = Clase.objects.create(nombre='Sin sesiones', periodo=clase.periodo, total_sesiones=2)
+        alumnos = list(clase.alumnos.order_by('id')[:3])
+        sin_sesiones.alumnos.set(alumnos)
+        Asistencia.objects.bulk_create([
+            Asistencia(clase=sin_sesiones, alumno=alumnos[0], fecha=datetime.date(2026, 3, 2), presente=True),
+            Asistencia(clase=sin_sesiones, alumno=alumnos[0], fecha=datetime.date(2026, 3, 9), presente=False),
+            Asistencia(clase=sin_sesiones, alumno=alumnos[1], fecha=datetime.date(2026, 3, 9), presente=True),
+            Asistencia(clase=sin_sesiones, alumno=alumnos[1], fecha=datetime.date(2026, 3, 16), presente=True),
+        ])
+
+        for caso in (clase, sin_sesiones):
+            with self.subTest(clase=caso.nombre):
+                caso = Clase.objects.get(pk=caso.pk)
+                esperado = self.reporte_original(caso)
+                self.assertEqual(construir_reporte(caso), esperado)
+                self.assertIn(0, [fila['presentes'] + fila['ausentes'] for fila in esperado['reporte']])
+
+    def test_asistencia_sql_con_porcentaje_no_exacto(self):
+        d = self.datos
+        filtro = {'clase': d['clase'], 'alumno': d['alumno']}
+        for presentes, total in ((23, 30), (1, 30), (2, 3)):
+            with self.subTest(presentes=presentes, total=total):
+                Clase.objects.filter(pk=d['clase'].pk).update(total_sesiones=total)
+                ContadorAsistencia.objects.filter(**filtro).update(presentes=presentes)
+                anotada = Nota.objects.with_metrics().get(**filtro)
+                self.assertEqual(float(anotada.metrica_asistencia), round((presentes / total) * 100, 2))
+                self.assertEqual(float(anotada.metrica_asistencia), Nota.objects.get(**filtro).calcular_asistencia())
+
+    def test_metricas_redondean_empates_igual_en_sql_y_python(self):
+        d = self.datos
+        filtro = {'clase': d['clase'], 'alumno': d['alumno']}
+        # 0.02 * 0.1333 + 15.01 * 0.1334 = 2.005 y 1 de 32 sesiones = 3.125: empates exactos
+        Nota.objects.filter(**filtro).update(
+            participacion_1=Decimal('0.02'), participacion_2=0, participacion_3=Decimal('15.01'),
+            tareas=Decimal('10.01'), examen_final=Decimal('12.50'),
+        )
+        Clase.objects.filter(pk=d['clase'].pk).update(total_sesiones=32)
+        ContadorAsistencia.objects.filter(**filtro).update(presentes=1)
+
+        anotada = Nota.objects.with_metrics().get(**filtro)
+        nota = Nota.objects.get(**filtro)
+        self.assertEqual(nota.participacion_promedio, Decimal('2.01'))
+        self.assertEqual(anotada.metrica_participacion_promedio, nota.participacion_promedio)
+        self.assertEqual(anotada.metrica_promedio, nota.promedio)
+        self.assertEqual(nota.calcular_asistencia(), 3.13)
+        self.assertEqual(float(anotada.metrica_asistencia), nota.calcular_asistencia())
+
+    def test_metricas_anotadas_no_quedan_viejas(self):
+        d = self.datos
+        nota = Nota.objects.with_metrics().get(clase=d['clase'], alumno=d['alumno'])
+        with self.assertNumQueries(0):
+            self.assertEqual(nota.promedio, nota.metrica_promedio)
+            self.assertEqual(nota.calcular_asistencia(), float(nota.metrica_asistencia))
+            self.assertEqual(nota.estado_aprobacion(), nota.metrica_estado)
+
+        # Modificada en memoria: se recalcula como una Nota sin anotar
+        nota.examen_final = 0
+        self.assertEqual(nota.estado_aprobacion(), 'Pendiente')
+        nota.examen_final = Decimal('20')
+        nota.save()
+        recien_leida = Nota.objects.get(pk=nota.pk)
+        self.assertNotEqual(nota.promedio, nota.metrica_promedio)
+        self.assertEqual(nota.promedio, recien_leida.promedio)
+        self.assertEqual(nota.participacion_promedio, recien_leida.participacion_promedio)
+        self.assertEqual(nota.estado_aprobacion(), recien_leida.estado_aprobacion())
+        self.assertEqual(Nota.objects.with_metrics().get(pk=nota.pk).promedio, recien_leida.promedio)
+
+    def test_cursos_todos_periodos_aprueba_por_promedio(self):
+        d = self.datos
+        url = reverse('director_alumno_cursos_todos_periodos')
+        cursos = self.cliente('director').get(url, {'alumno_id': d['alumno'].id}).data
+        self.assertTrue(cursos)
+        for curso in cursos:
+            self.assertEqual(curso['aprobado'], curso['estado'] != 'Sin notas' and curso['promedio'] >= 14)
+
+    def test_materializar_grilla_es_idempotente(self):
+        d = self.datos
+        clase = d['clase']
+        url = reverse('obtener_asistencia', kwargs={'clase_id': clase.id})
+        fechas = list(clase.sesiones.order_by('fecha').values_list('fecha', flat=True))
+        Asistencia.objects.filter(clase=clase, fecha=fechas[0]).delete()
+        Asistencia.objects.filter(clase=clase, alumno=d['alumno']).delete()
+        registros = Asistencia.objects.filter(clase=clase)
+        antes = registros.count()
+
+        # Sin materializar las celdas faltantes se muestran ausentes pero no se crean
+        grilla = self.cliente('profesor').get(url).data
+        self.assertEqual(registros.count(), antes)
+
+        celdas = clase.alumnos.count() * len(fechas)
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as consultas:
+                respuesta = self.cliente('profesor').get(url, {'materializar': 'true'})
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertEqual(respuesta.data, grilla)
+            self.assertEqual(registros.count(), celdas)
+            self.assertFalse(registros.filter(alumno=d['alumno'], presente=True).exists())
+            self.assertEqual(
+                ContadorAsistencia.objects.get(clase=clase, alumno=d['alumno']).total, len(fechas)
+            )
+        # La segunda vez ya no falta nada: solo lecturas
+        self.assertFalse([c for c in consultas.captured_queries if c['sql'].startswith('INSERT')])
+
+    def test_guardar_grilla_dos_veces(self):
+        d = self.datos
+        clase = d['clase']
+        url = reverse('guardar_asistencia', kwargs={'clase_id': clase.id})
+        fechas = list(clase.sesiones.order_by('fecha').values_list('fecha', flat=True))
+        alumnos = list(clase.alumnos.order_by('id').values_list('id', flat=True))
+        # Sin registro en la primera fecha: esas celdas se insertan
+        Asistencia.objects.filter(clase=clase, fecha=fechas[0]).delete()
+        existentes = {
+            (alumno_id, fecha): presente for alumno_id, fecha, presente in
+            Asistencia.objects.filter(clase=clase).values_list('alumno_id', 'fecha', 'presente')
+        }
+        grilla = {
+            (alumno_id, fecha): (i + j) % 3 == 0
+            for i, alumno_id in enumerate(alumnos) for j, fecha in enumerate(fechas)
+        }
+        cuerpo = {'asistencias': [
+            {'alumno_id': alumno_id, 'asistencias': [
+                {'fecha': str(fecha), 'presente': grilla[(alumno_id, fecha)]} for fecha in fechas
+            ]}
+            for alumno_id in alumnos
+        ]}
+        actualizados = sum(1 for celda, presente in existentes.items() if grilla[celda] != presente)
+        primera = {
+            'insertados': len(alumnos),
+            'actualizados': actualizados,
+            'sin_cambios': len(existentes) - actualizados,
+        }
+        self.assertTrue(all(primera.values()))
+        segunda = {'insertados': 0, 'actualizados': 0, 'sin_cambios': len(grilla)}
+
+        for esperado in (primera, segunda):
+            respuesta = self.cliente('profesor').post(url, cuerpo, format='json')
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertEqual({clave: respuesta.data[clave] for clave in esperado}, esperado)
+        self.assertEqual(dict(
+            ((alumno_id, fecha), presente) for alumno_id, fecha, presente in
+            Asistencia.objects.filter(clase=clase).values_list('alumno_id', 'fecha', 'presente')
+        ), grilla)
+
+    def crear_alumnos_rosa(self):
+        """Tres alumnos que coinciden con "rosa": igual, al inicio y en medio (apellidos en orden inverso)."""
+        return [
+            Usuario.objects.create(username=username, last_name=apellido, rol='alumno')
+            for username, apellido in (('rosa', 'Zeta'), ('rosamaria', 'Beta'), ('larosa', 'Alfa'))
+        ]
+
+    def test_busqueda_paginada_recorre_todos(self):
+        self.crear_alumnos_rosa()
+        url = reverse('buscar_alumnos')
+        for texto in ('alumno', 'rosa'):
+            esperados = [fila['id'] for fila in self.cliente('profesor').get(url, {'q': texto}).data]
+            vistos, cursor = [], ''
+            while True:
+                respuesta = self.cliente('profesor').get(url, {'q': texto, 'limite': 2, 'cursor': cursor})
+                self.assertEqual(respuesta.status_code, 200)
+                vistos += [fila['id'] for fila in respuesta.data['resultados']]
+                cursor = respuesta.data['siguiente']
+                if not cursor:
+                    break
+            # Las páginas siguen el orden por relevancia de la búsqueda sin paginar
+            self.assertEqual(vistos, esperados)
+        self.assertEqual(self.cliente('profesor').get(url, {'q': 'alumno', 'cursor': 'xx'}).status_code, 400)
+
+    @override_settings(BUSQUEDA_TRIGRAMAS=False)
+    def test_busqueda_sin_trigramas_ordena_por_relevancia(self):
+        from .busqueda import buscar_usuarios
+        rosa, rosamaria, larosa = self.crear_alumnos_rosa()
+        alumnos = Usuario.objects.filter(rol='alumno')
+        resultado = list(buscar_usuarios(alumnos, 'ROSA').values_list('id', 'relevancia'))
+        self.assertEqual(resultado, [(rosa.id, 1.0), (rosamaria.id, 0.5), (larosa.id, 0.0)])
+        self.assertTrue(buscar_usuarios(alumnos, 'ela.test').exists())
+        self.assertFalse(buscar_usuarios(alumnos, 'ela.test', campos=('first_name', 'last_name')).exists())
+
+    @skipUnless(connection.vendor == 'postgresql', 'Los trigramas y unaccent solo existen en PostgreSQL')
+    def test_busqueda_con_trigramas(self):
+        from .busqueda import buscar_usuarios, usa_trigramas
+        self.assertTrue(usa_trigramas())
+        rosa, rosamaria, larosa = self.crear_alumnos_rosa()
+        alumnos = Usuario.objects.filter(rol='alumno')
+        # Sin tildes ni mayúsculas
+        self.assertTrue(buscar_usuarios(alumnos, 'PEREZ').exists())
+        resultado = list(buscar_usuarios(alumnos, 'rosa').values_list('id', 'relevancia'))
+        self.assertEqual(resultado[0][0], rosa.id)
+        self.assertEqual({fila[0] for fila in resultado}, {rosa.id, rosamaria.id, larosa.id})
+        self.assertEqual([fila[1] for fila in resultado], sorted((fila[1] for fila in resultado), reverse=True))
+        # `campos` también se respeta con trigramas
+        self.assertTrue(buscar_usuarios(alumnos, 'ela.test').exists())
+        self.assertFalse(buscar_usuarios(alumnos, 'ela.test', campos=('first_name', 'last_name')).exists())
+        self.assertFalse(buscar_usuarios(alumnos, 'perez', campos=('username', 'email')).exists())
+
+    def test_hoja_de_notas_todo_o_nada(self):
+        d = self.datos
+        url = reverse('notas-por-clase', kwargs={'clase_id': d['clase_id']})
+        alumnos = list(d['clase'].alumnos.order_by('id').values_list('id', flat=True))
+        antes = list(Nota.objects.filter(clase=d['clase']).order_by('pk').values_list(*CAMPOS_NOTA))
+        hoja = [
+            {'alumno_id': alumnos[0], 'participacion_1': '19.25', 'tareas': 17.5},
+            {'alumno_id': alumnos[1], 'participacion_1': 'diez'},
+            {'alumno_id': d['alumno_libre'].id, 'tareas': 12},
+            {'alumno_id': alumnos[2], 'examen_final': 21},
+        ]
+        respuesta = self.cliente('profesor').post(url, {'notas': hoja}, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual([error['fila'] for error in respuesta.data['errores']], [1, 2, 3])
+        self.assertEqual(list(Nota.objects.filter(clase=d['clase']).order_by('pk').values_list(*CAMPOS_NOTA)), antes)
+
+        respuesta = self.cliente('profesor').post(url, {'notas': hoja[:1]}, format='json')
+        self.assertEqual(respuesta.status_code, 200)
+        nota = Nota.objects.filter(clase=d['clase'], alumno_id=alumnos[0]).latest('pk')
+        self.assertEqual((nota.participacion_1, nota.participacion_2, nota.tareas), (Decimal('19.25'), 0, Decimal('17.50')))
+
+    def test_matricula_masiva(self):
+        d = self.datos
+        url = reverse('director_matricula_masiva')
+        libre, clase = d['alumno_libre'], d['clase']
+        filas = [
+            {'alumno_id': libre.id, 'clase_id': clase.id},
+            {'alumno_id': d['profesor'].id, 'clase_id': clase.id},
+            {'alumno_id': libre.id, 'clase_id': 0},
+        ]
+        respuesta = self.cliente('director').post(url, {'matriculas': filas}, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual([error['fila'] for error in respuesta.data['errores']], [1, 2])
+        self.assertFalse(clase.alumnos.filter(pk=libre.pk).exists())
+
+        archivo = SimpleUploadedFile('matriculas.csv', (
+            f"alumno_id,clase_id\n{libre.id},{clase.id}\n{d['alumno'].id},{clase.id}\n"
+        ).encode('utf-8-sig'), content_type='text/csv')
+        respuesta = self.cliente('director').post(url, {'archivo': archivo}, format='multipart')
+        self.assertEqual(respuesta.status_code, 200, respuesta.data)
+        self.assertEqual((respuesta.data['matriculados'], respuesta.data['ya_matriculados']), (1, 1))
+        self.assertTrue(clase.alumnos.filter(pk=libre.pk).exists())
+        self.assertEqual(Nota.objects.filter(clase=clase, alumno=libre).count(), 1)
+        self.assertEqual(self.cliente('profesor').post(url, {'matriculas': []}, format='json').status_code, 403)
+
+    def test_matricula_respeta_el_cupo(self):
+        clase = self.datos['clase']
+        clase.cupo = clase.alumnos.count()
+        clase.save()
+        disponibles = self.cliente('alumno_libre').get(reverse('cursos-disponibles')).data['cursos']
+        self.assertEqual(next(c for c in disponibles if c['clase_id'] == clase.id)['cupos_disponibles'], 0)
+
+        url = reverse('matricular-curso')
+        respuesta = self.cliente('alumno_libre').post(url, {'clase_id': clase.id}, format='json')
+        self.assertEqual((respuesta.status_code, respuesta.data['error']), (400, 'Curso sin cupos'))
+
+        clase.cupo += 1
+        clase.save()
+        self.assertEqual(self.cliente('alumno_libre').post(url, {'clase_id': clase.id}, format='json').status_code, 200)
+        respuesta = self.cliente('alumno_libre').post(url, {'clase_id': clase.id}, format='json')
+        self.assertEqual(respuesta.data['error'], 'Ya estás matriculado')
+        self.assertEqual(Nota.objects.filter(clase=clase, alumno=self.datos['alumno_libre']).count(), 1)
+
+    def test_explicar_consultas_usa_los_indices(self):
+        salida = io.StringIO()
+        call_command('explicar_consultas', '--sin-seqscan', stdout=salida)
+        self.assertIn('Consultas que no usan su índice: 0 de', salida.getvalue(), salida.getvalue())
+
+    def test_vistas_async_dan_el_mismo_json(self):
+        d = self.datos
+        pares = [
+            ('dashboard-alumno', 'dashboard-alumno-async', {}),
+            ('alumno-curso-matriculado', 'alumno-curso-matriculado-async', {}),
+            ('cursos-disponibles', 'cursos-disponibles-async', {}),
+            ('recursos_alumno_por_clase', 'recursos_alumno_por_clase-async', {'clase_id': d['clase_id']}),
+        ]
+        for sincrona, asincrona, kwargs in pares:
+            with self.subTest(vista=asincrona):
+                esperado = self.cliente('alumno').get(reverse(sincrona, kwargs=kwargs))
+                respuesta = self.cliente('alumno', jwt=True).get(reverse(asincrona, kwargs=kwargs))
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertEqual(respuesta.json(), json.loads(esperado.content))
+        self.assertEqual(self.cliente().get(reverse('dashboard-alumno-async')).status_code, 401)
+
+    def test_historial_academico(self):
+        from .historial import HTML, historiales, huella
+        d = self.datos
+        alumno_ids = list(Usuario.objects.filter(rol='alumno').order_by('id').values_list('id', flat=True))
+        with CaptureQueriesContext(connection) as uno:
+            historiales(alumno_ids[:1])
+        with CaptureQueriesContext(connection) as todos:
+            resultado = historiales(alumno_ids)
+        self.assertEqual(len(todos), len(uno))
+        self.assertEqual([historial['alumno_id'] for historial in resultado], alumno_ids)
+
+        historial = next(h for h in resultado if h['alumno_id'] == d['alumno'].id)
+        for periodo in historial['periodos']:
+            notas = list(Nota.objects.filter(alumno=d['alumno'], clase__periodo_id=periodo['periodo_id']).with_metrics())
+            self.assertEqual(periodo['total_cursos'], d['alumno'].clase_set.filter(periodo_id=periodo['periodo_id']).count())
+            self.assertEqual(periodo['aprobados'], sum(1 for nota in notas if nota.metrica_estado == 'Aprobado'))
+            self.assertAlmostEqual(periodo['promedio'], float(sum(nota.metrica_promedio for nota in notas) / len(notas)), places=2)
+        fechas = [periodo['fecha_inicio'] for periodo in historial['periodos']]
+        self.assertEqual(fechas, sorted(fechas))
+
+        url = reverse('director_historial_academico')
+        with self.settings(RESPUESTAS_CACHE_SEGUNDOS=60):
+            respuesta = self.cliente('director').get(url, {'alumno_id': d['alumno'].id, 'formato': 'html'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn(historial['alumno_nombre'], respuesta.content.decode())
+        self.assertIsNotNone(cache.get(f'historial:html:{huella(historial)}'))
+        if HTML is None:
+            respuesta = self.cliente('director').get(url, {'alumno_id': d['alumno'].id, 'formato': 'pdf'})
+            self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(self.cliente('alumno').get(url, {'alumno_id': d['alumno'].id}).status_code, 403)
+
+    def test_catalogos_se_invalidan_al_guardar(self):
+        clase = self.datos['clase']
+        horario = clase.horarios.order_by('pk').first()
+        self.assertIn(str(horario), catalogos.horarios_clase(clase.id))
+        horario.hora = datetime.time(6, 15)
+        horario.save()
+        self.assertIn(str(horario), catalogos.horarios_clase(clase.id))
+        clase.horarios.remove(horario)
+        self.assertNotIn(str(horario), catalogos.horarios_clase(clase.id))
+
+    def test_catalogos_vencen_sin_invalidar(self):
+        # Cambio hecho por otro worker: este proceso no recibe la señal
+        nivel_id = self.datos['clase'].nivel_id
+        catalogos.catalogo()
+        Nivel.objects.filter(pk=nivel_id).update(nombre='Nivel renombrado')
+        self.assertNotEqual(catalogos.nivel_nombre(nivel_id), 'Nivel renombrado')
+        # Sin caché compartido la copia se recarga al vencer (el compartido espera a la versión)
+        with self.settings(CATALOGOS_CACHE_SEGUNDOS=0, CATALOGOS_CACHE_COMPARTIDO=False):
+            catalogos._local['vence'] = 0
+            self.assertEqual(catalogos.nivel_nombre(nivel_id), 'Nivel renombrado')
+
+    def test_cache_de_respuestas_se_invalida_con_los_datos(self):
+        cache.clear()
+        clase = self.datos['clase']
+        url = reverse('listar_clases')
+        with self.settings(RESPUESTAS_CACHE_SEGUNDOS=60):
+            primera = self.cliente('director').get(url)
+            with CaptureQueriesContext(connection) as consultas:
+                self.assertEqual(self.cliente('director').get(url).data, primera.data)
+            self.assertEqual(len(consultas), 0)
+
+            clase.nombre = 'Curso renombrado'
+            clase.save()
+            nombres = [fila['nombre'] for fila in self.cliente('director').get(url).data]
+            self.assertIn('Curso renombrado', nombres)
+
+            url = reverse('cursos-disponibles')
+            alumno = self.datos['alumno_libre']
+            antes = [curso['clase_id'] for curso in self.cliente('alumno_libre').get(url).data['cursos']]
+            Clase.objects.get(id=antes[0]).alumnos.add(alumno)
+            despues = [curso['clase_id'] for curso in self.cliente('alumno_libre').get(url).data['cursos']]
+            self.assertEqual(despues, antes[1:])
+
+    def test_dashboard_cacheado_espera_al_recalculo_de_resumenes(self):
+        from .matricula import inscribir
+        cache.clear()
+        d = self.datos
+        url = reverse('dashboard-director')
+
+        def inscritos():
+            filas = self.cliente('director').get(url, {'periodo_id': d['periodo_id']}).data['dashboard']
+            return next(fila['total_alumnos'] for fila in filas if fila['curso'] == d['clase'].nombre)
+
+        with self.settings(RESPUESTAS_CACHE_SEGUNDOS=60):
+            antes = inscritos()
+            with self.captureOnCommitCallbacks() as callbacks:
+                inscribir({(d['clase_id'], d['alumno_libre'].id)})
+            # Una petición entre el cambio de versión de 'matriculas' y el recálculo
+            # guarda el resumen viejo; al recalcular debe dejar de usarse
+            callbacks[0]()
+            inscritos()
+            for callback in callbacks[1:]:
+                callback()
+            self.assertEqual(inscritos(), antes + 1)
+
+    def test_etag_responde_304_hasta_que_cambian_los_datos(self):
+        d = self.datos
+        url = reverse('notas-por-clase', kwargs={'clase_id': d['clase_id']})
+        etag = self.cliente('profesor').get(url)['ETag']
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.cliente('profesor').get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(len(consultas), 1)
+
+        hoja = [{'alumno_id': d['alumno'].id, 'participacion_1': 11, 'participacion_2': 12,
+                 'participacion_3': 13, 'tareas': 14, 'examen_final': 15}]
+        self.cliente('profesor').post(url, {'notas': hoja}, format='json')
+        respuesta = self.cliente('profesor').get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+
+    def test_etag_cambia_con_nombres_y_catalogos(self):
+        d = self.datos
+        clase = Clase.objects.get(pk=d['clase_id'])
+        notas = ('profesor', reverse('notas-por-clase', kwargs={'clase_id': clase.id}))
+        asistencia = ('profesor', reverse('obtener_asistencia', kwargs={'clase_id': clase.id}))
+        dashboard = ('alumno', reverse('dashboard-alumno'))
+        cambios = [
+            (lambda: Usuario.objects.get(pk=d['alumno'].pk).save(), [notas, asistencia, dashboard]),
+            (lambda: Usuario.objects.get(pk=clase.profesor_titular_id).save(), [notas, asistencia, dashboard]),
+            (lambda: Nivel.objects.get(pk=clase.nivel_id).save(), [notas, asistencia, dashboard]),
+            (lambda: PeriodoAcademico.objects.get(pk=clase.periodo_id).save(), [notas, asistencia, dashboard]),
+            (lambda: Horario.objects.order_by('pk').first().save(), [notas, dashboard]),
+        ]
+        for cambio, urls in cambios:
+            etags = [self.cliente(rol).get(url)['ETag'] for rol, url in urls]
+            # La firma sale de la base de datos: otro worker (otro caché) da el mismo ETag
+            cache.clear()
+            for (rol, url), etag in zip(urls, etags):
+                self.assertEqual(self.cliente(rol).get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            cambio()
+            for (rol, url), etag in zip(urls, etags):
+                with self.subTest(url=url):
+                    self.assertEqual(self.cliente(rol).get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_serializacion_rapida_da_el_mismo_json(self):
+        d = self.datos
+        casos = [
+            ('dashboard-alumno', 'alumno', {}),
+            ('listar_clases_profesor', 'profesor', {}),
+            ('lista_profesores_director', 'director', {'periodo_id': d['periodo_id']}),
+        ]
+        for nombre, rol, query in casos:
+            with self.subTest(ruta=nombre):
+                rapida = self.cliente(rol).get(reverse(nombre), query)
+                with self.settings(SERIALIZACION_RAPIDA=[]):
+                    drf = self.cliente(rol).get(reverse(nombre), query)
+                self.assertEqual(rapida.status_code, 200)
+                self.assertEqual(json.loads(rapida.content), json.loads(drf.content))
+
+    def test_lista_de_profesores_con_serializer_no_consulta_por_profesor(self):
+        url = reverse('lista_profesores_director')
+        with self.settings(SERIALIZACION_RAPIDA=[]), CaptureQueriesContext(connection) as consultas:
+            respuesta = self.cliente('director').get(url, {'periodo_id': self.datos['periodo_id']})
+        self.assertTrue(respuesta.data['profesores'])
+        self.assertEqual(len(consultas), 3)
+
+    def test_contadores_sin_diferencias(self):
+        from .contadores import verificar_contadores
+        _, diferencias = verificar_contadores()
+        self.assertEqual(diferencias, [])
+        self.assertTrue(ContadorAsistencia.objects.exists())
+
+    def resumenes(self):
+        return set(ResumenClase.objects.values_list(
+            'clase_id', 'periodo_id', 'inscritos', 'con_notas', 'aprobados', 'promedio', 'asistencia_promedio',
+        ))
+
+    def test_migracion_0029_da_los_mismos_resumenes(self):
+        from importlib import import_module
+        from django.apps import apps
+        from .resumenes import reconstruir_resumenes
+        poblar_resumenes = import_module('core.migrations.0029_poblar_resumenes').poblar_resumenes
+        # Un porcentaje de asistencia no exacto (23 de 30)
+        Clase.objects.filter(pk=self.datos['clase_id']).update(total_sesiones=30)
+        ContadorAsistencia.objects.filter(clase_id=self.datos['clase_id'], alumno=self.datos['alumno']).update(presentes=23)
+        reconstruir_resumenes(incluir_cerrados=True)
+        esperados = self.resumenes()
+        ResumenClase.objects.all().delete()
+        poblar_resumenes(apps, None)
+        self.assertEqual(self.resumenes(), esperados)
+
+    def test_resumenes_coinciden_con_el_calculo_en_vivo(self):
+        from .resumenes import metricas_por_clase
+        en_vivo = {
+            clase.pk: (clase.total_inscritos, clase.total_con_notas, clase.total_aprobados,
+                       round(float(clase.asistencia_prom or 0), 2))
+            for clase in metricas_por_clase(Clase.objects.all())
+        }
+        guardados = {
+            resumen.clase_id: (resumen.inscritos, resumen.con_notas, resumen.aprobados, float(resumen.asistencia_promedio))
+            for resumen in ResumenClase.objects.all()
+        }
+        self.assertEqual(guardados, en_vivo)
+
+        respuesta = self.cliente('director').get(reverse('dashboard-director'), {'periodo_id': self.datos['periodo_id']})
+        fila = next(fila for fila in respuesta.data['dashboard'] if fila['curso'] == self.datos['clase'].nombre)
+        self.assertEqual(fila['total_alumnos'], en_vivo[self.datos['clase_id']][0])
+        self.assertEqual(fila['asistencia_promedio'], en_vivo[self.datos['clase_id']][3])
+
+    def test_resumenes_se_actualizan_al_confirmar(self):
+        from .matricula import inscribir
+        from .notas import guardar_hoja_notas
+        from .resumenes import reconstruir_resumenes
+        d = self.datos
+        clase = Clase.objects.get(pk=d['clase_id'])
+        primero, segundo = clase.alumnos.order_by('id').values_list('id', flat=True)[:2]
+        antes = self.resumenes()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            guardar_hoja_notas(clase, [{'alumno_id': primero, 'examen_final': 0, 'tareas': 0}])
+        with self.captureOnCommitCallbacks(execute=True):
+            inscribir({(clase.id, d['alumno_libre'].id)})
+        with self.captureOnCommitCallbacks(execute=True):
+            clase.alumnos.remove(segundo)
+        with self.captureOnCommitCallbacks(execute=True):
+            clase.total_sesiones += 2
+            clase.save()
+        incremental = self.resumenes()
+
+        self.assertNotEqual(incremental, antes)
+        reconstruir_resumenes()
+        self.assertEqual(self.resumenes(), incremental)
+
+
+class InstrumentacionSQLTests(APITestCase):
+    """core/middleware.py: encabezado Server-Timing, línea de log y muestreo."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.profesor = Usuario.objects.create(username='profesor', rol='profesor')
+        Usuario.objects.create(username='alumno', first_name='Ana', last_name='Pérez', rol='alumno')
+
+    def pedir(self):
+        cliente = APIClient()
+        cliente.force_authenticate(self.profesor)
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = cliente.get(reverse('buscar_alumnos'), {'q': 'ana'})
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta, len(consultas)
+
+    @override_settings(INSTRUMENTACION_MUESTREO=1)
+    def test_encabezado_y_linea_de_log(self):
+        with self.assertLogs('core.instrumentacion', 'INFO') as registro:
+            respuesta, consultas = self.pedir()
+        encabezado = re.fullmatch(
+            r'db;dur=(\d+\.\d);desc="(\d+) consultas", total;dur=(\d+\.\d)', respuesta['Server-Timing']
+        )
+        self.assertIsNotNone(encabezado, respuesta['Server-Timing'])
+        self.assertEqual(int(encabezado[2]), consultas)
+        self.assertLessEqual(float(encabezado[1]), float(encabezado[3]))
+
+        self.assertEqual(len(registro.records), 1)
+        linea = json.loads(registro.records[0].getMessage())
+        self.assertEqual(
+            {clave: linea[clave] for clave in ('ruta', 'metodo', 'estado', 'consultas')},
+            {'ruta': 'buscar_alumnos', 'metodo': 'GET', 'estado': 200, 'consultas': consultas},
+        )
+        self.assertEqual(
+            set(linea), {'ruta', 'metodo', 'estado', 'consultas', 'db_ms', 'total_ms',
+                         'consulta_mas_lenta_ms', 'consulta_mas_lenta'},
+        )
+        self.assertIn('core_usuario', linea['consulta_mas_lenta'])
+
+    @override_settings(INSTRUMENTACION_MUESTREO=0.25)
+    def test_muestreo(self):
+        for sorteo, medida in ((0.1, True), (0.25, False), (0.9, False)):
+            with self.subTest(sorteo=sorteo), mock.patch('core.middleware.random.random', return_value=sorteo), \
+                    mock.patch('core.middleware.logger') as logger:
+                respuesta, _ = self.pedir()
+                self.assertEqual(respuesta.has_header('Server-Timing'), medida)
+                self.assertEqual(logger.info.called, medida)
+
+    @override_settings(INSTRUMENTACION_MUESTREO=0)
+    def test_muestreo_cero_desactiva_el_middleware(self):
+        from .middleware import InstrumentacionSQLMiddleware
+        with self.assertRaises(MiddlewareNotUsed):
+            InstrumentacionSQLMiddleware(lambda request: None)
+        respuesta, _ = self.pedir()
+        self.assertFalse(respuesta.has_header('Server-Timing'))
+
+
+@skipUnless(connection.features.has_select_for_update, 'La base de datos no bloquea filas (select_for_update)')
+class MatriculaConcurrenteTests(TransactionTestCase):
+    """Todos los alumnos de una cohorte pulsan "Matricular" a la vez en la misma clase."""
+    ALUMNOS = _entero_env('ELA_BENCH_MATRICULAS', 40)
+    CUPO = 15
+    REPETIDOS = 10
+
+    def test_matriculas_simultaneas_respetan_el_cupo(self):
+        clase = Clase.objects.create(nombre='Curso concurrido', total_sesiones=1, disponible=True, cupo=self.CUPO)
+        Usuario.objects.bulk_create([
+            Usuario(username=f'cohorte{i}', password='!', rol='alumno') for i in range(self.ALUMNOS)
+        ])
+        alumnos = list(Usuario.objects.filter(rol='alumno').order_by('id'))
+        # Algunos alumnos pulsan dos veces
+        intentos = alumnos + alumnos[:self.REPETIDOS]
+        barrera = threading.Barrier(len(intentos))
+        estados = []
+
+        def intentar(alumno):
+            try:
+                cliente = APIClient()
+                cliente.force_authenticate(alumno)
+                barrera.wait()
+                respuesta = cliente.post(reverse('matricular-curso'), {'clase_id': clase.id}, format='json')
+                estados.append((alumno.id, respuesta.status_code))
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=intentar, args=(alumno,)) for alumno in intentos]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        segundos = time.perf_counter() - inicio
+        sys.stderr.write(f"\n{len(intentos)} matrículas simultáneas en {segundos * 1000:.0f} ms\n")
+
+        aceptados = sorted(alumno_id for alumno_id, estado in estados if estado == 200)
+        inscritos = sorted(clase.alumnos.values_list('id', flat=True))
+        self.assertEqual(len(estados), len(intentos))
+        self.assertEqual(len(aceptados), self.CUPO)
+        self.assertEqual(aceptados, inscritos)
+        self.assertEqual(sorted(Nota.objects.filter(clase=clase).values_list('alumno_id', flat=True)), inscritos)
+
+
+class AsistenciaTiempoRealTests(TransactionTestCase):
+    """Canal WebSocket de asistencia servido por ela_backend/asgi.py."""
+
+    def setUp(self):
+        self.titular = Usuario.objects.create(username='titular', rol='profesor')
+        self.asistente = Usuario.objects.create(username='asistente', rol='profesor')
+        self.alumno = Usuario.objects.create(username='alumno', rol='alumno')
+        self.clase = Clase.objects.create(
+            nombre='Curso en vivo', total_sesiones=4, profesor_titular=self.titular, profesor_asistente=self.asistente,
+        )
+        self.clase.alumnos.add(self.alumno)
+
+    def conectar(self, usuario, clase_id=None):
+        token = str(AccessToken.for_user(usuario)) if usuario else 'invalido'
+        return ApplicationCommunicator(asgi_application, {
+            'type': 'websocket',
+            'path': f'/ws/clases/{clase_id or self.clase.id}/asistencia/',
+            'query_string': f'token={token}'.encode(),
+        })
+
+    async def abrir(self, usuario, clase_id=None):
+        canal = self.conectar(usuario, clase_id)
+        await canal.send_input({'type': 'websocket.connect'})
+        return canal, await canal.receive_output(timeout=5)
+
+    async def test_celda_se_guarda_y_llega_al_otro_profesor(self):
+        titular, aceptado = await self.abrir(self.titular)
+        asistente, _ = await self.abrir(self.asistente)
+        self.assertEqual(aceptado['type'], 'websocket.accept')
+
+        celda = {'alumno_id': self.alumno.id, 'fecha': '2026-03-02', 'presente': True}
+        await titular.send_input({'type': 'websocket.receive', 'text': json.dumps(celda)})
+        self.assertEqual(json.loads((await titular.receive_output(timeout=5))['text'])['tipo'], 'guardado')
+        difundido = json.loads((await asistente.receive_output(timeout=5))['text'])
+        self.assertEqual(difundido, {'tipo': 'asistencia', 'por': self.titular.id, **celda})
+
+        await asistente.send_input({'type': 'websocket.receive', 'text': json.dumps(dict(celda, alumno_id=self.titular.id))})
+        self.assertEqual(json.loads((await asistente.receive_output(timeout=5))['text'])['tipo'], 'error')
+
+        for canal in (titular, asistente):
+            await canal.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await canal.wait(timeout=5)
+
+        asistencia = await Asistencia.objects.aget(clase=self.clase, alumno=self.alumno)
+        contador = await ContadorAsistencia.objects.aget(clase=self.clase, alumno=self.alumno)
+        self.assertEqual((asistencia.presente, contador.presentes, contador.total), (True, 1, 1))
+
+    async def test_solo_profesores_de_la_clase(self):
+        for usuario, codigo in ((None, 4401), (self.alumno, 4403)):
+            canal, respuesta = await self.abrir(usuario)
+            self.assertEqual((respuesta['type'], respuesta['code']), ('websocket.close', codigo))
+            await canal.wait(timeout=5)
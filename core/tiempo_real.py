@@ -0,0 +1,161 @@
+import asyncio
+import json
+import re
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db import close_old_connections, transaction
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from .cache_respuestas import marcar_cambio_al_confirmar
+from .contadores import actualizar_contadores
+from .models import Asistencia, Clase, Usuario
+
+# -----------------------------
+# ASISTENCIA EN TIEMPO REAL (WebSocket)
+# -----------------------------
+# ws/clases/<clase_id>/asistencia/?token=<access JWT>
+# El cliente manda una celda por mensaje {"alumno_id", "fecha", "presente"};
+# se guarda con un upsert de una fila y se reenvía a los demás editores de la
+# clase conectados al mismo proceso. Sin broker externo: con varios workers
+# cada uno tiene sus propios grupos.
+
+RUTA = re.compile(r'^/ws/clases/(?P<clase_id>\d+)/asistencia/$')
+
+# Códigos de cierre (4000-4999 son de la aplicación)
+CIERRE_NO_AUTENTICADO = 4401
+CIERRE_NO_AUTORIZADO = 4403
+CIERRE_NO_ENCONTRADO = 4404
+
+
+class Grupos:
+    """Conexiones abiertas por clase dentro de este proceso."""
+
+    def __init__(self):
+        self._miembros = {}
+
+    def unirse(self, grupo, enviar):
+        self._miembros.setdefault(grupo, set()).add(enviar)
+
+    def salir(self, grupo, enviar):
+        miembros = self._miembros.get(grupo)
+        if miembros is not None:
+            miembros.discard(enviar)
+            if not miembros:
+                del self._miembros[grupo]
+
+    async def difundir(self, grupo, mensaje, excepto=None):
+        texto = json.dumps(mensaje)
+        destinos = [enviar for enviar in self._miembros.get(grupo, ()) if enviar is not excepto]
+        # Una conexión cerrada no debe impedir el envío a las demás
+        await asyncio.gather(
+            *(enviar({'type': 'websocket.send', 'text': texto}) for enviar in destinos),
+            return_exceptions=True,
+        )
+
+
+grupos = Grupos()
+
+
+def _con_conexion(funcion):
+    """sync_to_async que, como una petición, descarta conexiones vencidas antes y después."""
+    def envoltura(*args, **kwargs):
+        close_old_connections()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(envoltura)
+
+
+@_con_conexion
+def autorizar(token, clase_id):
+    """
+    Devuelve (usuario, None) si el token es válido y el usuario es director o
+    profesor (titular o asistente) de la clase; si no, (None, código de cierre).
+    """
+    try:
+        usuario_id = AccessToken(token)[jwt_settings.USER_ID_CLAIM]
+        usuario = Usuario.objects.get(pk=usuario_id, is_active=True)
+    except (TokenError, KeyError, Usuario.DoesNotExist):
+        return None, CIERRE_NO_AUTENTICADO
+
+    profesores = Clase.objects.filter(pk=clase_id).values_list('profesor_titular_id', 'profesor_asistente_id').first()
+    if profesores is None:
+        return None, CIERRE_NO_ENCONTRADO
+    if usuario.rol != 'director' and usuario.id not in profesores:
+        return None, CIERRE_NO_AUTORIZADO
+    return usuario, None
+
+
+@_con_conexion
+def marcar_asistencia(clase_id, alumno_id, fecha, presente):
+    """
+    Guarda una celda de la grilla: upsert de una fila de Asistencia y
+    recálculo del contador de esa matrícula. Devuelve la fecha normalizada.
+    Lanza ValidationError si la celda no es válida.
+    """
+    campo_fecha = Asistencia._meta.get_field('fecha')
+    campo_presente = Asistencia._meta.get_field('presente')
+    try:
+        alumno_id = int(alumno_id)
+    except (TypeError, ValueError):
+        raise ValidationError(f"alumno_id inválido: {alumno_id}")
+    fecha = campo_fecha.to_python(fecha)
+    if fecha is None:
+        raise ValidationError("Fecha faltante")
+    presente = bool(campo_presente.to_python(presente))
+    if not Clase.alumnos.through.objects.filter(clase_id=clase_id, usuario_id=alumno_id).exists():
+        raise ValidationError("El alumno no pertenece a la clase.")
+
+    with transaction.atomic():
+        Asistencia.objects.bulk_create(
+            [Asistencia(clase_id=clase_id, alumno_id=alumno_id, fecha=fecha, presente=presente)],
+            update_conflicts=True,
+            unique_fields=('alumno', 'clase', 'fecha'),
+            update_fields=('presente', 'actualizado'),
+        )
+        actualizar_contadores({(clase_id, alumno_id)})
+        marcar_cambio_al_confirmar('asistencias')
+    return {"alumno_id": alumno_id, "fecha": str(fecha), "presente": presente}
+
+
+async def asistencia_websocket(scope, receive, send):
+    """Aplicación ASGI del canal de asistencia de una clase (ver ela_backend/asgi.py)."""
+    clase_id = int(RUTA.match(scope['path'])['clase_id'])
+    token = parse_qs(scope.get('query_string', b'').decode()).get('token', [''])[0]
+
+    mensaje = await receive()
+    if mensaje['type'] != 'websocket.connect':
+        return
+    usuario, cierre = await autorizar(token, clase_id)
+    if usuario is None:
+        await send({'type': 'websocket.close', 'code': cierre})
+        return
+    await send({'type': 'websocket.accept'})
+
+    grupos.unirse(clase_id, send)
+    try:
+        while True:
+            mensaje = await receive()
+            if mensaje['type'] == 'websocket.disconnect':
+                break
+            if mensaje['type'] != 'websocket.receive':
+                continue
+            try:
+                celda = json.loads(mensaje.get('text') or '')
+                if not isinstance(celda, dict):
+                    raise ValueError
+            except ValueError:
+                await send({'type': 'websocket.send', 'text': json.dumps({"tipo": "error", "error": "Mensaje JSON inválido."})})
+                continue
+            try:
+                guardada = await marcar_asistencia(clase_id, celda.get('alumno_id'), celda.get('fecha'), celda.get('presente', False))
+            except ValidationError as e:
+                await send({'type': 'websocket.send', 'text': json.dumps({**celda, "tipo": "error", "error": " ".join(e.messages)})})
+                continue
+            await send({'type': 'websocket.send', 'text': json.dumps({"tipo": "guardado", **guardada})})
+            await grupos.difundir(clase_id, {"tipo": "asistencia", "por": usuario.id, **guardada}, excepto=send)
+    finally:
+        grupos.salir(clase_id, send)
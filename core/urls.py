@@ -19,14 +19,24 @@ from .views import (
     lista_profesores_director,
     listar_periodos,
     director_crear_alumno,
+    director_matricula_masiva,
     recursos_por_clase,
     director_buscar_alumnos,
     director_alumno_cursos,
     director_clases_periodo,
     director_alumno_cursos_todos_periodos,
+    director_historial_academico,
     cursos_disponibles,
     matricular_curso,
     alumno_curso_matriculado,
+    exportar_reporte_clase,
+    exportar_reporte_periodo,
+)
+from .vistas_async import (
+    dashboard_alumno_async,
+    alumno_curso_matriculado_async,
+    cursos_disponibles_async,
+    recursos_por_clase_async,
 )
 from django.conf import settings
 from django.conf.urls.static import static
@@ -52,6 +62,7 @@ urlpatterns = [
     # Dashboard del director
     path('director/dashboard/', dashboard_director, name='dashboard-director'),
     path('director/crear-alumno/', director_crear_alumno, name='director_crear_alumno'),
+    path('director/matriculas/', director_matricula_masiva, name='director_matricula_masiva'),
     path('director/alumnos/', alumnos_para_director, name='alumnos-para-director'),
     path('director/clases/', listar_clases, name='listar_clases'),
     path('director/periodos/', listar_periodos, name='listar_periodos'),
@@ -71,6 +82,8 @@ urlpatterns = [
     path('profesor/alumnos/', alumnos_del_profesor, name='alumnos-del-profesor'),
     path('profesor/clases/', listar_clases_profesor, name='listar_clases_profesor'),
     path('clases/<int:clase_id>/reporte-asistencia/', reporte_asistencia_clase, name='reporte_asistencia_clase'),
+    path('clases/<int:clase_id>/exportar/', exportar_reporte_clase, name='exportar_reporte_clase'),
+    path('director/periodos/<int:periodo_id>/exportar/', exportar_reporte_periodo, name='exportar_reporte_periodo'),
 
     # Recursos por clase (profesor)
     path('profesor/recursos/<int:clase_id>/', recursos_por_clase, name='recursos_por_clase'),
@@ -80,9 +93,16 @@ urlpatterns = [
     path('director/alumnos/', director_buscar_alumnos, name='director_buscar_alumnos'),
     path('director/alumno-cursos/', director_alumno_cursos, name='director_alumno_cursos'),
     path('director/alumno-cursos-todos-periodos/', director_alumno_cursos_todos_periodos, name='director_alumno_cursos_todos_periodos'),
+    path('director/historial-academico/', director_historial_academico, name='director_historial_academico'),
     path('cursos-disponibles/', cursos_disponibles, name='cursos-disponibles'),
     path('matricular-curso/', matricular_curso, name='matricular-curso'),
     path('alumno/curso-matriculado/', alumno_curso_matriculado, name='alumno-curso-matriculado'),
+
+    # Lecturas del alumno con el ORM async (servidas por uvicorn, ver ela_backend/asgi.py)
+    path('async/alumno/dashboard/', dashboard_alumno_async, name='dashboard-alumno-async'),
+    path('async/alumno/curso-matriculado/', alumno_curso_matriculado_async, name='alumno-curso-matriculado-async'),
+    path('async/cursos-disponibles/', cursos_disponibles_async, name='cursos-disponibles-async'),
+    path('async/alumno/recursos/<int:clase_id>/', recursos_por_clase_async, name='recursos_alumno_por_clase-async'),
 ]
 
 if settings.DEBUG:
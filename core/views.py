@@ -1,11 +1,26 @@
+import csv
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status, permissions
-from django.db.models import Q
-from .models import Clase, Asistencia, Nota, Usuario, Horario, Nivel, PeriodoAcademico, RecursoCurso
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+from django.http import HttpResponse
+from django.db.models import Exists, OuterRef, Prefetch, Q, Value
+from .models import Clase, Nota, Usuario, PeriodoAcademico, RecursoCurso, ResumenClase
 from .serializers import ClaseProfesorSerializer, NotaSerializer, AlumnoRegistroSerializer, AlumnoDetalleSerializer, ProfesorListaSerializer, RecursoCursoSerializer
+from .cache_respuestas import cachear_respuesta
+from .condicional import con_etag, firma_asistencia, firma_dashboard_alumno, firma_notas, firma_recursos
+from .busqueda import CursorInvalido, buscar_usuarios, limite_pagina, paginar_por_cursor
+from .asistencia import construir_grilla, construir_reporte, guardar_grilla
+from . import catalogos
+from .catalogos import horarios_clase, horarios_clase_24h, horarios_por_clase
+from .notas import guardar_hoja_notas
+from .matricula import con_inscritos, inscribir, leer_csv, matricular, matricular_en_lote
+from .serializacion import clases_profesor_rapidas, cursos_por_profesor, notas_rapidas, profesores_rapidos, serializacion_rapida
+from .exportacion import FORMATOS as FORMATOS_EXPORTACION, TIPOS as TIPOS_EXPORTACION, Workbook, exportar
+from .historial import FORMATOS as FORMATOS_HISTORIAL, HTML, documento_html, documento_pdf, historiales
 
 # ----------------------------
 # Vista 1: Usuario actual
@@ -39,46 +54,20 @@ def get_clases_profesor(usuario):
 # ----------------------------
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@con_etag(firma_asistencia)
 def obtener_asistencia(request, clase_id):
     """
     Devuelve la asistencia de todos los alumnos de la clase para todas las fechas programadas (sesiones).
+    Las celdas sin registro se devuelven como ausentes sin crearlas; con ?materializar=true
+    se insertan en la base de datos en una sola operación.
     """
     try:
         clase = Clase.objects.get(id=clase_id)
     except Clase.DoesNotExist:
         return Response({"error": "Clase no encontrada"}, status=404)
 
-    # Obtener todas las fechas programadas (sesiones)
-    sesiones = clase.sesiones.order_by('fecha')
-    fechas = [s.fecha for s in sesiones]
-    alumnos = clase.alumnos.all()
-
-    # Para cada alumno y cada fecha, obtener o crear la asistencia
-    data = []
-    for alumno in alumnos:
-        fila = {
-            "alumno_id": alumno.id,
-            "alumno_nombre": alumno.get_full_name() or alumno.username,  # <--- Nombre completo o username si está vacío
-            "asistencias": []
-        }
-        for fecha in fechas:
-            asistencia, _ = Asistencia.objects.get_or_create(
-                clase=clase,
-                alumno=alumno,
-                fecha=fecha,
-                defaults={"presente": False}
-            )
-            fila["asistencias"].append({
-                "fecha": str(fecha),
-                "presente": asistencia.presente
-            })
-        data.append(fila)
-
-    return Response({
-        "fechas": [str(f) for f in fechas],
-        "alumnos": data,
-        "total_sesiones": clase.total_sesiones  # <-- agregado
-    })
+    materializar = request.query_params.get('materializar', '').lower() in ('1', 'true', 'si')
+    return Response(construir_grilla(clase, materializar=materializar))
 
 
 
@@ -92,6 +81,7 @@ def guardar_asistencia(request, clase_id):
     """
     Guarda la asistencia de todos los alumnos para todas las fechas programadas de la clase.
     Espera un JSON con: { asistencias: [ { alumno_id, asistencias: [ { fecha, presente } ] } ] }
+    Se guarda todo o nada y se informa cuántas celdas se insertaron, actualizaron o quedaron igual.
     """
     asistencias = request.data.get("asistencias", [])
 
@@ -100,19 +90,14 @@ def guardar_asistencia(request, clase_id):
     except Clase.DoesNotExist:
         return Response({"error": "Clase no encontrada"}, status=404)
 
-    for alumno_asist in asistencias:
-        alumno_id = alumno_asist.get("alumno_id")
-        for asistencia in alumno_asist.get("asistencias", []):
-            fecha = asistencia.get("fecha")
-            presente = asistencia.get("presente", False)
-            Asistencia.objects.update_or_create(
-                clase=clase,
-                alumno_id=alumno_id,
-                fecha=fecha,
-                defaults={"presente": presente}
-            )
+    try:
+        resumen = guardar_grilla(clase, asistencias)
+    except ValidationError as e:
+        return Response({"error": " ".join(e.messages)}, status=status.HTTP_400_BAD_REQUEST)
+    except IntegrityError:
+        return Response({"error": "La asistencia contiene alumnos inválidos."}, status=status.HTTP_400_BAD_REQUEST)
 
-    return Response({"mensaje": "Asistencia guardada correctamente"})
+    return Response({"mensaje": "Asistencia guardada correctamente", **resumen})
 
 
 # ----------------------------
@@ -121,6 +106,7 @@ def guardar_asistencia(request, clase_id):
 
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@con_etag(firma_notas)
 def notas_por_clase(request, clase_id):
     
     if request.method == 'GET':
@@ -129,11 +115,22 @@ def notas_por_clase(request, clase_id):
         except Clase.DoesNotExist:
             return Response({"error": "Clase no encontrada"}, status=404)
 
-        alumnos = clase.alumnos.all()
+        # Datos de la clase: iguales para todas las filas
+        curso_nombre = clase.nombre
+        nivel_nombre = catalogos.nivel_nombre(clase.nivel_id)
+        horarios = horarios_clase(clase.id)
+
+        # Plantilla + sus notas en la clase con las métricas calculadas en SQL (4 consultas en total);
+        # si un alumno tiene más de una nota se muestra la primera (menor pk)
+        alumnos = clase.alumnos.prefetch_related(Prefetch(
+            'nota_set',
+            queryset=Nota.objects.filter(clase=clase).with_metrics().order_by('pk'),
+            to_attr='notas_clase',
+        ))
         resultados = []
 
         for alumno in alumnos:
-            nota = Nota.objects.filter(clase=clase, alumno=alumno).first()
+            nota = alumno.notas_clase[0] if alumno.notas_clase else None
             resultado = {
                 "alumno_id": alumno.id,
                 "alumno_nombre": f"{alumno.first_name} {alumno.last_name}",
@@ -145,9 +142,9 @@ def notas_por_clase(request, clase_id):
                 "promedio": nota.promedio if nota else 0,
                 "asistencia_pct": nota.calcular_asistencia() if nota else 0,
                 "estado": nota.estado_aprobacion() if nota else "Sin notas",
-                "curso_nombre": clase.nombre,
-                "nivel_nombre": clase.nivel.nombre,
-                "horarios": [str(h) for h in clase.horarios.all()],
+                "curso_nombre": curso_nombre,
+                "nivel_nombre": nivel_nombre,
+                "horarios": horarios,
             }
             resultados.append(resultado)
 
@@ -159,42 +156,19 @@ def notas_por_clase(request, clase_id):
         if not isinstance(notas_data, list) or not notas_data:
             return Response({"error": "No se recibieron datos de notas."}, status=status.HTTP_400_BAD_REQUEST)
 
-        errores = []
-
-        for nota_data in notas_data:
-            try:
-                alumno_id = nota_data["alumno_id"]
-
-                participacion_1 = float(nota_data.get("participacion_1") or 0)
-                participacion_2 = float(nota_data.get("participacion_2") or 0)
-                participacion_3 = float(nota_data.get("participacion_3") or 0)
-                tareas = float(nota_data.get("tareas") or 0)
-                examen_final = float(nota_data.get("examen_final") or 0)
-
-                Nota.objects.update_or_create(
-                    clase_id=clase_id,
-                    alumno_id=alumno_id,
-                    defaults={
-                        "participacion_1": participacion_1,
-                        "participacion_2": participacion_2,
-                        "participacion_3": participacion_3,
-                        "tareas": tareas,
-                        "examen_final": examen_final,
-                    }
-                )
-            except Exception as e:
-                errores.append({
-                    "alumno_id": nota_data.get("alumno_id"),
-                    "error": str(e)
-                })
+        try:
+            clase = Clase.objects.get(id=clase_id)
+        except Clase.DoesNotExist:
+            return Response({"error": "Clase no encontrada"}, status=404)
 
+        resumen, errores = guardar_hoja_notas(clase, notas_data)
         if errores:
             return Response({
-                "mensaje": "Algunas notas no se pudieron guardar.",
+                "mensaje": "Algunas notas no son válidas; no se guardó ninguna.",
                 "errores": errores
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response({"mensaje": "Notas registradas correctamente."})
+        return Response({"mensaje": "Notas registradas correctamente.", **resumen})
     
 # ----------------------------
 # Vista 6: Obtener notas y asistencia del Alumno
@@ -202,13 +176,21 @@ def notas_por_clase(request, clase_id):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@con_etag(firma_dashboard_alumno)
 def dashboard_alumno(request):
     alumno = request.user
-    notas = Nota.objects.filter(alumno=alumno).order_by('clase__nombre')
-    serializer = NotaSerializer(notas, many=True)
+    notas = Nota.objects.filter(alumno=alumno).with_metrics().select_related(
+        'clase__nivel', 'clase__periodo', 'clase__profesor_titular'
+    ).order_by('clase__nombre')
+    if serializacion_rapida('dashboard_alumno'):
+        clases = notas_rapidas(notas)
+    else:
+        clases = NotaSerializer(notas, many=True, context={
+            'horarios_por_clase': horarios_por_clase(notas.values('clase_id')),
+        }).data
     return Response({
         "alumno_nombre": alumno.get_full_name() or alumno.username,
-        "clases": serializer.data
+        "clases": clases
     })
 
 # ----------------------------
@@ -217,26 +199,30 @@ def dashboard_alumno(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cachear_respuesta('clases', 'usuarios', 'catalogos', 'resumenes')
 def dashboard_director(request):
     director = request.user
     periodo_id = request.query_params.get('periodo_id')
 
     # Filtrar por periodo si se proporciona, de lo contrario por periodos activos
     if periodo_id:
-        clases = Clase.objects.filter(periodo_id=periodo_id).distinct()
+        clases = Clase.objects.filter(periodo_id=periodo_id)
     else:
-        clases = Clase.objects.filter(periodo__activo=True).distinct()
+        clases = Clase.objects.filter(periodo__activo=True)
+
+    # Las métricas salen de ResumenClase (core/resumenes.py)
+    clases = clases.select_related(
+        'nivel', 'periodo', 'profesor_titular', 'profesor_asistente', 'resumen'
+    ).order_by('pk')
 
+    por_clase = horarios_por_clase(clases.values('pk'))
     data = []
 
     for clase in clases:
-        notas = Nota.objects.filter(clase=clase)
-        total_alumnos = clase.alumnos.count()
-        aprobados = sum(1 for n in notas if n.estado_aprobacion() == "Aprobado")
-        asistencia_prom = (
-            sum(n.calcular_asistencia() for n in notas) / notas.count()
-            if notas.exists() else 0
-        )
+        resumen = getattr(clase, 'resumen', None) or ResumenClase(clase=clase)
+        total_alumnos = resumen.inscritos
+        aprobados = resumen.aprobados
+        asistencia_prom = float(resumen.asistencia_promedio)
 
         # Construir objeto para profesor titular
         if clase.profesor_titular:
@@ -259,12 +245,12 @@ def dashboard_director(request):
         data.append({
             "curso": clase.nombre,
             "nivel": clase.nivel.nombre if clase.nivel else "—",
-            "horarios": [str(h) for h in clase.horarios.all()],
+            "horarios": horarios_clase(clase.id, por_clase=por_clase),
             "periodo": clase.periodo.nombre if clase.periodo else "—",
             "maestro_titular": titular_data,     # ahora es un objeto o null
             "maestro_asistente": asistente_data, # ahora es un objeto o null
             "total_alumnos": total_alumnos,
-            "alumnos_con_notas": notas.count(),
+            "alumnos_con_notas": resumen.con_notas,
             "aprobados": aprobados,
             "porcentaje_aprobados": round((aprobados / total_alumnos * 100), 2) if total_alumnos else 0,
             "asistencia_promedio": round(asistencia_prom, 2)
@@ -297,39 +283,51 @@ class RegistrarAlumnoAPIView(APIView):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def buscar_alumnos(request):
+    """
+    Busca alumnos por usuario, nombre, apellido o email. `asignado` indica si ya
+    pertenecen a ?clase_id. Los resultados van por relevancia y luego por
+    (apellido, nombre, id); con ?limite y/o ?cursor se responde por páginas en
+    ese mismo orden: {"resultados": [...], "siguiente": cursor | null}.
+    """
     query = request.GET.get('q', '')
     clase_id = request.GET.get('clase_id')  # 🆕 importante
+    paginado = 'limite' in request.GET or 'cursor' in request.GET
 
     if not query:
-        return Response([], status=200)
-
-    alumnos = Usuario.objects.filter(
-        Q(rol='alumno'),
-        Q(username__icontains=query) |
-        Q(first_name__icontains=query) |
-        Q(last_name__icontains=query) |
-        Q(email__icontains=query)
-    )
+        return Response({"resultados": [], "siguiente": None} if paginado else [], status=200)
 
-    resultado = []
-    for alumno in alumnos:
-        asignado = False
-        if clase_id:
-            try:
-                clase = Clase.objects.get(id=clase_id)
-                asignado = clase.alumnos.filter(id=alumno.id).exists()
-            except Clase.DoesNotExist:
-                pass
+    alumnos = buscar_usuarios(Usuario.objects.filter(rol='alumno'), query)
 
-        resultado.append({
+    if clase_id and clase_id.isdigit():
+        alumnos = alumnos.annotate(asignado=Exists(
+            Clase.alumnos.through.objects.filter(clase_id=clase_id, usuario_id=OuterRef('pk'))
+        ))
+    else:
+        alumnos = alumnos.annotate(asignado=Value(False))
+
+    siguiente = None
+    if paginado:
+        try:
+            alumnos, siguiente = paginar_por_cursor(
+                alumnos, request.GET.get('cursor'), limite_pagina(request.GET.get('limite'))
+            )
+        except CursorInvalido as e:
+            return Response({"error": str(e)}, status=400)
+
+    resultado = [
+        {
             "id": alumno.id,
             "username": alumno.username,
             "first_name": alumno.first_name,
             "last_name": alumno.last_name,
             "email": alumno.email,
-            "asignado": asignado,
-        })
+            "asignado": alumno.asignado,
+        }
+        for alumno in alumnos
+    ]
 
+    if paginado:
+        return Response({"resultados": resultado, "siguiente": siguiente})
     return Response(resultado)
 # ----------------------------
 # Vista 10: Profesor Asigna Alumno Existente
@@ -347,24 +345,10 @@ def asignar_alumno_a_clase(request, clase_id):
         clase = Clase.objects.get(pk=clase_id)
         alumno = Usuario.objects.get(pk=alumno_id, rol='alumno')
 
-        if alumno in clase.alumnos.all():
+        # Inscribe y crea la Nota en cero si no existe
+        if not inscribir({(clase.id, alumno.id)}):
             return Response({"message": "El alumno ya está asignado a esta clase."}, status=status.HTTP_200_OK)
 
-        clase.alumnos.add(alumno)
-
-        # Crear registro de notas si no existe
-        nota_existente = Nota.objects.filter(clase=clase, alumno=alumno).exists()
-        if not nota_existente:
-            Nota.objects.create(
-                clase=clase,
-                alumno=alumno,
-                participacion_1=0,
-                participacion_2=0,
-                participacion_3=0,
-                tareas=0,
-                examen_final=0,
-            )
-
         return Response({"message": "Alumno asignado correctamente."}, status=status.HTTP_200_OK)
 
     except Clase.DoesNotExist:
@@ -447,7 +431,7 @@ def alumnos_del_profesor(request):
             clase_info = {
                 "clase_nombre": clase.nombre,
                 "nivel": clase.nivel.nombre if clase.nivel else "—",
-                "horarios": [str(h) for h in clase.horarios.all()],
+                "horarios": horarios_clase(clase.id),
             }
         except Clase.DoesNotExist:
             clase_info = {
@@ -513,8 +497,7 @@ def listar_profesores(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def listar_horarios(request):
-    horarios = Horario.objects.all()
-    data = [{"id": h.id, "dia": h.dia} for h in horarios]
+    data = [{"id": h["id"], "dia": h["dia"]} for h in catalogos.catalogo()["horarios"].values()]
     return Response(data)
 
 # Listar todos los niveles (sin detalles de clases)
@@ -522,24 +505,26 @@ def listar_horarios(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def listar_niveles(request):
-    niveles = Nivel.objects.all()
-    data = [{"id": n.id, "nombre": n.nombre} for n in niveles]
+    data = [{"id": id, "nombre": nombre} for id, nombre in catalogos.catalogo()["niveles"].items()]
     return Response(data)
 
 # Listar todas las clases (con detalles de horarios, nivel y periodo)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cachear_respuesta('clases', 'catalogos')
 def listar_clases(request):
-    clases = Clase.objects.prefetch_related('horarios', 'nivel', 'periodo').all()
+    clases = Clase.objects.all()
+    por_clase = horarios_por_clase(clases.values('pk'))
     data = []
     for c in clases:
+        periodo = catalogos.periodo(c.periodo_id)
         data.append({
             "id": c.id,
             "nombre": c.nombre,
-            "nivel": c.nivel.nombre if c.nivel else '',
-            "periodo_nombre": c.periodo.nombre if c.periodo else 'Sin periodo',
-            "horarios": [str(h) for h in c.horarios.all()]
+            "nivel": catalogos.nivel_nombre(c.nivel_id),
+            "periodo_nombre": periodo["nombre"] if periodo else 'Sin periodo',
+            "horarios": horarios_clase(c.id, por_clase=por_clase)
          })
     return Response(data)
 
@@ -555,7 +540,11 @@ def listar_clases_profesor(request):
         profesor_asistente=usuario
     )
     clases = clases.distinct()
-    serializer = ClaseProfesorSerializer(clases, many=True)
+    if serializacion_rapida('listar_clases_profesor'):
+        return Response(clases_profesor_rapidas(clases))
+    serializer = ClaseProfesorSerializer(clases, many=True, context={
+        'horarios_por_clase': horarios_por_clase(clases.values('pk')),
+    })
     return Response(serializer.data)
 
 # Reporte de asistencia de una clase
@@ -572,71 +561,29 @@ def reporte_asistencia_clase(request, clase_id):
     except Clase.DoesNotExist:
         return Response({"error": "Clase no encontrada"}, status=404)
 
-    total_sesiones = clase.total_sesiones
-    # Usar fechas de SesionClase si existen, si no, usar fechas de asistencia
-    sesiones = clase.sesiones.order_by('fecha')
-    if sesiones.exists():
-        fechas = [str(s.fecha) for s in sesiones]
-    else:
-        fechas = sorted(list(Asistencia.objects.filter(clase=clase).values_list('fecha', flat=True).distinct()))
-    # Limitar a total_sesiones
-    fechas = fechas[:total_sesiones]
-    alumnos = clase.alumnos.all()
-    reporte = []
-    total_presentes = 0
-    total_ausentes = 0
-
-    for alumno in alumnos:
-        asistencias = Asistencia.objects.filter(clase=clase, alumno=alumno, fecha__in=fechas)
-        presentes = asistencias.filter(presente=True).count()
-        ausentes = asistencias.filter(presente=False).count()
-        porcentaje = round((presentes / total_sesiones) * 100, 2) if total_sesiones else 0
-        total_presentes += presentes
-        total_ausentes += ausentes
-        # Crear lista de asistencias por fecha (en el mismo orden que fechas)
-        asistencias_por_fecha = []
-        for fecha in fechas:
-            a = asistencias.filter(fecha=fecha).first()
-            asistencias_por_fecha.append({
-                "fecha": str(fecha),
-                "presente": a.presente if a else False
-            })
-        reporte.append({
-            "alumno_id": alumno.id,
-            "nombre": f"{alumno.first_name} {alumno.last_name}",
-            "total_sesiones": total_sesiones,
-            "presentes": presentes,
-            "ausentes": ausentes,
-            "fechas": fechas,
-            "porcentaje": porcentaje,
-            "asistencias": asistencias_por_fecha
-        })
-
-    return Response({
-        "clase": clase.nombre,
-        "total_sesiones": total_sesiones,
-        "fechas": fechas,
-        "reporte": reporte,
-        "total_presentes": total_presentes,
-        "total_ausentes": total_ausentes,
-        "total_alumnos": alumnos.count(),
-    })
+    return Response(construir_reporte(clase))
 
 # Lista de profesores para el director
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cachear_respuesta('clases', 'usuarios', 'catalogos')
 def lista_profesores_director(request):
     if request.user.rol != 'director':
        return Response({"profesores": []}, status=403)
     periodo_id = request.query_params.get('periodo_id')
     if not periodo_id:
         return Response({"profesores": []}, status=200)
-    profesores_ids_titular = list(Clase.objects.filter(periodo_id=periodo_id).values_list('profesor_titular', flat=True))
-    profesores_ids_asistente = list(Clase.objects.filter(periodo_id=periodo_id).values_list('profesor_asistente', flat=True))
-    profesores_ids = profesores_ids_titular + profesores_ids_asistente
-    profesores = Usuario.objects.filter(id__in=profesores_ids, rol='profesor').distinct()
-    serializer = ProfesorListaSerializer(profesores, many=True, context={'periodo_id': periodo_id})
+    profesores = Usuario.objects.filter(rol='profesor').filter(
+        Q(clases_titular__periodo_id=periodo_id) | Q(clases_asistente__periodo_id=periodo_id)
+    ).distinct()
+    if serializacion_rapida('lista_profesores_director'):
+        return Response({"profesores": profesores_rapidos(profesores, periodo_id)})
+    profesores = list(profesores)
+    serializer = ProfesorListaSerializer(profesores, many=True, context={
+        'periodo_id': periodo_id,
+        'cursos_por_profesor': cursos_por_profesor([p.id for p in profesores], periodo_id),
+    })
     return Response({"profesores": serializer.data})
 
 # Perido académico: listar todos los periodos
@@ -644,18 +591,7 @@ def lista_profesores_director(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def listar_periodos(request):
-    periodos = PeriodoAcademico.objects.all()
-    data = [
-        {
-            "id": p.id,
-            "nombre": p.nombre,
-            "anio": p.anio,
-            "fecha_inicio": p.fecha_inicio,
-            "fecha_fin": p.fecha_fin,
-            "activo": p.activo,
-        }
-        for p in periodos
-    ]
+    data = list(catalogos.catalogo()["periodos"].values())
     return Response(data)
 
 # ----------------------------
@@ -676,39 +612,20 @@ def director_crear_alumno(request):
     if serializer.is_valid():
         alumno = serializer.save()
         
-        # Asignar cursos seleccionados
+        # Asignar cursos seleccionados (los ids inexistentes se ignoran)
         cursos_asignados = []
         if cursos_ids:
-            for curso_id in cursos_ids:
-                try:
-                    clase = Clase.objects.get(id=curso_id)
-                    
-                    # Verificar si el alumno ya está asignado
-                    if alumno not in clase.alumnos.all():
-                        clase.alumnos.add(alumno)
-                        
-                        # Crear registro de notas si no existe
-                        nota_existente = Nota.objects.filter(clase=clase, alumno=alumno).exists()
-                        if not nota_existente:
-                            Nota.objects.create(
-                                clase=clase,
-                                alumno=alumno,
-                                participacion_1=0,
-                                participacion_2=0,
-                                participacion_3=0,
-                                tareas=0,
-                                examen_final=0,
-                            )
-                        
-                        cursos_asignados.append({
-                            'id': clase.id,
-                            'nombre': clase.nombre,
-                            'nivel': clase.nivel.nombre if clase.nivel else ''
-                        })
-                        
-                except Clase.DoesNotExist:
-                    continue
-        
+            clases = Clase.objects.select_related('nivel').in_bulk(cursos_ids)
+            nuevos = inscribir({(clase_id, alumno.id) for clase_id in clases})
+            for curso_id in dict.fromkeys(cursos_ids):
+                clase = clases.get(int(curso_id))
+                if clase and (clase.id, alumno.id) in nuevos:
+                    cursos_asignados.append({
+                        'id': clase.id,
+                        'nombre': clase.nombre,
+                        'nivel': clase.nivel.nombre if clase.nivel else ''
+                    })
+
         return Response({
             'detail': 'Alumno creado exitosamente',
             'alumno': {
@@ -721,6 +638,41 @@ def director_crear_alumno(request):
     
     return Response(serializer.errors, status=400)
 
+# ----------------------------
+# Nueva Vista: Matrícula masiva (solo Director)
+# ----------------------------
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def director_matricula_masiva(request):
+    """
+    Matricula muchos alumnos a la vez.
+    Espera: { "matriculas": [{"alumno_id": <id>, "clase_id": <id>}, ...] }
+    o un archivo CSV en "archivo" con las columnas alumno_id,clase_id.
+    Si alguna fila no es válida no se matricula a nadie.
+    """
+    if request.user.rol != 'director':
+        return Response({'detail': 'No autorizado'}, status=403)
+
+    archivo = request.FILES.get('archivo')
+    if archivo:
+        try:
+            filas = leer_csv(archivo)
+        except (UnicodeDecodeError, csv.Error):
+            return Response({"error": "El archivo debe ser un CSV en UTF-8."}, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        filas = request.data.get('matriculas') if isinstance(request.data, dict) else request.data
+    if not isinstance(filas, list):
+        return Response({"error": "Se espera una lista 'matriculas' o un archivo CSV."}, status=status.HTTP_400_BAD_REQUEST)
+
+    resumen, errores = matricular_en_lote(filas)
+    if errores:
+        return Response(
+            {"mensaje": "Algunas matrículas no son válidas; no se guardó ninguna.", "errores": errores},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return Response({"mensaje": "Matrículas registradas.", **resumen})
+
 # ----------------------------
 # Nueva Vista: Listar Clases por Periodo
 # ----------------------------
@@ -744,6 +696,7 @@ def listar_clases_por_periodo(request):
 
 @api_view(['GET', 'POST', 'PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
+@con_etag(firma_recursos)
 def recursos_por_clase(request, clase_id):
     if request.method == 'GET':
         recursos = RecursoCurso.objects.filter(clase_id=clase_id)
@@ -788,11 +741,9 @@ def director_buscar_alumnos(request):
         return Response({"error": "No autorizado"}, status=403)
     periodo_id = request.query_params.get('periodo_id')
     query = request.query_params.get('q', '')
-    alumnos = Usuario.objects.filter(
-        rol='alumno'
-    ).filter(
-        Q(first_name__icontains=query) | Q(last_name__icontains=query)
-    )
+    alumnos = buscar_usuarios(
+        Usuario.objects.filter(rol='alumno'), query, campos=('first_name', 'last_name')
+    ).only('id', 'first_name', 'last_name', 'email')
     resultado = []
     for alumno in alumnos:
         resultado.append({
@@ -813,16 +764,22 @@ def director_alumno_cursos(request):
     if not periodo_id or not alumno_id:
         return Response({"error": "Faltan parámetros"}, status=400)
     
-    clases = Clase.objects.filter(periodo_id=periodo_id, alumnos__id=alumno_id).select_related('nivel', 'periodo').prefetch_related('horarios')
+    clases = Clase.objects.filter(periodo_id=periodo_id, alumnos__id=alumno_id).select_related('nivel', 'periodo')
+    # Si hay más de una nota por clase vale la primera (menor pk), como en notas_por_clase
+    promedios = {}
+    for clase_id, promedio in Nota.objects.filter(
+        alumno_id=alumno_id, clase__periodo_id=periodo_id
+    ).with_metrics().order_by('pk').values_list('clase_id', 'metrica_promedio'):
+        promedios.setdefault(clase_id, promedio)
+    por_clase = horarios_por_clase(clases.values('pk'))
     
     data = []
     for clase in clases:
-        # Obtener la nota del alumno en esta clase
-        try:
-            nota = Nota.objects.get(alumno_id=alumno_id, clase_id=clase.id)
-            promedio = float(nota.promedio)
+        # Promedio del alumno en esta clase (calculado en SQL)
+        if clase.id in promedios:
+            promedio = float(promedios[clase.id])
             aprobado = promedio >= 14
-        except Nota.DoesNotExist:
+        else:
             promedio = 0.0
             aprobado = False
         
@@ -830,7 +787,7 @@ def director_alumno_cursos(request):
             "id": clase.id,
             "nombre": clase.nombre,
             "nivel": clase.nivel.nombre if clase.nivel else "",
-            "horarios": [str(h) for h in clase.horarios.all()],
+            "horarios": horarios_clase(clase.id, por_clase=por_clase),
             "periodo": clase.periodo.nombre if clase.periodo else "Sin período",
             "promedio": promedio,
             "aprobado": aprobado,
@@ -838,6 +795,9 @@ def director_alumno_cursos(request):
     return Response(data)
 
 
+# ----------------------------
+# Vista: Director obtiene TODOS los cursos de un alumno (todos los períodos)
+# ----------------------------
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def director_alumno_cursos_todos_periodos(request):
@@ -846,113 +806,114 @@ def director_alumno_cursos_todos_periodos(request):
     """
     if request.user.rol != 'director':
         return Response({"error": "No autorizado"}, status=403)
-    
+
     alumno_id = request.query_params.get('alumno_id')
     if not alumno_id:
         return Response({"error": "Falta parámetro alumno_id"}, status=400)
-    
     try:
-        # Obtener todos los cursos del alumno sin filtrar por período
-        clases = Clase.objects.filter(alumnos__id=alumno_id).select_related('nivel', 'periodo').prefetch_related('horarios').order_by('periodo__fecha_inicio')
-        
-        data = []
-        for clase in clases:
-            # Obtener la nota del alumno en esta clase
-            try:
-                nota = Nota.objects.get(alumno_id=alumno_id, clase_id=clase.id)
-                promedio = float(nota.promedio)
-                aprobado = promedio >= 14
-            except Nota.DoesNotExist:
-                promedio = 0.0
-                aprobado = False
-            
-            data.append({
-                "id": clase.id,
-                "nombre": clase.nombre,
-                "nivel": clase.nivel.nombre if clase.nivel else "",
-                "horarios": [str(h) for h in clase.horarios.all()],
-                "periodo": clase.periodo.nombre if clase.periodo else "Sin período",
-                "periodo_id": clase.periodo.id if clase.periodo else None,
-                "promedio": promedio,
-                "aprobado": aprobado,
-            })
-        return Response(data)
-    except Exception as e:
-        return Response({"error": str(e)}, status=500)
+        alumno_id = int(alumno_id)
+    except ValueError:
+        return Response({"error": "alumno_id inválido"}, status=400)
+
+    data = []
+    por_clase = horarios_por_clase(Clase.alumnos.through.objects.filter(usuario_id=alumno_id).values('clase_id'))
+    for historial in historiales([alumno_id]):
+        for periodo in historial["periodos"]:
+            for curso in periodo["cursos"]:
+                data.append({
+                    "id": curso["clase_id"],
+                    "nombre": curso["curso"],
+                    "nivel": curso["nivel"],
+                    "horarios": horarios_clase(curso["clase_id"], por_clase=por_clase),
+                    "periodo": periodo["periodo"],
+                    "periodo_id": periodo["periodo_id"],
+                    "promedio": curso["promedio"] or 0.0,
+                    "asistencia": curso["asistencia"] or 0.0,
+                    "estado": curso["estado"],
+                    # Como en director_alumno_cursos, aprobado solo mira el promedio;
+                    # `estado` además exige la asistencia mínima
+                    "aprobado": curso["promedio"] is not None and curso["promedio"] >= 14,
+                })
+    return Response(data)
+
 
 # ----------------------------
-# Vista: Director obtiene clases de un periodo (para asignar alumnos)
+# Vista: Historial académico de uno o varios alumnos (json, html o pdf)
 # ----------------------------
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def director_clases_periodo(request):
+def director_historial_academico(request):
     """
-    Devuelve todas las clases de un periodo académico específico
-    para que el director pueda asignar alumnos
+    Historial por periodo con promedio, asistencia y estado de cada curso.
+    Parámetros: ?alumno_id=3 o ?alumno_id=3,8,21 o ?periodo_id=5 (todos los
+    alumnos matriculados en el periodo, p. ej. la promoción que egresa) y
+    &formato=json|html|pdf
     """
     if request.user.rol != 'director':
         return Response({"error": "No autorizado"}, status=403)
-    
+
+    formato = request.query_params.get('formato', 'json')
+    if formato not in FORMATOS_HISTORIAL:
+        return Response({"error": "Formato inválido"}, status=400)
+    if formato == 'pdf' and HTML is None:
+        return Response({"error": "El historial en pdf requiere weasyprint"}, status=400)
+
     periodo_id = request.query_params.get('periodo_id')
-    if not periodo_id:
-        return Response({"error": "Falta parámetro periodo_id"}, status=400)
-    
     try:
-        clases = Clase.objects.filter(periodo_id=periodo_id).select_related('nivel', 'periodo').prefetch_related('horarios')
-        data = []
-        for clase in clases:
-            data.append({
-                "id": clase.id,
-                "nombre": clase.nombre,
-                "nivel": clase.nivel.nombre if clase.nivel else "Sin nivel",
-                "horarios": [str(h) for h in clase.horarios.all()],
-                "total_alumnos": clase.alumnos.count(),
-                "profesor_titular": clase.profesor_titular.get_full_name() if clase.profesor_titular else "Sin asignar",
-            })
-        return Response(data)
-    except Exception as e:
-        return Response({"error": str(e)}, status=500)
+        if periodo_id:
+            alumno_ids = list(Clase.alumnos.through.objects.filter(
+                clase__periodo_id=int(periodo_id)
+            ).order_by('usuario__last_name', 'usuario__first_name', 'usuario_id').values_list('usuario_id', flat=True))
+        else:
+            alumno_ids = [int(valor) for valor in request.query_params.get('alumno_id', '').split(',') if valor.strip()]
+    except ValueError:
+        return Response({"error": "alumno_id y periodo_id deben ser números"}, status=400)
+    if not alumno_ids and not periodo_id:
+        return Response({"error": "Falta parámetro alumno_id o periodo_id"}, status=400)
+
+    data = historiales(alumno_ids)
+    if formato == 'html':
+        return HttpResponse(documento_html(data), content_type='text/html; charset=utf-8')
+    if formato == 'pdf':
+        respuesta = HttpResponse(documento_pdf(data), content_type='application/pdf')
+        respuesta['Content-Disposition'] = 'attachment; filename="historial_academico.pdf"'
+        return respuesta
+    return Response({"historiales": data})
+
 
 # ----------------------------
-# Vista: Director obtiene TODOS los cursos de un alumno (todos los períodos)
+# Vista: Director obtiene clases de un periodo (para asignar alumnos)
 # ----------------------------
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def director_alumno_cursos_todos_periodos(request):
+@cachear_respuesta('clases', 'usuarios', 'catalogos', 'resumenes')
+def director_clases_periodo(request):
     """
-    Devuelve todos los cursos de un alumno en todos los períodos académicos
+    Devuelve todas las clases de un periodo académico específico
+    para que el director pueda asignar alumnos
     """
     if request.user.rol != 'director':
         return Response({"error": "No autorizado"}, status=403)
     
-    alumno_id = request.query_params.get('alumno_id')
-    if not alumno_id:
-        return Response({"error": "Falta parámetro alumno_id"}, status=400)
+    periodo_id = request.query_params.get('periodo_id')
+    if not periodo_id:
+        return Response({"error": "Falta parámetro periodo_id"}, status=400)
     
     try:
-        # Obtener todos los cursos del alumno sin filtrar por período
-        clases = Clase.objects.filter(alumnos__id=alumno_id).select_related('nivel', 'periodo').prefetch_related('horarios').order_by('periodo__fecha_inicio')
-        
+        clases = Clase.objects.filter(periodo_id=periodo_id).select_related(
+            'nivel', 'periodo', 'profesor_titular', 'resumen'
+        )
+        por_clase = horarios_por_clase(clases.values('pk'))
         data = []
         for clase in clases:
-            # Obtener la nota del alumno en esta clase
-            try:
-                nota = Nota.objects.get(alumno_id=alumno_id, clase_id=clase.id)
-                promedio = float(nota.promedio)
-                aprobado = promedio >= 14
-            except Nota.DoesNotExist:
-                promedio = 0.0
-                aprobado = False
-            
+            resumen = getattr(clase, 'resumen', None)
             data.append({
                 "id": clase.id,
                 "nombre": clase.nombre,
-                "nivel": clase.nivel.nombre if clase.nivel else "",
-                "horarios": [str(h) for h in clase.horarios.all()],
-                "periodo": clase.periodo.nombre if clase.periodo else "Sin período",
-                "periodo_id": clase.periodo.id if clase.periodo else None,
-                "promedio": promedio,
-                "aprobado": aprobado,
+                "nivel": clase.nivel.nombre if clase.nivel else "Sin nivel",
+                "horarios": horarios_clase(clase.id, por_clase=por_clase),
+                "total_alumnos": resumen.inscritos if resumen else 0,
+                "profesor_titular": clase.profesor_titular.get_full_name() if clase.profesor_titular else "Sin asignar",
             })
         return Response(data)
     except Exception as e:
@@ -975,12 +936,12 @@ def alumno_curso_matriculado(request):
         clase = Clase.objects.filter(
             alumnos=alumno,
             disponible=True
-        ).select_related('profesor_titular').prefetch_related('horarios').first()
+        ).select_related('profesor_titular').first()
         
         if not clase:
             return Response({"curso": None})
         
-        horarios_str = ', '.join([f"{h.get_dia_display()} {h.hora.strftime('%H:%M')}" for h in clase.horarios.all()])
+        horarios_str = horarios_clase_24h(clase.id)
         
         return Response({
             "curso": {
@@ -999,6 +960,7 @@ def alumno_curso_matriculado(request):
 # ----------------------------
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cachear_respuesta('clases', 'matriculas', 'usuarios', 'catalogos', por_usuario=True)
 def cursos_disponibles(request):
     """
     Retorna TODOS los cursos disponibles (sin restricciones por ahora)
@@ -1007,13 +969,14 @@ def cursos_disponibles(request):
         alumno = request.user
         
         # Obtener cursos disponibles que NO esté matriculado
-        cursos = Clase.objects.filter(
+        cursos = con_inscritos(Clase.objects.filter(
             disponible=True
-        ).exclude(alumnos=alumno).prefetch_related('horarios', 'profesor_titular')
+        ).exclude(alumnos=alumno).select_related('periodo', 'profesor_titular'))
         
+        por_clase = horarios_por_clase(cursos.values('pk'))
         data = []
         for curso in cursos:
-            horarios_str = ', '.join([f"{h.get_dia_display()} {h.hora.strftime('%H:%M')}" for h in curso.horarios.all()])
+            horarios_str = horarios_clase_24h(curso.id, por_clase=por_clase)
             data.append({
                 'clase_id': curso.id,
                 'curso_nombre': curso.nombre,
@@ -1021,6 +984,7 @@ def cursos_disponibles(request):
                 'horarios': horarios_str or 'Sin horario',
                 'profesor_nombre': curso.profesor_titular.get_full_name() or curso.profesor_titular.username if curso.profesor_titular else 'N/A',
                 'profesor_telefono': curso.profesor_titular.telefono if curso.profesor_titular else 'N/A',
+                'cupos_disponibles': max(curso.cupo - curso.inscritos, 0) if curso.cupo is not None else None,
             })
         
         return Response({"cursos": data})
@@ -1040,21 +1004,10 @@ def matricular_curso(request):
     try:
         clase_id = request.data.get('clase_id')
         alumno = request.user
-        clase = Clase.objects.get(id=clase_id)
-        
-        # Solo verificar disponible
-        if not clase.disponible:
-            return Response({"error": "Curso no disponible"}, status=400)
-        
-        # Solo verificar que no esté inscrito
-        if clase.alumnos.filter(id=alumno.id).exists():
-            return Response({"error": "Ya estás matriculado"}, status=400)
-        
-        # Agregar y crear nota
-        clase.alumnos.add(alumno)
-        Nota.objects.get_or_create(alumno=alumno, clase=clase)
+        # Verifica disponible, matrícula previa y cupo con la clase bloqueada
+        clase = matricular(clase_id, alumno.id)
         
-        horarios_str = ', '.join([f"{h.get_dia_display()} {h.hora.strftime('%H:%M')}" for h in clase.horarios.all()])
+        horarios_str = horarios_clase_24h(clase.id)
         
         return Response({
             "mensaje": "¡Éxito!",
@@ -1067,4 +1020,60 @@ def matricular_curso(request):
             }
         })
     except Exception as e:
-        return Response({"error": str(e)}, status=400)
\ No newline at end of file
+        return Response({"error": str(e)}, status=400)
+# ----------------------------
+# Vista: Exportar reportes de asistencia y notas (CSV / XLSX)
+# ----------------------------
+def _parametros_exportacion(request):
+    tipo = request.query_params.get('tipo', 'asistencia')
+    formato = request.query_params.get('formato', 'csv')
+    if tipo not in TIPOS_EXPORTACION:
+        return None, None, Response({"error": "Tipo de reporte inválido"}, status=400)
+    if formato not in FORMATOS_EXPORTACION:
+        return None, None, Response({"error": "Formato inválido"}, status=400)
+    if formato == 'xlsx' and Workbook is None:
+        return None, None, Response({"error": "La exportación a xlsx requiere openpyxl"}, status=400)
+    return tipo, formato, None
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def exportar_reporte_clase(request, clase_id):
+    """
+    Descarga la matriz de asistencia o la hoja de notas de una clase.
+    Parámetros: ?tipo=asistencia|notas&formato=csv|xlsx
+    """
+    tipo, formato, error = _parametros_exportacion(request)
+    if error:
+        return error
+
+    clases = Clase.objects.filter(id=clase_id)
+    clase = clases.first()
+    if not clase:
+        return Response({"error": "Clase no encontrada"}, status=404)
+    if request.user.rol != 'director' and request.user.id not in (clase.profesor_titular_id, clase.profesor_asistente_id):
+        return Response({"error": "No autorizado"}, status=403)
+
+    return exportar(clases, tipo, formato, clase.nombre)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def exportar_reporte_periodo(request, periodo_id):
+    """
+    Descarga la matriz de asistencia o la hoja de notas de todas las clases de un periodo.
+    Parámetros: ?tipo=asistencia|notas&formato=csv|xlsx
+    """
+    if request.user.rol != 'director':
+        return Response({"error": "No autorizado"}, status=403)
+
+    tipo, formato, error = _parametros_exportacion(request)
+    if error:
+        return error
+
+    try:
+        periodo = PeriodoAcademico.objects.get(id=periodo_id)
+    except PeriodoAcademico.DoesNotExist:
+        return Response({"error": "Periodo no encontrado"}, status=404)
+
+    return exportar(Clase.objects.filter(periodo=periodo), tipo, formato, periodo.nombre)
@@ -0,0 +1,117 @@
+from functools import wraps
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from . import catalogos
+from .condicional import con_etag, firma_dashboard_alumno, firma_recursos
+from .matricula import con_inscritos
+from .models import Clase, Nota, RecursoCurso, Usuario
+from .serializacion import CAMPOS_NOTA_RAPIDA, nota_rapida
+from .serializers import RecursoCursoSerializer
+
+# -----------------------------
+# VISTAS ASYNC DEL ALUMNO
+# -----------------------------
+# Las mismas respuestas que dashboard_alumno, alumno_curso_matriculado,
+# cursos_disponibles y recursos_por_clase (GET), con el ORM async. Bajo
+# uvicorn (ela_backend/asgi.py) la espera de la base no ocupa un worker.
+# DRF no tiene vistas async, así que el JWT se valida aquí con simplejwt.
+
+_jwt = JWTAuthentication()
+
+
+def con_jwt(vista):
+    """Autentica con el encabezado Authorization: Bearer <access> y deja el usuario en request.user."""
+    @wraps(vista)
+    async def envoltura(request, *args, **kwargs):
+        cabecera = _jwt.get_header(request)
+        token = _jwt.get_raw_token(cabecera) if cabecera else None
+        if token is None:
+            return JsonResponse({"detail": "Las credenciales de autenticación no se proveyeron."}, status=401)
+        try:
+            validado = _jwt.get_validated_token(token)
+        except AuthenticationFailed as e:
+            # El mismo cuerpo que devuelve DRF con JWTAuthentication
+            return JsonResponse(e.detail if isinstance(e.detail, dict) else {"detail": e.detail}, status=401)
+
+        usuario = await Usuario.objects.filter(pk=validado[jwt_settings.USER_ID_CLAIM], is_active=True).afirst()
+        if usuario is None:
+            return JsonResponse({"detail": "Usuario no encontrado"}, status=401)
+        request.user = usuario
+        return await vista(request, *args, **kwargs)
+    return envoltura
+
+
+def _profesor(clase):
+    titular = clase.profesor_titular
+    return {
+        'profesor_nombre': titular.get_full_name() or titular.username if titular else 'N/A',
+        'profesor_telefono': titular.telefono if titular else 'N/A',
+    }
+
+
+@require_GET
+@con_jwt
+@con_etag(firma_dashboard_alumno)
+async def dashboard_alumno_async(request):
+    alumno = request.user
+    notas = Nota.objects.filter(alumno=alumno).with_metrics().order_by('clase__nombre')
+    datos = await catalogos.acatalogo()
+    por_clase = await catalogos.ahorarios_por_clase(notas.values('clase_id'))
+    clases = [nota_rapida(f, datos, por_clase) async for f in notas.values(*CAMPOS_NOTA_RAPIDA).aiterator()]
+    return JsonResponse({
+        "alumno_nombre": alumno.get_full_name() or alumno.username,
+        "clases": clases,
+    })
+
+
+@require_GET
+@con_jwt
+async def alumno_curso_matriculado_async(request):
+    clase = await Clase.objects.filter(
+        alumnos=request.user, disponible=True
+    ).select_related('profesor_titular').afirst()
+    if not clase:
+        return JsonResponse({"curso": None})
+
+    datos = await catalogos.acatalogo()
+    por_clase = await catalogos.ahorarios_por_clase([clase.id])
+    return JsonResponse({
+        "curso": {
+            'clase_id': clase.id,
+            'curso_nombre': clase.nombre,
+            'horarios': catalogos.horarios_clase_24h(clase.id, datos, por_clase),
+            **_profesor(clase),
+        }
+    })
+
+
+@require_GET
+@con_jwt
+async def cursos_disponibles_async(request):
+    cursos = con_inscritos(Clase.objects.filter(
+        disponible=True
+    ).exclude(alumnos=request.user).select_related('periodo', 'profesor_titular'))
+    datos = await catalogos.acatalogo()
+    por_clase = await catalogos.ahorarios_por_clase(cursos.values('pk'))
+    data = []
+    async for curso in cursos.aiterator():
+        data.append({
+            'clase_id': curso.id,
+            'curso_nombre': curso.nombre,
+            'periodo_nombre': curso.periodo.nombre if curso.periodo else 'N/A',
+            'horarios': catalogos.horarios_clase_24h(curso.id, datos, por_clase) or 'Sin horario',
+            **_profesor(curso),
+            'cupos_disponibles': max(curso.cupo - curso.inscritos, 0) if curso.cupo is not None else None,
+        })
+    return JsonResponse({"cursos": data})
+
+
+@require_GET
+@con_jwt
+@con_etag(firma_recursos)
+async def recursos_por_clase_async(request, clase_id):
+    recursos = [recurso async for recurso in RecursoCurso.objects.filter(clase_id=clase_id)]
+    return JsonResponse(RecursoCursoSerializer(recursos, many=True).data, safe=False)
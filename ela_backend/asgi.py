@@ -2,6 +2,8 @@
 ASGI config for ela_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP goes to Django; the attendance WebSocket (ws/clases/<id>/asistencia/)
+goes to core.tiempo_real.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +15,17 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ela_backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Se importa después de cargar Django (usa los modelos)
+from core.tiempo_real import RUTA as RUTA_ASISTENCIA, asistencia_websocket  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        if RUTA_ASISTENCIA.match(scope['path']):
+            return await asistencia_websocket(scope, receive, send)
+        # Ruta desconocida: rechazar el handshake
+        await receive()
+        return await send({'type': 'websocket.close', 'code': 4404})
+    return await django_application(scope, receive, send)
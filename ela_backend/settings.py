@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 import os
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from datetime import timedelta
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.InstrumentacionSQLMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -57,6 +59,41 @@ MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
 ]
 
+# Instrumentación SQL por petición (core/middleware.py): fracción de peticiones a medir.
+# 0 la desactiva; por ejemplo INSTRUMENTACION_MUESTREO=0.05 mide el 5% de las peticiones.
+INSTRUMENTACION_MUESTREO = float(os.environ.get('INSTRUMENTACION_MUESTREO', '0'))
+
+# Búsqueda de alumnos (core/busqueda.py): en PostgreSQL usa pg_trgm + unaccent
+# (migración 0023); BUSQUEDA_TRIGRAMAS=false vuelve a icontains.
+BUSQUEDA_TRIGRAMAS = os.environ.get('BUSQUEDA_TRIGRAMAS', 'true').lower() == 'true'
+BUSQUEDA_LIMITE_DEFECTO = 20
+BUSQUEDA_LIMITE_MAXIMO = 100
+
+# Caché de catálogos (core/catalogos.py): con true se comparte entre workers
+# a través del caché de Django en vez de vivir solo en cada proceso.
+CATALOGOS_CACHE_COMPARTIDO = os.environ.get('CATALOGOS_CACHE_COMPARTIDO', 'false').lower() == 'true'
+# Segundos que cada proceso usa su copia sin revisar la versión (o recargarla)
+CATALOGOS_CACHE_SEGUNDOS = int(os.environ.get('CATALOGOS_CACHE_SEGUNDOS', '30'))
+
+# Vistas que arman su respuesta con core/serializacion.py en vez de los
+# serializers de DRF (mismo JSON). SERIALIZACION_RAPIDA= (vacío) las desactiva.
+SERIALIZACION_RAPIDA = [
+    vista for vista in os.environ.get(
+        'SERIALIZACION_RAPIDA', 'dashboard_alumno,listar_clases_profesor,lista_profesores_director'
+    ).split(',') if vista
+]
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.instrumentacion': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 ROOT_URLCONF = 'ela_backend.urls'
 
 TEMPLATES = [
@@ -81,9 +118,20 @@ WSGI_APPLICATION = 'ela_backend.wsgi.application'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 import dj_database_url
 
+# En local se puede usar DATABASE_URL=sqlite:///db.sqlite3 o un PostgreSQL sin SSL
+DATABASE_URL = os.environ.get('DATABASE_URL', '')
+DATABASE_SSL_REQUIRE = (
+    os.environ.get('DATABASE_SSL_REQUIRE', 'true').lower() == 'true'
+    and not DATABASE_URL.startswith('sqlite')
+)
+
+# Bajo ASGI (Procfile) cada petición usa su propio hilo y las conexiones
+# persistentes se acumulan: el Procfile pone DATABASE_CONN_MAX_AGE=0
+DATABASE_CONN_MAX_AGE = int(os.environ.get('DATABASE_CONN_MAX_AGE', 600))
+
 DATABASES = {
 
-    'default': dj_database_url.config(conn_max_age=600, ssl_require=True)
+    'default': dj_database_url.config(conn_max_age=DATABASE_CONN_MAX_AGE, ssl_require=DATABASE_SSL_REQUIRE)
 
 #    'default': {
 #       'ENGINE': 'django.db.backends.postgresql',
@@ -96,6 +144,43 @@ DATABASES = {
 
 }
 
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# CACHE_BACKEND=locmem (por defecto, un caché por proceso), archivo (compartido
+# entre los workers de la misma máquina, en CACHE_DIR) o redis (CACHE_URL, sirve
+# cualquier servidor compatible con Redis; requiere el paquete `redis`).
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('CACHE_URL', 'redis://127.0.0.1:6379/1'),
+    }}
+elif CACHE_BACKEND == 'archivo':
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_DIR', str(BASE_DIR / '.cache')),
+    }}
+else:
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ela',
+    }}
+
+# Con locmem cada proceso (cada worker de gunicorn y el proceso asgi) tiene sus
+# propias versiones de los datos y no ve las invalidaciones de los demás.
+CACHE_COMPARTIDO = CACHE_BACKEND in ('archivo', 'redis')
+
+# Caché de respuestas de los endpoints de lectura más pesados (core/cache_respuestas.py).
+# 0 lo desactiva; solo puede activarse con un caché compartido.
+RESPUESTAS_CACHE_SEGUNDOS = int(os.environ.get('RESPUESTAS_CACHE_SEGUNDOS', '300' if CACHE_COMPARTIDO else '0'))
+if RESPUESTAS_CACHE_SEGUNDOS and not CACHE_COMPARTIDO:
+    raise ImproperlyConfigured(
+        'RESPUESTAS_CACHE_SEGUNDOS requiere CACHE_BACKEND=archivo o redis: con locmem '
+        'los demás procesos seguirían sirviendo respuestas invalidadas.'
+    )
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 